@@ -0,0 +1,112 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Measures the cold import time of modules, with python -X importtime in a new interpreter,
+and reports the total time and the slowest top-level packages.
+
+Usage: python -m benchmarks.import_benchmark [-e KEY=VALUE] [--runs N] [--max-ms MS] module [module ...]
+With --max-ms, exits with an error if any module takes longer to import, i.e. to check the CLI startup time.
+tests/test_startup_time.py checks the CLI startup time and imports with pytest.
+"""
+
+from __future__ import annotations
+
+import os
+import statistics
+import subprocess
+import sys
+from argparse import ArgumentParser
+
+DEFAULT_RUNS: int = 5
+DEFAULT_TOP: int = 10
+
+
+def parse_importtime(output: str) -> dict[str, int]:
+    """Returns the cumulative import time, in microseconds, of each module imported"""
+    cumulative: dict[str, int] = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, _cumulative_us, _module = line.split(":", 1)[1].split("|")
+        cumulative[_module.strip()] = int(_cumulative_us)
+    return cumulative
+
+
+def measure_import(module: str, env: dict = None) -> dict[str, int]:
+    """Imports module in a new interpreter and returns the import times of all the modules imported"""
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"Failed to import {module}", process.stderr)
+    return parse_importtime(process.stderr)
+
+
+def get_top_level_times(times: dict[str, int]) -> dict[str, int]:
+    """Returns the cumulative time of each top-level package, i.e. boto3 for boto3.session"""
+    top_level: dict[str, int] = {}
+    for _module, _time in times.items():
+        _package = _module.lstrip().split(".")[0]
+        top_level[_package] = max(top_level.get(_package, 0), _time)
+    return top_level
+
+
+def benchmark_import(
+    module: str, runs: int = DEFAULT_RUNS, env: dict = None
+) -> dict[str, float | dict[str, float]]:
+    """Returns the median import time of module, and of its slowest top-level dependencies, in milliseconds"""
+    measures: list[dict[str, int]] = [measure_import(module, env) for _ in range(runs)]
+    top_levels: list[dict[str, int]] = [get_top_level_times(_m) for _m in measures]
+    packages: set[str] = set().union(*top_levels)
+    return {
+        "module": module,
+        "total_ms": statistics.median(_m[module] for _m in measures) / 1000,
+        "packages_ms": {
+            _package: statistics.median(_t.get(_package, 0) for _t in top_levels) / 1000
+            for _package in packages
+        },
+    }
+
+
+def main():
+    parser = ArgumentParser("import_benchmark")
+    parser.add_argument("modules", nargs="+", help="Modules to import")
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    parser.add_argument(
+        "--max-ms",
+        dest="max_ms",
+        type=float,
+        help="Fails if the median import time of a module is above, in milliseconds",
+    )
+    parser.add_argument(
+        "-e",
+        "--env",
+        dest="env",
+        action="append",
+        default=[],
+        help="KEY=VALUE environment variables to set for the import",
+    )
+    args = parser.parse_args()
+    env: dict = dict(os.environ)
+    env.update(_env.split("=", 1) for _env in args.env)
+    too_slow: list[str] = []
+    for module in args.modules:
+        result = benchmark_import(module, args.runs, env)
+        print(f"{module}: {result['total_ms']:.1f} ms (median of {args.runs} runs)")
+        for _package, _time in sorted(
+            result["packages_ms"].items(), key=lambda _item: _item[1], reverse=True
+        )[: args.top]:
+            print(f"  {_package:<30} {_time:8.1f} ms")
+        if args.max_ms and result["total_ms"] > args.max_ms:
+            too_slow.append(module)
+    if too_slow:
+        sys.exit(f"Import time above {args.max_ms} ms for {', '.join(too_slow)}")
+
+
+if __name__ == "__main__":
+    main()
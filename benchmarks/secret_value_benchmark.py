@@ -0,0 +1,84 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Measures the time to rewrite the username and token of large multi-key secret values, with the
+previous implementation (deep copy, and a regex replacement per value, per replaced string) and the current one.
+
+Usage: python -m benchmarks.secret_value_benchmark [--keys N] [--runs N]
+"""
+
+from __future__ import annotations
+
+import re
+import timeit
+from argparse import ArgumentParser
+from copy import deepcopy
+
+from cdk_gw_tools.aws.gw_handling import replace_strings_in_values
+
+DEFAULT_KEYS: int = 200
+DEFAULT_RUNS: int = 1000
+OLD_USERNAME: str = "tenant-app-0001"
+NEW_USERNAME: str = "tenant-app-0002"
+OLD_TOKEN: str = "eyJhbGciOiJIUzI1NiJ9." + "a" * 300 + ".old-signature"
+NEW_TOKEN: str = "eyJhbGciOiJIUzI1NiJ9." + "b" * 300 + ".new-signature"
+
+
+def get_secret_value(keys: int) -> dict:
+    """Secret with the SASL settings, JAAS configs and client properties blobs, and unrelated values"""
+    jaas: str = (
+        "org.apache.kafka.common.security.plain.PlainLoginModule required "
+        f'username="{OLD_USERNAME}" password="{OLD_TOKEN}";'
+    )
+    secret: dict = {"SASL_USERNAME": OLD_USERNAME, "SASL_PASSWORD": OLD_TOKEN}
+    for _index in range(keys):
+        if _index % 4 == 0:
+            secret[f"jaas_{_index}"] = jaas
+        elif _index % 4 == 1:
+            secret[f"properties_{_index}"] = (
+                f"bootstrap.servers=gateway:9092\nsasl.jaas.config={jaas}\n"
+                + "client.setting=value\n" * 20
+            )
+        else:
+            secret[f"setting_{_index}"] = f"value-{_index}-" + "x" * 100
+    secret["clients"] = [{"name": "app", "sasl.jaas.config": jaas}]
+    return secret
+
+
+def legacy_replace(input_dict: dict, src_value: str, new_value: str) -> dict:
+    """Previous replace_string_in_dict_values, with copy (top-level string values only)"""
+    src_re = re.compile(re.escape(src_value))
+    updated_dict = deepcopy(input_dict)
+    for key, value in updated_dict.items():
+        if isinstance(value, str) and src_re.findall(value):
+            updated_dict[key] = src_re.sub(new_value, value)
+    return updated_dict
+
+
+def legacy_rewrite(secret: dict) -> dict:
+    new_value = legacy_replace(secret, OLD_USERNAME, NEW_USERNAME)
+    return legacy_replace(new_value, OLD_TOKEN, NEW_TOKEN)
+
+
+def rewrite(secret: dict) -> dict:
+    return replace_strings_in_values(
+        secret, {OLD_USERNAME: NEW_USERNAME, OLD_TOKEN: NEW_TOKEN}
+    )
+
+
+def main():
+    parser = ArgumentParser("secret_value_benchmark")
+    parser.add_argument("--keys", type=int, default=DEFAULT_KEYS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args()
+    secret = get_secret_value(args.keys)
+    for _name, _function in [("legacy", legacy_rewrite), ("current", rewrite)]:
+        _time = timeit.timeit(lambda: _function(secret), number=args.runs)
+        print(
+            f"{_name:<10} {_time / args.runs * 1e6:10.1f} us per secret ({len(secret)} keys)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Measures the time to filter the logical topics of a tenant with the include and exclude regexes of a mapping rule,
+for growing numbers of topics, to show that the time per topic stays constant.
+With --legacy, also measures the previous implementation (copy, and list scans per topic), which is quadratic.
+
+Usage: python -m benchmarks.topics_filter_benchmark [--topics N [N ...]] [--runs N] [--legacy]
+"""
+
+from __future__ import annotations
+
+import re
+import timeit
+from argparse import ArgumentParser
+from copy import deepcopy
+
+from cdk_gw_tools.cli_tools.import_tenants_mappings import (
+    RegexesMatcher,
+    filter_tenant_topics,
+)
+
+DEFAULT_TOPICS: list[int] = [12500, 25000, 50000]
+DEFAULT_RUNS: int = 5
+INCLUDE_REGEXES: list[str] = ["^orders-.*$", "(?i)^PAYMENTS-.*$", "^audit-[0-9]+$"]
+EXCLUDE_REGEXES: list[str] = [".*-dlq$", "(?i).*-INTERNAL$"]
+
+
+def get_tenant_topics(count: int) -> list[dict]:
+    """Logical topics as returned by the vCluster topic mappings, a third of them matching no include regex"""
+    prefixes: list[str] = ["orders", "payments", "audit", "inventory", "shipping"]
+    suffixes: list[str] = ["", "-dlq", "-internal"]
+    return [
+        {
+            "logicalTopicName": f"{prefixes[_index % len(prefixes)]}-{_index}{suffixes[_index % len(suffixes)]}",
+            "physicalTopicName": f"tenant-{_index}",
+            "readOnly": False,
+            "concentrated": False,
+        }
+        for _index in range(count)
+    ]
+
+
+def legacy_filter(tenant_topics: list[dict]) -> list[dict]:
+    """Previous filtering of import_from_tenants_include_dict"""
+    exclude_patterns = [re.compile(_regex) for _regex in EXCLUDE_REGEXES]
+    include_patterns = [re.compile(_regex) for _regex in INCLUDE_REGEXES]
+    topics_to_import: list[dict] = deepcopy(tenant_topics)
+    for _topic in tenant_topics:
+        for _pattern in exclude_patterns:
+            if (
+                _pattern.match(_topic["logicalTopicName"])
+                and _topic["logicalTopicName"] in topics_to_import
+            ):
+                topics_to_import.remove(_topic)
+    final_topics_import: list[dict] = []
+    for _topic in topics_to_import:
+        for _pattern in include_patterns:
+            if (
+                _pattern.match(_topic["logicalTopicName"])
+                and _topic not in final_topics_import
+            ):
+                final_topics_import.append(_topic)
+    return final_topics_import
+
+
+def current_filter(tenant_topics: list[dict]) -> list[dict]:
+    return filter_tenant_topics(
+        tenant_topics,
+        RegexesMatcher(INCLUDE_REGEXES),
+        RegexesMatcher(EXCLUDE_REGEXES),
+    )
+
+
+def main():
+    parser = ArgumentParser("topics_filter_benchmark")
+    parser.add_argument("--topics", type=int, nargs="+", default=DEFAULT_TOPICS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also measures the previous implementation. Takes minutes with 50k topics",
+    )
+    args = parser.parse_args()
+    functions = [("current", current_filter)]
+    if args.legacy:
+        functions.insert(0, ("legacy", legacy_filter))
+    for _count in args.topics:
+        tenant_topics = get_tenant_topics(_count)
+        for _name, _function in functions:
+            _time = timeit.timeit(lambda: _function(tenant_topics), number=args.runs)
+            print(
+                f"{_name:<10} {_count:>8} topics {_time / args.runs * 1e3:10.1f} ms "
+                f"{_time / args.runs / _count * 1e6:8.2f} us per topic"
+            )
+
+
+if __name__ == "__main__":
+    main()
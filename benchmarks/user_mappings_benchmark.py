@@ -0,0 +1,126 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Measures the time to reconcile the identities of a vCluster with its existing user-mappings, against a client
+making no API call, so that only the time to work out the calls to make is measured.
+With --legacy, also measures the previous implementation (scan of the existing mappings per identity).
+
+Usage: python -m benchmarks.user_mappings_benchmark [--identities N [N ...]] [--runs N] [--legacy]
+"""
+
+from __future__ import annotations
+
+import timeit
+from argparse import ArgumentParser
+
+from cdk_gw_tools.cli_tools.user_mappings_tools import check_create_username_identity
+from cdk_gw_tools.specs.user_mappings import DetailedIdentity
+
+DEFAULT_IDENTITIES: list[int] = [2500, 5000, 10000]
+DEFAULT_RUNS: int = 5
+
+
+class NoopUserMappings:
+    """User mappings client counting the calls, without making them"""
+
+    def __init__(self):
+        self.calls: int = 0
+
+    def _call(self, *args, **kwargs) -> None:
+        self.calls += 1
+
+    create_mapping = update_mapping = delete_mapping = _call
+
+
+def get_identities(count: int) -> tuple[list[dict], list[DetailedIdentity]]:
+    """
+    Returns the existing mappings, and the identities to set: a quarter unchanged, a quarter with a new principal
+    (update), a quarter with a new username (rename) and a quarter new (create).
+    """
+    existing_mappings: list[dict] = []
+    identities: list[DetailedIdentity] = []
+    for _index in range(count):
+        _username, _principal = f"user-{_index}", f"principal-{_index}"
+        _case = _index % 4
+        if _case != 3:
+            existing_mappings.append({"username": _username, "principal": _principal})
+        if _case == 1:
+            _principal = f"new-principal-{_index}"
+        elif _case == 2:
+            _username = f"new-user-{_index}"
+        identities.append(
+            DetailedIdentity(username=_username, principal=_principal, groups=["app"])
+        )
+    return existing_mappings, identities
+
+
+def legacy_reconcile(
+    user_mappings: NoopUserMappings,
+    identities: list[DetailedIdentity],
+    existing_mappings: list[dict],
+) -> None:
+    """Previous check_create_username_identity, for detailed identities"""
+    existing_identities: list[tuple[str, str]] = [
+        (_mapping.get("username"), _mapping.get("principal"))
+        for _mapping in existing_mappings
+    ]
+    for identity in identities:
+        if (identity.username, identity.principal) in existing_identities:
+            user_mappings.update_mapping()
+            continue
+        for _existing_username, _existing_principal in existing_identities:
+            if (
+                identity.username == _existing_username
+                and identity.principal != _existing_principal
+            ):
+                user_mappings.update_mapping()
+                break
+            elif (
+                identity.username != _existing_username
+                and identity.principal == _existing_principal
+            ):
+                user_mappings.delete_mapping()
+                user_mappings.create_mapping()
+                break
+        else:
+            user_mappings.create_mapping()
+
+
+def current_reconcile(
+    user_mappings: NoopUserMappings,
+    identities: list[DetailedIdentity],
+    existing_mappings: list[dict],
+) -> None:
+    check_create_username_identity(user_mappings, identities, existing_mappings)
+
+
+def main():
+    parser = ArgumentParser("user_mappings_benchmark")
+    parser.add_argument("--identities", type=int, nargs="+", default=DEFAULT_IDENTITIES)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument(
+        "--legacy",
+        action="store_true",
+        help="Also measures the previous implementation, which time grows with the square of the identities",
+    )
+    args = parser.parse_args()
+    functions = [("current", current_reconcile)]
+    if args.legacy:
+        functions.insert(0, ("legacy", legacy_reconcile))
+    for _count in args.identities:
+        existing_mappings, identities = get_identities(_count)
+        for _name, _function in functions:
+            user_mappings = NoopUserMappings()
+            _time = timeit.timeit(
+                lambda: _function(user_mappings, identities, existing_mappings),
+                number=args.runs,
+            )
+            print(
+                f"{_name:<10} {_count:>8} identities {_time / args.runs * 1e3:10.1f} ms "
+                f"({user_mappings.calls // args.runs} calls)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,17 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Asyncio client and bulk tools. Requires aiohttp."""
+
+from cdk_gw_tools.aio.bulk import (
+    create_export_config_async,
+    import_mappings_from_file_async,
+    import_tenants_mappings_async,
+    set_update_interceptors_async,
+)
+from cdk_gw_tools.aio.client import (
+    AsyncApiClient,
+    AsyncInterceptors,
+    AsyncUserMappings,
+    AsyncVirtualClusters,
+)
@@ -0,0 +1,411 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Asyncio versions of the bulk tools. The plans and reports are the same as the synchronous tools',
+only the API calls are made with the AsyncApiClient, which bounds the number of calls in flight.
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+from cdk_proxy_api_client.errors import GenericNotFound
+from compose_x_common.compose_x_common import keyisset, set_else_none
+
+from cdk_gw_tools.aio.client import (
+    AsyncApiClient,
+    AsyncInterceptors,
+    AsyncUserMappings,
+    AsyncVirtualClusters,
+)
+from cdk_gw_tools.cli_tools.import_tenants_mappings import (
+    RECONCILE_OUTCOMES,
+    TenantSelector,
+    get_mapping_delete_error_outcome,
+    get_mapping_error_outcome,
+    get_mapping_update_outcome,
+    import_from_tenants_include_list,
+    log_mappings_summary,
+    plan_tenant_mappings,
+    select_included_tenants,
+    summarize_mappings_outcomes,
+)
+from cdk_gw_tools.cli_tools.plugins_catalogue import get_plugins_classes
+from cdk_gw_tools.cli_tools.set_update_interceptors import (
+    InterceptorKey,
+    build_interceptors_report,
+    format_interceptor_key,
+    get_interceptors_changes,
+    get_validated_desired_interceptors,
+)
+from cdk_gw_tools.cli_tools.user_mappings_tools import (
+    build_export_config,
+    collect_import_results,
+    get_definition_usernames,
+    get_usernames_to_delete,
+    get_vclusters_definitions,
+    group_identities_calls,
+    index_existing_identities,
+    validate_identities_are_unique,
+)
+from cdk_gw_tools.common.concurrency import DEFAULT_RETRIES, call_with_retries_async
+from cdk_gw_tools.common.logging import LOG
+from cdk_gw_tools.specs.user_mappings import UserMappings as UserMappingsDefinition
+from cdk_gw_tools.specs.user_mappings import UserMappingsConfig
+from cdk_gw_tools.specs.validators import validate_spec
+
+
+async def resolve_other_tenants_mappings_async(
+    vclusters: AsyncVirtualClusters, import_config: dict
+) -> list[dict]:
+    """Returns the topic mappings to import from other tenants, listing all the matched tenants concurrently"""
+    include_list = set_else_none("include_regex", import_config, [])
+    if not include_list:
+        raise ValueError("There must be at least one item in include_regex")
+    tenant_selector = TenantSelector(
+        (await vclusters.list_vclusters())["vclusters"],
+        set_else_none("exclude_regex", import_config, []),
+    )
+    matched_tenants: list[str] = select_included_tenants(tenant_selector, include_list)
+    tenants_mappings: dict[str, list[dict]] = dict(
+        zip(
+            matched_tenants,
+            await asyncio.gather(
+                *[
+                    vclusters.list_vcluster_topic_mappings(_tenant)
+                    for _tenant in matched_tenants
+                ]
+            ),
+        )
+    )
+    return import_from_tenants_include_list(
+        None,
+        include_list,
+        tenant_selector,
+        keyisset("process_tenant_only_once", import_config),
+        tenants_mappings,
+    )
+
+
+async def create_tenant_mapping_async(
+    vclusters: AsyncVirtualClusters,
+    mapping: dict,
+    vcluster_name: str,
+    ignore_conflicts: bool = False,
+) -> str:
+    """Creates a single topic mapping and returns the outcome: created, conflicted or failed"""
+    try:
+        await vclusters.create_vcluster_topic_mapping(
+            vcluster_name,
+            mapping["logicalTopicName"],
+            mapping["physicalTopicName"],
+            read_only=keyisset("readOnly", mapping),
+        )
+        return "created"
+    except Exception as error:
+        return get_mapping_error_outcome(error, ignore_conflicts)
+
+
+async def apply_tenant_mapping_change_async(
+    vclusters: AsyncVirtualClusters,
+    action: str,
+    mapping: dict,
+    vcluster_name: str,
+    ignore_conflicts: bool = False,
+) -> str:
+    """Applies a create, update (delete then create) or delete change from plan_tenant_mappings"""
+    if action in ["update", "delete"]:
+        try:
+            await vclusters.delete_vcluster_topic_mapping(
+                vcluster_name, mapping["logicalTopicName"]
+            )
+        except Exception as error:
+            return get_mapping_delete_error_outcome(error, mapping, vcluster_name)
+        if action == "delete":
+            return "deleted"
+        try:
+            _outcome = await create_tenant_mapping_async(
+                vclusters, mapping, vcluster_name, ignore_conflicts
+            )
+        except Exception as error:
+            _outcome = str(error)
+        return get_mapping_update_outcome(_outcome, mapping, vcluster_name)
+    return await create_tenant_mapping_async(
+        vclusters, mapping, vcluster_name, ignore_conflicts
+    )
+
+
+async def import_tenants_mappings_async(
+    client: AsyncApiClient,
+    config_content: dict,
+    tenant_name: str,
+    schema: dict = None,
+    reconcile: bool = False,
+    plan_only: bool = False,
+    remove_unset: bool = False,
+) -> list[dict] | dict[str, list[dict]]:
+    """Same as import_tenants_mappings, with all the mappings created/updated/deleted concurrently"""
+    validate_spec(config_content, "tenant_mappings", schema)
+    tenant_name = set_else_none("tenant_name", config_content, tenant_name)
+    ignore_conflicts = keyisset("ignore_duplicates_conflict", config_content)
+    vclusters = AsyncVirtualClusters(client)
+    mappings: list[dict] = list(config_content["mappings"])
+    import_from_other_tenants_config = set_else_none(
+        "import_from_tenant", config_content
+    )
+    if import_from_other_tenants_config:
+        mappings += await resolve_other_tenants_mappings_async(
+            vclusters, import_from_other_tenants_config
+        )
+    if reconcile or plan_only or remove_unset:
+        existing_mappings: list[dict] = await vclusters.list_vcluster_topic_mappings(
+            tenant_name
+        )
+        plan = plan_tenant_mappings(
+            existing_mappings, mappings, tenant_name, remove_unset
+        )
+        if plan_only:
+            return plan
+        if not any(plan.values()):
+            LOG.info(f"{tenant_name} - mappings are up to date")
+            return existing_mappings
+        changes: list[tuple[str, dict]] = [
+            (_action, _mapping)
+            for _action, _mappings in plan.items()
+            for _mapping in _mappings
+        ]
+        outcomes: list[str] = await asyncio.gather(
+            *[
+                apply_tenant_mapping_change_async(
+                    vclusters, _action, _mapping, tenant_name, ignore_conflicts
+                )
+                for _action, _mapping in changes
+            ]
+        )
+        summary = summarize_mappings_outcomes(
+            [_mapping for _, _mapping in changes], outcomes, RECONCILE_OUTCOMES
+        )
+    else:
+        outcomes: list[str] = await asyncio.gather(
+            *[
+                create_tenant_mapping_async(
+                    vclusters, _mapping, tenant_name, ignore_conflicts
+                )
+                for _mapping in mappings
+            ]
+        )
+        summary = summarize_mappings_outcomes(
+            mappings, outcomes, ["created", "conflicted", "failed"]
+        )
+    log_mappings_summary(tenant_name, summary)
+    return await vclusters.list_vcluster_topic_mappings(tenant_name)
+
+
+async def create_export_config_async(client: AsyncApiClient) -> UserMappingsConfig:
+    """Same as create_export_config, with all the usernames then all the identities retrieved concurrently"""
+    user_mappings = AsyncUserMappings(client)
+    vclusters_names: list[str | None] = (
+        await AsyncVirtualClusters(client).list_vclusters()
+    )["vclusters"] + [None]
+    vclusters_usernames: list[list[str]] = await asyncio.gather(
+        *[
+            user_mappings.list_mappings(_vcluster_name)
+            for _vcluster_name in vclusters_names
+        ]
+    )
+    identities_to_get: list[tuple[str | None, str]] = [
+        (_vcluster_name, _username)
+        for _vcluster_name, _usernames in zip(vclusters_names, vclusters_usernames)
+        for _username in _usernames
+    ]
+    identities: list[dict] = await asyncio.gather(
+        *[
+            user_mappings.get_user_mapping(_username, _vcluster_name)
+            for _vcluster_name, _username in identities_to_get
+        ]
+    )
+    return build_export_config(vclusters_names, identities_to_get, identities)
+
+
+async def set_identities_calls_async(
+    user_mappings: AsyncUserMappings,
+    identities_calls: list[tuple[str, dict]],
+    vcluster_name: str = None,
+) -> None:
+    """Makes the calls of a group from group_identities_calls, in order"""
+    for _method, _args in identities_calls:
+        await getattr(user_mappings, _method)(vcluster_name=vcluster_name, **_args)
+
+
+async def delete_mapping_async(
+    user_mappings: AsyncUserMappings, username: str, vcluster_name: str = None
+) -> None:
+    try:
+        await user_mappings.delete_mapping(username, vcluster_name)
+    except GenericNotFound:
+        LOG.debug(f"{vcluster_name or 'passthrough'} - {username} already deleted")
+
+
+async def import_vcluster_mappings_async(
+    user_mappings: AsyncUserMappings,
+    vcluster_name: str | None,
+    definition: UserMappingsDefinition,
+    remove_unset: bool = False,
+    dry_run: bool = False,
+) -> list[str]:
+    """
+    Same as import_vcluster_mappings, with the identities created/updated/deleted concurrently.
+    The calls for the same username are made in order, see group_identities_calls.
+    """
+    existing_mappings: list[dict] = await user_mappings.list_mappings_detailed(
+        vcluster_name
+    )
+    if not dry_run:
+        await asyncio.gather(
+            *[
+                set_identities_calls_async(user_mappings, _calls, vcluster_name)
+                for _calls in group_identities_calls(
+                    *index_existing_identities(existing_mappings),
+                    definition.identities,
+                )
+            ]
+        )
+    if not remove_unset:
+        return []
+    usernames_to_delete: list[str] = get_usernames_to_delete(
+        [_mapping["username"] for _mapping in existing_mappings],
+        get_definition_usernames(definition),
+        vcluster_name,
+        dry_run,
+    )
+    if not dry_run:
+        await asyncio.gather(
+            *[
+                delete_mapping_async(user_mappings, _username, vcluster_name)
+                for _username in usernames_to_delete
+            ]
+        )
+    return usernames_to_delete
+
+
+async def import_mappings_from_file_async(
+    client: AsyncApiClient,
+    config: dict,
+    remove_unset: bool = False,
+    dry_run: bool = False,
+) -> dict[str, list[str]]:
+    """
+    Same as import_mappings_from_file, with all the vClusters processed concurrently.
+    The passthrough mappings are always processed last.
+    """
+    mappings_config = validate_identities_are_unique(config)
+    user_mappings = AsyncUserMappings(client)
+
+    async def import_vcluster(
+        vcluster_definition: tuple[str, UserMappingsDefinition]
+    ) -> tuple[list[str] | None, Exception | None]:
+        _vcluster_name, _definition = vcluster_definition
+        try:
+            return (
+                await import_vcluster_mappings_async(
+                    user_mappings,
+                    None if _vcluster_name == "passthrough" else _vcluster_name,
+                    _definition,
+                    remove_unset,
+                    dry_run,
+                ),
+                None,
+            )
+        except Exception as error:
+            LOG.exception(error)
+            LOG.error(f"{_vcluster_name} - failed to import user-mappings")
+            return None, error
+
+    vclusters_definitions = get_vclusters_definitions(mappings_config)
+    results = list(
+        await asyncio.gather(
+            *[
+                import_vcluster(_vcluster_definition)
+                for _vcluster_definition in vclusters_definitions
+            ]
+        )
+    )
+    if "passthrough" in mappings_config.userMappings:
+        vclusters_definitions.append(
+            ("passthrough", mappings_config.userMappings["passthrough"])
+        )
+        results.append(await import_vcluster(vclusters_definitions[-1]))
+    return collect_import_results(vclusters_definitions, results, remove_unset)
+
+
+async def apply_interceptor_change_async(
+    interceptors_client: AsyncInterceptors,
+    interceptor_key: InterceptorKey,
+    plugin_config: dict | None,
+    retries: int = DEFAULT_RETRIES,
+) -> Exception | None:
+    """Same as apply_interceptor_change. Returns the error if the change ultimately failed"""
+    interceptor_name, is_global, vcluster_name, group_name, username = interceptor_key
+    try:
+        if plugin_config is None:
+            try:
+                await call_with_retries_async(
+                    interceptors_client.delete_interceptor,
+                    interceptor_name,
+                    is_global=is_global,
+                    vcluster_name=vcluster_name,
+                    group_name=group_name,
+                    username=username,
+                    retries=retries,
+                )
+            except GenericNotFound:
+                LOG.debug(
+                    f"{format_interceptor_key(interceptor_key)} - already deleted"
+                )
+        else:
+            await call_with_retries_async(
+                interceptors_client.update_interceptor,
+                interceptor_name,
+                interceptor_config=plugin_config,
+                is_global=is_global,
+                vcluster_name=vcluster_name,
+                group_name=group_name,
+                username=username,
+                retries=retries,
+            )
+        return None
+    except Exception as error:
+        LOG.error(f"{format_interceptor_key(interceptor_key)} - {error}")
+        return error
+
+
+async def set_update_interceptors_async(
+    client: AsyncApiClient,
+    interceptors: dict,
+    remove_unset: bool = False,
+    retries: int = DEFAULT_RETRIES,
+    plugins_cache_ttl: int = 0,
+    refresh_plugins_cache: bool = False,
+) -> dict[str, list[str] | int]:
+    """
+    Same as set_update_interceptors, with all the changes applied concurrently.
+    The plugins catalogue is retrieved with the (cached) synchronous client, in a thread.
+    """
+    interceptors_client = AsyncInterceptors(client)
+    plugins_classes: set[str] = await asyncio.to_thread(
+        get_plugins_classes, client.proxy, plugins_cache_ttl, refresh_plugins_cache
+    )
+    desired = get_validated_desired_interceptors(interceptors, plugins_classes)
+    changes, unchanged = get_interceptors_changes(
+        desired, await interceptors_client.get_all_gw_interceptors(), remove_unset
+    )
+    errors: list[Exception | None] = await asyncio.gather(
+        *[
+            apply_interceptor_change_async(
+                interceptors_client, _interceptor_key, _plugin_config, retries
+            )
+            for _interceptor_key, _plugin_config in changes
+        ]
+    )
+    return build_interceptors_report(changes, errors, unchanged)
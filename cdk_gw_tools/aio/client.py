@@ -0,0 +1,301 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Asyncio client for the Gateway admin API calls used by the bulk tools.
+All the calls of a client share one connections pool, and at most `concurrency` calls are in flight.
+Requires aiohttp.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import ssl
+from json import loads
+from os import environ, path
+from typing import Any
+from urllib.parse import quote
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.errors import GenericNotFound, ProxyApiException
+from cdk_proxy_api_client.exceptions import (
+    TopicOrVirtualClusterNotFound,
+    VirtualClusterNotFound,
+)
+from cdk_proxy_api_client.interceptors import Interceptors
+from cdk_proxy_api_client.proxy_api import ProxyClient
+from cdk_proxy_api_client.user_mappings import UserMappings
+from cdk_proxy_api_client.vclusters import VirtualClusters
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+from cdk_gw_tools.common.concurrency import DEFAULT_CONCURRENCY
+from cdk_gw_tools.common.logging import LOG
+from cdk_gw_tools.common.rate_limiter import RateLimiter
+
+
+def get_ssl_context(verify_ssl: bool) -> ssl.SSLContext | bool:
+    """
+    Returns the SSL setting of the aiohttp connector matching the verify of the sync (requests) client: False to not
+    verify the certificates, else a context with the CA bundle requests uses (REQUESTS_CA_BUNDLE, CURL_CA_BUNDLE
+    or certifi).
+    """
+    if not verify_ssl:
+        return False
+    ca_bundle: str = (
+        environ.get("REQUESTS_CA_BUNDLE")
+        or environ.get("CURL_CA_BUNDLE")
+        or DEFAULT_CA_BUNDLE_PATH
+    )
+    if path.isdir(ca_bundle):
+        return ssl.create_default_context(capath=ca_bundle)
+    return ssl.create_default_context(cafile=ca_bundle)
+
+
+class AsyncApiClient:
+    """
+    Async counterpart of the ApiClient, re-using its URL, credentials and SSL settings.
+    Use as an async context manager to open and close the HTTP session.
+    With a rate_limiter, all the API calls are rate limited.
+    """
+
+    def __init__(
+        self,
+        client: ApiClient,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        rate_limiter: RateLimiter = None,
+    ):
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp is required for the asyncio client. Install it with pip install cdk-gw-tools[aio]"
+            )
+        self.client = client
+        self.proxy = ProxyClient(client)
+        self.concurrency = max(concurrency, 1)
+        self.rate_limiter = rate_limiter
+        self._semaphore: asyncio.Semaphore | None = None
+        self._session: aiohttp.ClientSession | None = None
+
+    async def __aenter__(self) -> AsyncApiClient:
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        auth = (
+            aiohttp.BasicAuth(self.client.username, self.client.password)
+            if self.client.username
+            else None
+        )
+        self._session = aiohttp.ClientSession(
+            auth=auth,
+            connector=aiohttp.TCPConnector(
+                limit=self.concurrency, ssl=get_ssl_context(self.client.verify_ssl)
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._session.close()
+        self._session = None
+
+    async def request(self, method: str, query_path: str, **kwargs) -> Any:
+        """
+        Makes the API call and returns the JSON payload (or text if not JSON, None if empty).
+        Raises the same exceptions as the ApiClient for non 2xx responses.
+        """
+        if self._session is None:
+            raise RuntimeError("AsyncApiClient must be used with async with")
+        if not query_path.startswith(r"/"):
+            query_path = f"/{query_path}"
+        async with self._semaphore:
+            LOG.debug(f"{method} {query_path}")
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async()
+            status: int | None = None
+            try:
+                async with self._session.request(
+                    method, f"{self.client.url}{query_path}", **kwargs
+                ) as response:
+                    status = response.status
+                    body: str = await response.text()
+            finally:
+                if self.rate_limiter:
+                    self.rate_limiter.release(status)
+        try:
+            payload = loads(body) if body else None
+        except ValueError:
+            payload = body
+        if status not in [200, 201, 202, 204]:
+            raise ProxyApiException(status, ((method, query_path), payload))
+        return payload
+
+    async def get(self, query_path: str, **kwargs) -> Any:
+        return await self.request("GET", query_path, **kwargs)
+
+    async def post(self, query_path: str, **kwargs) -> Any:
+        return await self.request("POST", query_path, **kwargs)
+
+    async def put(self, query_path: str, **kwargs) -> Any:
+        return await self.request("PUT", query_path, **kwargs)
+
+    async def delete(self, query_path: str, **kwargs) -> Any:
+        return await self.request("DELETE", query_path, **kwargs)
+
+
+class AsyncVirtualClusters:
+    """Async VirtualClusters calls used by the topic mappings import"""
+
+    def __init__(self, client: AsyncApiClient):
+        self.client = client
+        self.base_path: str = VirtualClusters(client.proxy).base_path
+
+    async def list_vclusters(self) -> dict:
+        return await self.client.get(
+            f"{self.base_path}/", headers={"Accept": "application/json"}
+        )
+
+    async def list_vcluster_topic_mappings(self, vcluster: str) -> list[dict]:
+        try:
+            return await self.client.get(
+                f"{self.base_path}/vcluster/{vcluster}/topics",
+                headers={"Accept": "application/json"},
+            )
+        except GenericNotFound:
+            raise VirtualClusterNotFound(vcluster)
+
+    async def create_vcluster_topic_mapping(
+        self,
+        vcluster: str,
+        logical_topic_name: str,
+        physical_topic_name: str,
+        read_only: bool = False,
+        cluster_id: str = None,
+    ) -> Any:
+        payload: dict = {
+            "physicalTopicName": physical_topic_name,
+            "readOnly": read_only,
+            "type": "alias",
+        }
+        if cluster_id:
+            payload["clusterId"] = cluster_id
+        return await self.client.post(
+            f"{self.base_path}/vcluster/{vcluster}/topics/{quote(logical_topic_name)}",
+            json=payload,
+        )
+
+    async def delete_vcluster_topic_mapping(
+        self, vcluster: str, logical_topic_name: str
+    ) -> Any:
+        try:
+            return await self.client.delete(
+                f"{self.base_path}/vcluster/{vcluster}/topics/{quote(logical_topic_name)}"
+            )
+        except GenericNotFound:
+            raise TopicOrVirtualClusterNotFound(vcluster, logical_topic_name)
+
+
+class AsyncUserMappings:
+    """Async UserMappings calls used by the user-mappings import/export"""
+
+    def __init__(self, client: AsyncApiClient):
+        self.client = client
+        self._user_mappings = UserMappings(client.proxy)
+        self.base_path: str = self._user_mappings.base_path
+
+    def get_vcluster_path(self, vcluster_name: str = None) -> str:
+        if vcluster_name:
+            return f"{self.base_path}/vcluster/{vcluster_name}"
+        return self.base_path
+
+    async def list_mappings(self, vcluster_name: str = None) -> list[str]:
+        return await self.client.get(self.get_vcluster_path(vcluster_name))
+
+    async def get_user_mapping(self, username: str, vcluster_name: str = None) -> dict:
+        return await self.client.get(
+            f"{self.get_vcluster_path(vcluster_name)}/username/{quote(username)}"
+        )
+
+    async def list_mappings_detailed(self, vcluster_name: str = None) -> list[dict]:
+        """Lists the usernames, then gets all the identities concurrently"""
+        return list(
+            await asyncio.gather(
+                *[
+                    self.get_user_mapping(_username, vcluster_name)
+                    for _username in await self.list_mappings(vcluster_name)
+                ]
+            )
+        )
+
+    async def create_mapping(
+        self,
+        username: str,
+        principal: str = None,
+        groups: list[str] = None,
+        vcluster_name: str = None,
+    ) -> Any:
+        _payload, _ = self._user_mappings.set_update_payload(
+            username, principal, groups, vcluster_name
+        )
+        return await self.client.post(
+            self.get_vcluster_path(vcluster_name), json=_payload
+        )
+
+    async def update_mapping(
+        self,
+        username: str,
+        principal: str = None,
+        groups: list[str] = None,
+        vcluster_name: str = None,
+    ) -> Any:
+        _payload, _path = self._user_mappings.set_update_payload(
+            username, principal, groups, vcluster_name
+        )
+        return await self.client.put(_path, json=_payload)
+
+    async def delete_mapping(self, username: str, vcluster_name: str = None) -> Any:
+        return await self.client.delete(
+            f"{self.get_vcluster_path(vcluster_name)}/username/{quote(username)}"
+        )
+
+
+class AsyncInterceptors:
+    """Async Interceptors calls used by the interceptors import"""
+
+    def __init__(self, client: AsyncApiClient):
+        self.client = client
+        self._interceptors = Interceptors(client.proxy)
+
+    async def get_all_gw_interceptors(self) -> dict | list:
+        return await self.client.get(f"{self._interceptors.base_path}/all")
+
+    async def update_interceptor(
+        self,
+        interceptor_name: str,
+        interceptor_config: dict,
+        is_global: bool = False,
+        vcluster_name: str = None,
+        username: str = None,
+        group_name: str = None,
+    ) -> Any:
+        return await self.client.put(
+            self._interceptors.generate_interceptor_path(
+                interceptor_name, is_global, vcluster_name, username, group_name
+            ),
+            json=interceptor_config,
+            headers=ApiClient.json_headers,
+        )
+
+    async def delete_interceptor(
+        self,
+        interceptor_name: str,
+        is_global: bool = False,
+        vcluster_name: str = None,
+        username: str = None,
+        group_name: str = None,
+    ) -> Any:
+        return await self.client.delete(
+            self._interceptors.generate_interceptor_path(
+                interceptor_name, is_global, vcluster_name, username, group_name
+            )
+        )
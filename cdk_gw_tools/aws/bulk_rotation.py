@@ -0,0 +1,283 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Rotates many vCluster secrets at once: reads all the secrets, decodes their JWT token, and for the ones
+expiring within the rotation window, soonest first, creates the new tokens in batches, then puts the new
+secret values as AWSCURRENT, concurrently.
+Run on a schedule, it refreshes the tokens before they expire, with the calls spread over time.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import time
+from functools import partial
+from typing import TYPE_CHECKING, Callable
+from uuid import uuid4
+from weakref import WeakKeyDictionary
+
+if TYPE_CHECKING:
+    from boto3 import Session
+
+from cdk_gw_tools.aws.gw_handling import (
+    BATCH_TOKENS_CONCURRENCY,
+    CENTRAL_FUNCTION_ARN_TO_INVOKE,
+    NEW_TOKEN_LIFETIME_IN_SECONDS,
+    build_new_secret_value,
+    create_tokens_batch,
+    get_tokens_from_central_function,
+    get_vcluster_details_from_token,
+    logger,
+)
+from cdk_gw_tools.common.concurrency import run_concurrently
+from cdk_gw_tools.common.rate_limiter import TokenBucket
+
+DEFAULT_ROTATION_WINDOW: int = 86400
+# Seconds kept, after the last batch starts, to create its tokens and put its secrets before the Lambda times out
+LAMBDA_TIMEOUT_MARGIN: float = 20.0
+
+_SESSIONS_SECRETS_CLIENTS: WeakKeyDictionary = WeakKeyDictionary()
+
+
+def get_secrets_client(session: Session, concurrency: int = BATCH_TOKENS_CONCURRENCY):
+    """
+    Secrets Manager client with enough connections for all the concurrent calls, created once per session
+    and pool size, and re-used across invocations
+    """
+    max_pool_connections: int = max(concurrency, 10)
+    clients: dict = _SESSIONS_SECRETS_CLIENTS.setdefault(session, {})
+    if max_pool_connections not in clients:
+        from botocore.config import Config
+
+        clients[max_pool_connections] = session.client(
+            "secretsmanager",
+            config=Config(max_pool_connections=max_pool_connections),
+        )
+    return clients[max_pool_connections]
+
+
+def list_secrets_by_tags(secrets_client, tags: dict[str, str]) -> list[str]:
+    """
+    Returns the ARN of the secrets having all the tags. Secrets Manager filters on tag keys and values separately,
+    so the tags of the secrets listed are checked again.
+    """
+    filters: list[dict] = []
+    for _key, _value in tags.items():
+        filters.append({"Key": "tag-key", "Values": [_key]})
+        filters.append({"Key": "tag-value", "Values": [_value]})
+    secrets_arns: list[str] = []
+    for _page in secrets_client.get_paginator("list_secrets").paginate(Filters=filters):
+        for _secret in _page["SecretList"]:
+            secret_tags: dict = {
+                _tag["Key"]: _tag["Value"] for _tag in _secret.get("Tags", [])
+            }
+            if all(secret_tags.get(_key) == _value for _key, _value in tags.items()):
+                secrets_arns.append(_secret["ARN"])
+    return secrets_arns
+
+
+def get_secret_rotation_details(secrets_client, secret_id: str) -> dict:
+    """Returns the current value of the secret and the details of its JWT token, or the error"""
+    details: dict = {"SecretId": secret_id}
+    try:
+        current_value = json.loads(
+            secrets_client.get_secret_value(
+                SecretId=secret_id, VersionStage="AWSCURRENT"
+            )["SecretString"]
+        )
+        if not isinstance(current_value, dict):
+            raise TypeError(
+                "The current value of the secret must be a dict. Got {}".format(
+                    type(current_value)
+                )
+            )
+        details["current_value"] = current_value
+        details["jwt"] = get_vcluster_details_from_token(current_value["SASL_PASSWORD"])
+    except Exception as error:
+        logger.error(f"{secret_id} - Failed to read the secret JWT token - {error}")
+        details["error"] = str(error)
+    return details
+
+
+def put_new_secret_value(secrets_client, secret_id: str, new_value: dict) -> None:
+    """Puts the new version of the secret. Without VersionStages, it is promoted to AWSCURRENT"""
+    secrets_client.put_secret_value(
+        SecretId=secret_id,
+        ClientRequestToken=str(uuid4()),
+        SecretString=json.dumps(new_value),
+    )
+
+
+def get_rotation_schedule(
+    secrets_details: list[dict], rotation_window: int
+) -> tuple[list[dict], list[dict]]:
+    """
+    Orders the secrets in a min-heap by token expiry, and returns the secrets which token expires within
+    rotation_window seconds, soonest to expire first, and the other secrets.
+    """
+    expiry_heap: list[tuple[float, int, dict]] = [
+        (_details["jwt"].get("exp", 0), _index, _details)
+        for _index, _details in enumerate(secrets_details)
+    ]
+    heapq.heapify(expiry_heap)
+    expiry_limit = time.time() + rotation_window
+    to_rotate: list[dict] = []
+    while expiry_heap and expiry_heap[0][0] <= expiry_limit:
+        to_rotate.append(heapq.heappop(expiry_heap)[2])
+    return to_rotate, [_entry[2] for _entry in expiry_heap]
+
+
+def get_spread_before_deadline(spread: float, deadline: float) -> float:
+    """Returns the spread, reduced if needed so that the last batch starts before deadline (time.monotonic())"""
+    time_left: float = max(deadline - time.monotonic(), 0)
+    if spread > time_left:
+        logger.warning(
+            f"Spread of {spread}s reduced to {time_left:.1f}s to finish before the function times out"
+        )
+        return time_left
+    return spread
+
+
+def rotate_secrets(
+    secrets_client,
+    secrets_ids: list[str],
+    create_tokens: Callable[[list[dict]], list[dict]],
+    rotation_window: int = DEFAULT_ROTATION_WINDOW,
+    token_lifetime: int = NEW_TOKEN_LIFETIME_IN_SECONDS,
+    concurrency: int = BATCH_TOKENS_CONCURRENCY,
+    dry_run: bool = False,
+    spread: float = 0,
+    deadline: float = None,
+) -> dict:
+    """
+    Rotates the secrets which JWT token expires within rotation_window seconds, soonest to expire first.
+    create_tokens gets the list of tokens requests (vcluster, username, expiry), and returns in the same order
+    each request with its token, or the error.
+    With spread, the tokens are created in batches of `concurrency`, evenly spaced over `spread` seconds,
+    instead of all at once. With deadline (time.monotonic()), the spread is reduced so that all the batches
+    start before it.
+    A batch which fails to get its tokens or put its secrets is reported as failed, and the next batches rotated.
+    Returns the secrets rotated, the secrets skipped with their token expiry, and the secrets failed with the error.
+    """
+    report: dict = {"rotated": [], "skipped": {}, "failed": {}}
+    secrets_details: list[dict] = run_concurrently(
+        lambda _secret_id: get_secret_rotation_details(secrets_client, _secret_id),
+        list(dict.fromkeys(secrets_ids)),
+        concurrency,
+    )
+    for _details in secrets_details:
+        if "error" in _details:
+            report["failed"][_details["SecretId"]] = _details["error"]
+    to_rotate, to_skip = get_rotation_schedule(
+        [_details for _details in secrets_details if "error" not in _details],
+        rotation_window,
+    )
+    for _details in to_skip:
+        report["skipped"][_details["SecretId"]] = _details["jwt"]["exp"]
+    logger.info(
+        f"Secrets to rotate: {len(to_rotate)}, skipped: {len(report['skipped'])}, failed: {len(report['failed'])}"
+    )
+    if dry_run or not to_rotate:
+        report["rotated"] = [_details["SecretId"] for _details in to_rotate]
+        return report
+
+    def put_secret(details_token: tuple[dict, dict]) -> None:
+        _details, _token = details_token
+        try:
+            if "token" not in _token:
+                raise ValueError(_token.get("error", "No token created"))
+            put_new_secret_value(
+                secrets_client,
+                _details["SecretId"],
+                build_new_secret_value(
+                    _details["current_value"], _details["jwt"], _token["token"]
+                ),
+            )
+            report["rotated"].append(_details["SecretId"])
+        except Exception as error:
+            logger.error(f"{_details['SecretId']} - Failed to rotate - {error}")
+            report["failed"][_details["SecretId"]] = str(error)
+
+    def rotate_batch(batch: list[dict]) -> None:
+        try:
+            tokens: list[dict] = create_tokens(
+                [
+                    {
+                        "vcluster": _details["jwt"]["vcluster"],
+                        "username": _details["jwt"]["username"],
+                        "expiry": token_lifetime,
+                    }
+                    for _details in batch
+                ]
+            )
+            if len(tokens) != len(batch):
+                raise ValueError(
+                    f"Got {len(tokens)} tokens for {len(batch)} tokens requests"
+                )
+            run_concurrently(put_secret, list(zip(batch, tokens)), concurrency)
+        except Exception as error:
+            logger.error(f"Failed to rotate a batch of {len(batch)} secrets - {error}")
+            for _details in batch:
+                if _details["SecretId"] not in report["rotated"]:
+                    report["failed"].setdefault(_details["SecretId"], str(error))
+
+    if spread > 0 and deadline is not None:
+        spread = get_spread_before_deadline(spread, deadline)
+    batch_size: int = max(concurrency, 1) if spread > 0 else len(to_rotate)
+    batches: list[list[dict]] = [
+        to_rotate[_start : _start + batch_size]
+        for _start in range(0, len(to_rotate), batch_size)
+    ]
+    pacing = TokenBucket(len(batches) / spread, 1) if spread > 0 else None
+    for _batch in batches:
+        if pacing:
+            time.sleep(pacing.reserve())
+        rotate_batch(_batch)
+    logger.info(
+        f"Secrets rotated: {len(report['rotated'])}, failed: {len(report['failed'])}"
+    )
+    return report
+
+
+def rotate_secrets_from_lambda(
+    lambda_session: Session, rotation_config: dict, context=None
+) -> dict:
+    """
+    Bulk rotation from the Lambda function. The secrets are the secret_ids, and/or the ones with all the tags.
+    The tokens are created by the central function if set, else with the GW admin credentials.
+    With the Lambda context, the spread is capped to the remaining time of the invocation, minus LAMBDA_TIMEOUT_MARGIN.
+    """
+    deadline: float | None = (
+        time.monotonic()
+        + context.get_remaining_time_in_millis() / 1000
+        - LAMBDA_TIMEOUT_MARGIN
+        if context is not None
+        else None
+    )
+    concurrency = int(rotation_config.get("concurrency") or BATCH_TOKENS_CONCURRENCY)
+    secrets_client = get_secrets_client(lambda_session, concurrency)
+    secrets_ids: list[str] = list(rotation_config.get("secret_ids", []))
+    if rotation_config.get("tags"):
+        secrets_ids += list_secrets_by_tags(secrets_client, rotation_config["tags"])
+    create_tokens = partial(
+        (
+            get_tokens_from_central_function
+            if CENTRAL_FUNCTION_ARN_TO_INVOKE
+            else create_tokens_batch
+        ),
+        lambda_session,
+        concurrency=concurrency,
+    )
+    return rotate_secrets(
+        secrets_client,
+        secrets_ids,
+        create_tokens,
+        int(rotation_config.get("rotation_window") or DEFAULT_ROTATION_WINDOW),
+        int(rotation_config.get("token_lifetime") or NEW_TOKEN_LIFETIME_IN_SECONDS),
+        concurrency,
+        bool(rotation_config.get("dry_run")),
+        float(rotation_config.get("spread") or 0),
+        deadline,
+    )
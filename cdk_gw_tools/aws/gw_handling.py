@@ -6,19 +6,21 @@ from __future__ import annotations
 import json
 import logging
 import os
-import re
-from copy import deepcopy
+import time
 from datetime import datetime
+from functools import lru_cache
+from typing import TYPE_CHECKING
+from weakref import WeakKeyDictionary
 
-import jwt
-import yaml
-from boto3 import Session
-from cdk_proxy_api_client.client_wrapper import ApiClient
-from cdk_proxy_api_client.proxy_api import ProxyClient
-from cdk_proxy_api_client.vclusters import VirtualClusters
-from compose_x_common.aws import get_assume_role_session
 from compose_x_common.compose_x_common import keyisset
 
+if TYPE_CHECKING:
+    from boto3 import Session
+    from cdk_proxy_api_client.vclusters import VirtualClusters
+
+# jwt, yaml, cdk_proxy_api_client and compose_x_common.aws are imported in the functions using them,
+# as not all the rotation paths need them, to keep the Lambda cold start short.
+
 if logging.getLogger().hasHandlers():
     logging.getLogger().setLevel(logging.INFO)
 else:
@@ -32,15 +34,39 @@ NEW_TOKEN_LIFETIME_IN_SECONDS = int(
     os.environ.get("NEW_TOKEN_LIFETIME_IN_SECONDS", 3660)
 )
 CENTRAL_FUNCTION_ARN_TO_INVOKE = os.environ.get("GW_ROTATION_MANAGER_FUNCTION_ARN")
-if not CENTRAL_FUNCTION_ARN_TO_INVOKE:
-    print(
-        "No GW_ROTATION_MANAGER_FUNCTION_ARN set. Will attempt talking to GW directly."
-    )
-if not CENTRAL_FUNCTION_ARN_TO_INVOKE and not CDK_API_ENDPOINT:
-    raise OSError(
-        "CDK_API_ENDPOINT not set and no GW_ROTATION_MANAGER_FUNCTION_ARN to invoke."
-        "One of the two must be set."
-    )
+ADMIN_CREDS_CACHE_TTL = int(os.environ.get("GW_ADMIN_CREDS_CACHE_TTL", 300))
+ASSUMED_ROLE_EXPIRY_MARGIN = 60
+BATCH_TOKENS_CONCURRENCY = int(os.environ.get("BATCH_TOKENS_CONCURRENCY", 10))
+# Maximum number of tokens requested per invocation of the central function, to stay within the payload limits.
+CENTRAL_FUNCTION_BATCH_SIZE = int(os.environ.get("CENTRAL_FUNCTION_BATCH_SIZE", 500))
+
+
+_SESSIONS_CLIENTS: WeakKeyDictionary = WeakKeyDictionary()
+# Caches of the GW admin secret per secret ARN, and of the assumed role sessions per role ARN,
+# with the time until which they are valid, re-used by warm invocations.
+_ADMIN_CREDS_CACHE: dict[str, tuple[float, dict]] = {}
+_ASSUMED_ROLE_SESSIONS: dict[str, tuple[float, Session]] = {}
+
+
+def check_rotation_environment() -> None:
+    """Ensures the Lambda function can get new tokens, either from GW directly or the central function"""
+    if not CENTRAL_FUNCTION_ARN_TO_INVOKE:
+        print(
+            "No GW_ROTATION_MANAGER_FUNCTION_ARN set. Will attempt talking to GW directly."
+        )
+    if not CENTRAL_FUNCTION_ARN_TO_INVOKE and not CDK_API_ENDPOINT:
+        raise OSError(
+            "CDK_API_ENDPOINT not set and no GW_ROTATION_MANAGER_FUNCTION_ARN to invoke."
+            "One of the two must be set."
+        )
+
+
+def get_session_client(session: Session, service_name: str):
+    """Returns the boto3 client for the service, created once per session and re-used across invocations"""
+    clients: dict = _SESSIONS_CLIENTS.setdefault(session, {})
+    if service_name not in clients:
+        clients[service_name] = session.client(service_name)
+    return clients[service_name]
 
 
 def new_gateway_vcluster_secret_value(
@@ -57,9 +83,9 @@ def new_gateway_vcluster_secret_value(
     If the current value is just a string, we replace it as-is.
     If the current value is a dict, we try upate the value of each key, if the old value is found in the dict value
     """
-    current_jwt_token = current_value["SASL_PASSWORD"]
-    current_username = current_value["SASL_USERNAME"]
-    jwt_token_details: dict = get_vcluster_details_from_token(current_jwt_token)
+    jwt_token_details: dict = get_vcluster_details_from_token(
+        current_value["SASL_PASSWORD"]
+    )
     logger.info(
         "Token expiry was set to {}".format(
             datetime.utcfromtimestamp(jwt_token_details["exp"]).strftime("%FT%T")
@@ -71,15 +97,13 @@ def new_gateway_vcluster_secret_value(
             lambda_session, jwt_token_details
         )
     else:
-        gateway_secret = get_cdk_gw_admin_creds(lambda_session)
-        logger.info("Successfully retrieved GW admin credentials")
         try:
             logger.info(
                 f"creating token for vcluster - {jwt_token_details['vcluster']} - {jwt_token_details['username']}"
             )
 
-            new_jwt_token = get_new_token_for_vcluster(
-                gateway_secret, jwt_token_details, NEW_TOKEN_LIFETIME_IN_SECONDS
+            new_jwt_token = get_new_token_with_admin_creds(
+                lambda_session, jwt_token_details, NEW_TOKEN_LIFETIME_IN_SECONDS
             )
         except Exception as error:
             logger.exception(error)
@@ -89,14 +113,25 @@ def new_gateway_vcluster_secret_value(
                 )
             )
             raise
-    new_secret_value = replace_string_in_dict_values(
+    return build_new_secret_value(current_value, jwt_token_details, new_jwt_token)
+
+
+def build_new_secret_value(
+    current_value: dict, jwt_token_details: dict, new_jwt_token: str
+) -> dict:
+    """Returns a copy of the current secret value, with the username and token of the new JWT token"""
+    new_secret_value = replace_strings_in_values(
         current_value,
-        current_username,
-        jwt_token_details["username"],
-        True,
+        {
+            current_value["SASL_USERNAME"]: jwt_token_details["username"],
+            current_value["SASL_PASSWORD"]: new_jwt_token,
+        },
+    )
+    return (
+        dict(new_secret_value)
+        if new_secret_value is current_value
+        else new_secret_value
     )
-    replace_string_in_dict_values(new_secret_value, current_jwt_token, new_jwt_token)
-    return new_secret_value
 
 
 def get_token_from_central_function(
@@ -104,7 +139,9 @@ def get_token_from_central_function(
 ) -> str:
     """Function that will invoke sync another Function in charge of getting the new token from a central function"""
     cdk_api_secret_arn = os.environ.get("CDK_API_SECRET_ARN_ROLE")
-    client = set_calls_clients(cdk_api_secret_arn, lambda_session).client("lambda")
+    client = get_session_client(
+        set_calls_clients(cdk_api_secret_arn, lambda_session), "lambda"
+    )
     try:
         new_token_r = client.invoke(
             FunctionName=CENTRAL_FUNCTION_ARN_TO_INVOKE,
@@ -123,19 +160,87 @@ def get_token_from_central_function(
     return res["token"]
 
 
+def get_tokens_from_central_function(
+    lambda_session: Session,
+    tokens_requests: list[dict],
+    concurrency: int = BATCH_TOKENS_CONCURRENCY,
+) -> list[dict]:
+    """
+    Invokes the central function with batches of tokens requests, up to CENTRAL_FUNCTION_BATCH_SIZE each.
+    Returns, in the same order, each entry with its token, or the error for that entry.
+    """
+    cdk_api_secret_arn = os.environ.get("CDK_API_SECRET_ARN_ROLE")
+    client = get_session_client(
+        set_calls_clients(cdk_api_secret_arn, lambda_session), "lambda"
+    )
+    results: list[dict] = []
+    for _start in range(0, len(tokens_requests), CENTRAL_FUNCTION_BATCH_SIZE):
+        try:
+            batch_r = client.invoke(
+                FunctionName=CENTRAL_FUNCTION_ARN_TO_INVOKE,
+                Payload=json.dumps(
+                    {
+                        "tokens": tokens_requests[
+                            _start : _start + CENTRAL_FUNCTION_BATCH_SIZE
+                        ],
+                        "concurrency": concurrency,
+                    }
+                ),
+            )
+            results += json.loads(batch_r["Payload"].read())["tokens"]
+        except Exception as error:
+            print("Remote function invoke failure", error)
+            raise
+    return results
+
+
 def set_calls_clients(cdk_api_secret_arn: str, lambda_session: Session) -> Session:
     cdk_api_secret_role_arn = os.environ.get("CDK_API_SECRET_ARN_ROLE", None)
     if cdk_api_secret_role_arn and cdk_api_secret_arn.startswith("arn:aws"):
-        return get_assume_role_session(lambda_session, cdk_api_secret_role_arn)
+        return get_assumed_role_session(lambda_session, cdk_api_secret_role_arn)
     return lambda_session
 
 
+def get_assumed_role_session(lambda_session: Session, role_arn: str) -> Session:
+    """
+    Returns the session for the assumed role. The session is cached until ADMIN_CREDS_CACHE_TTL,
+    or until its credentials are about to expire if sooner.
+    """
+    cached = _ASSUMED_ROLE_SESSIONS.get(role_arn)
+    now = time.time()
+    if cached and cached[0] > now:
+        return cached[1]
+    from compose_x_common.aws import get_assume_role_session
+
+    session, creds = get_assume_role_session(
+        lambda_session, role_arn, include_full_return=True
+    )
+    _ASSUMED_ROLE_SESSIONS[role_arn] = (
+        min(
+            now + ADMIN_CREDS_CACHE_TTL,
+            creds["Credentials"]["Expiration"].timestamp() - ASSUMED_ROLE_EXPIRY_MARGIN,
+        ),
+        session,
+    )
+    return session
+
+
+def invalidate_cdk_gw_admin_creds(invalidate_sessions: bool = False) -> None:
+    """Clears the cached GW admin secret, and the assumed role sessions if invalidate_sessions is set"""
+    _ADMIN_CREDS_CACHE.clear()
+    if invalidate_sessions:
+        _ASSUMED_ROLE_SESSIONS.clear()
+
+
 def get_cdk_gw_admin_creds(lambda_session: Session) -> dict:
     cdk_api_secret_arn = os.environ.get("CDK_API_SECRET_ARN")
     if not cdk_api_secret_arn:
         raise OSError("CDK_API_SECRET_ARN must be set.")
-    client = set_calls_clients(cdk_api_secret_arn, lambda_session).client(
-        "secretsmanager"
+    cached = _ADMIN_CREDS_CACHE.get(cdk_api_secret_arn)
+    if cached and cached[0] > time.time():
+        return cached[1]
+    client = get_session_client(
+        set_calls_clients(cdk_api_secret_arn, lambda_session), "secretsmanager"
     )
     try:
         secret_value = client.get_secret_value(SecretId=cdk_api_secret_arn)[
@@ -144,8 +249,11 @@ def get_cdk_gw_admin_creds(lambda_session: Session) -> dict:
     except Exception as error:
         logger.exception(error)
         logger.error(f"Failed to retrieve the SecretString for {cdk_api_secret_arn}")
+        invalidate_cdk_gw_admin_creds(invalidate_sessions=True)
         raise
 
+    import yaml
+
     try:
         gw_secret = yaml.safe_load(secret_value)
     except yaml.YAMLError as error:
@@ -166,12 +274,18 @@ def get_cdk_gw_admin_creds(lambda_session: Session) -> dict:
         )
     for secret in gw_secret:
         if keyisset("admin", secret):
+            _ADMIN_CREDS_CACHE[cdk_api_secret_arn] = (
+                time.time() + ADMIN_CREDS_CACHE_TTL,
+                secret,
+            )
             return secret
     raise ValueError(f"No admin user found in {cdk_api_secret_arn}")
 
 
 def get_vcluster_details_from_token(jwt_token: str) -> dict:
     """Uses existing secret JWT token to identify vcluster owner"""
+    import jwt
+
     try:
         jwt_content = jwt.decode(
             jwt_token,
@@ -184,6 +298,21 @@ def get_vcluster_details_from_token(jwt_token: str) -> dict:
         raise error
 
 
+@lru_cache(maxsize=8)
+def get_vclusters_client(url: str, username: str, password: str) -> VirtualClusters:
+    """
+    Returns the VirtualClusters client for the GW admin credentials. Created once, so that the HTTP
+    connection is kept alive and re-used across warm invocations.
+    """
+    from cdk_proxy_api_client.client_wrapper import ApiClient
+    from cdk_proxy_api_client.proxy_api import ProxyClient
+    from cdk_proxy_api_client.vclusters import VirtualClusters
+
+    return VirtualClusters(
+        ProxyClient(ApiClient(username=username, password=password, url=url))
+    )
+
+
 def get_new_token_for_vcluster(
     gw_admin_secret: dict, vcluster: dict, life, token_only: bool = True
 ) -> str:
@@ -191,14 +320,11 @@ def get_new_token_for_vcluster(
         logger.info(
             f"creating secret for {vcluster['vcluster']}/{vcluster['username']} with user on host {CDK_API_ENDPOINT}"
         )
-        api_client = ApiClient(
-            username=gw_admin_secret["username"],
-            password=gw_admin_secret["password"],
-            url=CDK_API_ENDPOINT,
+        admin_client = get_vclusters_client(
+            CDK_API_ENDPOINT, gw_admin_secret["username"], gw_admin_secret["password"]
         )
-        proxy_client = ProxyClient(api_client)
-        admin_client = VirtualClusters(proxy_client)
-        logger.debug(admin_client.list_vclusters(as_list=True))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(admin_client.list_vclusters(as_list=True))
         token = admin_client.create_vcluster_user_token(
             vcluster=vcluster["vcluster"],
             username=vcluster["username"],
@@ -207,6 +333,12 @@ def get_new_token_for_vcluster(
         )
         return token
     except Exception as error:
+        from cdk_proxy_api_client.errors import GenericUnauthorized
+
+        if isinstance(error, GenericUnauthorized):
+            logger.warning("GW rejected the admin credentials. Invalidating the cache.")
+            invalidate_cdk_gw_admin_creds()
+            raise
         logger.exception(error)
         logger.error(
             "get_new_token_for_vcluster : Failed to create new jwt token for {}".format(
@@ -215,24 +347,159 @@ def get_new_token_for_vcluster(
         )
 
 
+def get_new_token_with_admin_creds(
+    lambda_session: Session, vcluster: dict, life, token_only: bool = True
+) -> str:
+    """
+    Creates the token with the (cached) GW admin credentials. If GW rejects them, they were
+    invalidated, and the token creation is retried once with the credentials retrieved again.
+    """
+    from cdk_proxy_api_client.errors import GenericUnauthorized
+
+    try:
+        return get_new_token_for_vcluster(
+            get_cdk_gw_admin_creds(lambda_session), vcluster, life, token_only
+        )
+    except GenericUnauthorized:
+        return get_new_token_for_vcluster(
+            get_cdk_gw_admin_creds(lambda_session), vcluster, life, token_only
+        )
+
+
+def create_batch_token(admin_client: VirtualClusters, token_request: dict) -> dict:
+    """
+    Creates the token for one of the batch entries. Returns the entry with either the token,
+    or the error (and the exception, under _exception, to be removed from the response).
+    An invalid entry, i.e. not a dict, is returned with the error, so that the other entries are still created.
+    """
+    result: dict = {"vcluster": None, "username": None}
+    try:
+        if not isinstance(token_request, dict):
+            raise TypeError(
+                f"Token request must be a dict. Got {type(token_request).__name__}"
+            )
+        result["vcluster"] = token_request.get("vcluster")
+        result["username"] = token_request.get("username") or result["vcluster"]
+        if not result["vcluster"] or not token_request.get("expiry"):
+            raise KeyError("vcluster and expiry must be set")
+        result["token"] = admin_client.create_vcluster_user_token(
+            vcluster=result["vcluster"],
+            username=result["username"],
+            lifetime_in_seconds=int(token_request["expiry"]),
+            token_only=True,
+        )
+    except Exception as error:
+        logger.error(
+            f"Failed to create token for {result['vcluster']}/{result['username']} - {error}"
+        )
+        result["error"] = str(error)
+        result["_exception"] = error
+    return result
+
+
+def create_tokens_batch(
+    lambda_session: Session,
+    tokens_requests: list[dict],
+    concurrency: int = BATCH_TOKENS_CONCURRENCY,
+) -> list[dict]:
+    """
+    Creates the tokens for all the (vcluster, username, expiry) entries, concurrently, with one GW client.
+    Returns, in the same order, each entry with its token, or the error for that entry.
+    If GW rejects the admin credentials, they are retrieved again and the rejected entries are retried once.
+    """
+    from cdk_proxy_api_client.errors import GenericUnauthorized
+
+    from cdk_gw_tools.common.concurrency import run_concurrently
+
+    def create_tokens(requests_indexes: list[int]) -> None:
+        gw_admin_secret = get_cdk_gw_admin_creds(lambda_session)
+        admin_client = get_vclusters_client(
+            CDK_API_ENDPOINT, gw_admin_secret["username"], gw_admin_secret["password"]
+        )
+        for _index, _result in zip(
+            requests_indexes,
+            run_concurrently(
+                lambda _index: create_batch_token(
+                    admin_client, tokens_requests[_index]
+                ),
+                requests_indexes,
+                concurrency,
+            ),
+        ):
+            results[_index] = _result
+
+    results: list[dict | None] = [None] * len(tokens_requests)
+    create_tokens(list(range(len(tokens_requests))))
+    rejected: list[int] = [
+        _index
+        for _index, _result in enumerate(results)
+        if isinstance(_result.get("_exception"), GenericUnauthorized)
+    ]
+    if rejected:
+        logger.warning("GW rejected the admin credentials. Invalidating the cache.")
+        invalidate_cdk_gw_admin_creds()
+        create_tokens(rejected)
+    for _result in results:
+        _result.pop("_exception", None)
+    logger.info(
+        "Batch tokens created: {}, failed: {}".format(
+            sum("token" in _result for _result in results),
+            sum("error" in _result for _result in results),
+        )
+    )
+    return results
+
+
+def replace_strings(value: str, replacements: list[tuple[str, str]]) -> str:
+    """
+    Replaces all the source strings at once: the value is split on the first source, and the other
+    replacements are made in the parts only, so a new value is never replaced again.
+    """
+    for _index, (_src, _new) in enumerate(replacements):
+        if _src and _src in value:
+            _others = replacements[_index + 1 :]
+            if not _others:
+                return value.replace(_src, _new)
+            return _new.join(
+                [replace_strings(_part, _others) for _part in value.split(_src)]
+            )
+    return value
+
+
+def replace_strings_in_values(value, replacements: dict[str, str]):
+    """
+    Returns the value with all the source strings replaced in its strings, nested dicts and lists included.
+    Longer sources are replaced first. Only the dicts and lists that changed are copied.
+    """
+    ordered: list[tuple[str, str]] = sorted(
+        replacements.items(), key=lambda _item: len(_item[0]), reverse=True
+    )
+
+    def replace(_value):
+        if isinstance(_value, str):
+            return replace_strings(_value, ordered)
+        if isinstance(_value, dict):
+            _updated = {_key: replace(_item) for _key, _item in _value.items()}
+            if any(_updated[_key] is not _item for _key, _item in _value.items()):
+                return _updated
+        elif isinstance(_value, list):
+            _updated = [replace(_item) for _item in _value]
+            if any(_new is not _item for _new, _item in zip(_updated, _value)):
+                return _updated
+        return _value
+
+    return replace(value)
+
+
 def replace_string_in_dict_values(
     input_dict: dict, src_value: str, new_value: str, copy: bool = False
 ) -> dict:
     """
-    Function to update all values in an input dictionary that will match with the new value.
-    It uses the new value to set as regex and replaces it in the dict values for each key,
-    allowing for any secret value and dynamic dict content.
+    Function to update all values in an input dictionary that will match with the new value,
+    nested dicts and lists included.
+    If copy is set, returns the updated dict, else updates input_dict.
     """
-
-    src_re = re.compile(re.escape(src_value))
-    if copy:
-        updated_dict = deepcopy(input_dict)
-    else:
-        updated_dict = input_dict
-    for key, value in updated_dict.items():
-        if isinstance(value, str) and src_re.findall(value):
-            updated_dict[key] = src_re.sub(new_value, value)
-        elif not isinstance(value, str):
-            print(f"The value for {key} is not a string. Skipping")
+    updated_dict = replace_strings_in_values(input_dict, {src_value: new_value})
     if copy:
-        return updated_dict
+        return dict(updated_dict) if updated_dict is input_dict else updated_dict
+    input_dict.update(updated_dict)
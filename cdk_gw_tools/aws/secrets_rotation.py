@@ -10,8 +10,11 @@ from boto3.session import Session
 from compose_x_common.compose_x_common import keyisset
 
 from cdk_gw_tools.aws.gw_handling import (
-    get_cdk_gw_admin_creds,
-    get_new_token_for_vcluster,
+    BATCH_TOKENS_CONCURRENCY,
+    check_rotation_environment,
+    create_tokens_batch,
+    get_new_token_with_admin_creds,
+    get_session_client,
     new_gateway_vcluster_secret_value,
 )
 
@@ -22,14 +25,32 @@ else:
 
 logger = logging.getLogger()
 
+check_rotation_environment()
+
+# Created once per execution environment, and re-used by warm invocations
+LAMBDA_SESSION = Session()
+
 
 def lambda_handler(event, context):
-    lambda_session = Session()
-    if keyisset("vcluster", event) and keyisset("expiry", event):
-        gateway_secret = get_cdk_gw_admin_creds(lambda_session)
+    lambda_session = LAMBDA_SESSION
+    if keyisset("rotate_secrets", event):
+        from cdk_gw_tools.aws.bulk_rotation import rotate_secrets_from_lambda
+
+        return rotate_secrets_from_lambda(
+            lambda_session, event["rotate_secrets"], context
+        )
+    elif keyisset("tokens", event):
+        return {
+            "tokens": create_tokens_batch(
+                lambda_session,
+                event["tokens"],
+                int(event.get("concurrency") or BATCH_TOKENS_CONCURRENCY),
+            )
+        }
+    elif keyisset("vcluster", event) and keyisset("expiry", event):
         return {
-            "token": get_new_token_for_vcluster(
-                gateway_secret,
+            "token": get_new_token_with_admin_creds(
+                lambda_session,
                 {
                     "vcluster": event["vcluster"],
                     "username": event.get("username") or event["vcluster"],
@@ -43,7 +64,8 @@ def lambda_handler(event, context):
         token = event["ClientRequestToken"]
         step = event["Step"]
 
-        current_value = lambda_session.client("secretsmanager").get_secret_value(
+        secrets_client = get_session_client(lambda_session, "secretsmanager")
+        current_value = secrets_client.get_secret_value(
             SecretId=secret_arn, VersionStage="AWSCURRENT"
         )["SecretString"]
         if isinstance(current_value, str):
@@ -81,7 +103,7 @@ def create_secret(lambda_session: Session, arn, token, current_value: dict):
     Creates the new secret for vcluster and stores in Secret with AWSPENDING stage.
     First, we check that there are no AWSPENDING secret value already in place.
     """
-    client = lambda_session.client("secretsmanager")
+    client = get_session_client(lambda_session, "secretsmanager")
     try:
         client.get_secret_value(
             SecretId=arn, VersionId=token, VersionStage="AWSPENDING"
@@ -129,7 +151,7 @@ def finish_secret(lambda_session: Session, arn, token):
     from AWSPENDING stage
     """
     # First describe the secret to get the current version
-    service_client = lambda_session.client("secretsmanager")
+    service_client = get_session_client(lambda_session, "secretsmanager")
     metadata = service_client.describe_secret(SecretId=arn)
     current_version = None
     for version in metadata["VersionIdsToStages"]:
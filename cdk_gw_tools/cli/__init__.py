@@ -5,11 +5,6 @@ from __future__ import annotations
 
 import sys
 
-try:
-    from yaml import Dumper
-except ImportError:
-    from yaml import CDumper as Dumper
-
 from cdk_gw_tools.cli_actions import main
 
 if __name__ == "__main__":
@@ -32,3 +32,64 @@ def set_auth_actions(auth_subparsers):
         help="Returns the kafka config file",
         default=False,
     )
+
+    rotate_secrets_parser = auth_subparsers.add_parser(
+        name="rotate-secrets",
+        help="Rotates the tokens of the vCluster secrets in AWS SecretsManager, expiring soon",
+    )
+    rotate_secrets_parser.add_argument(
+        "--secret-id",
+        dest="secrets_ids",
+        action="append",
+        default=[],
+        help="Name/ARN of a secret to rotate. Can be repeated",
+    )
+    rotate_secrets_parser.add_argument(
+        "--tag",
+        dest="secrets_tags",
+        action="append",
+        default=[],
+        help="KEY=VALUE tag of the secrets to rotate. Secrets must have all the tags. Can be repeated",
+    )
+    rotate_secrets_parser.add_argument(
+        "--rotation-window",
+        dest="rotation_window",
+        type=int,
+        default=86400,
+        help="Rotates the secrets which token expires within that many seconds. Defaults 1 day (86400)",
+    )
+    rotate_secrets_parser.add_argument(
+        "--lifetime-in-seconds",
+        dest="token_lifetime_in_seconds",
+        type=int,
+        help="New tokens lifetime in seconds. Defaults 1 day (86400)",
+        default=86400,
+    )
+    rotate_secrets_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        default=10,
+        help="Maximum number of secrets/tokens API calls in flight. Defaults to 10",
+    )
+    rotate_secrets_parser.add_argument(
+        "--spread",
+        dest="spread",
+        type=float,
+        default=0,
+        help="Spreads the tokens creation over that many seconds, soonest to expire first. Defaults to 0 (all at once)",
+    )
+    rotate_secrets_parser.add_argument(
+        "--aws-profile",
+        dest="aws_profile",
+        type=str,
+        help="Local AWS profile to use to make the SecretsManager API calls",
+        required=False,
+    )
+    rotate_secrets_parser.add_argument(
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="Only lists the secrets that would be rotated",
+        default=False,
+    )
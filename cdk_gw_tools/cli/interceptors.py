@@ -5,6 +5,8 @@ from __future__ import annotations
 
 from argparse import ArgumentParser
 
+from cdk_gw_tools.cli.plugins import PLUGINS_CACHE_PARSER
+
 VCLUSTER_PARSER = ArgumentParser(add_help=False)
 VCLUSTER_PARSER.add_argument(
     "--vcluster-name",
@@ -94,6 +96,7 @@ def set_interceptors_actions_parsers(interceptors_subparsers):
     import_from_config_parser = interceptors_subparsers.add_parser(
         name="import-from-config",
         help="Import interceptors from config file",
+        parents=[PLUGINS_CACHE_PARSER],
     )
     import_from_config_parser.add_argument(
         "-f",
@@ -103,3 +106,23 @@ def set_interceptors_actions_parsers(interceptors_subparsers):
         help="Path to the config file (YAML)",
         required=True,
     )
+    import_from_config_parser.add_argument(
+        "--remove-unset",
+        action="store_true",
+        dest="remove_unset",
+        help="If true, delete the interceptors on GW not defined in the config file",
+    )
+    import_from_config_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        help="Maximum number of interceptors API calls in flight. Defaults to 10",
+        default=10,
+    )
+    import_from_config_parser.add_argument(
+        "--retries",
+        dest="retries",
+        type=int,
+        help="Number of retries, with backoff, for each interceptor on throttling/server errors. Defaults to 3",
+        default=3,
+    )
@@ -31,6 +31,13 @@ def set_parser():
     main_parser.add_argument("--url", required=False)
     main_parser.add_argument("--username", required=False)
     main_parser.add_argument("--password", required=False)
+    main_parser.add_argument(
+        "--http-retries",
+        dest="http_retries",
+        type=int,
+        default=0,
+        help="Number of retries, with backoff, of the API calls on throttling/server errors. Defaults to 0",
+    )
     main_parser.add_argument(
         "-c",
         "--config-file",
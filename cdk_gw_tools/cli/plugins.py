@@ -3,9 +3,30 @@
 
 from __future__ import annotations
 
+from argparse import ArgumentParser
+
+PLUGINS_CACHE_PARSER = ArgumentParser(add_help=False)
+PLUGINS_CACHE_PARSER.add_argument(
+    "--plugins-cache-ttl",
+    dest="plugins_cache_ttl",
+    type=int,
+    default=0,
+    help="Cache the plugins catalogue on disk, per Gateway URL, for that many seconds. Disabled by default."
+    " The cache is not invalidated when Gateway is upgraded: use --refresh-plugins-cache",
+)
+PLUGINS_CACHE_PARSER.add_argument(
+    "--refresh-plugins-cache",
+    dest="refresh_plugins_cache",
+    action="store_true",
+    default=False,
+    help="Ignore the cached plugins catalogue and fetch it again from Gateway",
+)
+
 
 def set_plugings_actions_parsers(plugins_subparsers):
-    list_parser = plugins_subparsers.add_parser(name="list", help="List all plugins")
+    list_parser = plugins_subparsers.add_parser(
+        name="list", help="List all plugins", parents=[PLUGINS_CACHE_PARSER]
+    )
     list_parser.add_argument("--extended", action="store_true", default=False)
     list_parser.add_argument(
         "--as-list", action="store_true", default=False, help="Returns only the list"
@@ -90,6 +90,26 @@ def set_gw_user_mappings_actions_parsers(gw_user_mappings_subparsers):
         action="store_true",
         help="If true, remove mappings on GW not defined in the config file",
     )
+    import_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        dest="dry_run",
+        help="Makes no changes. With --remove-unset, returns the mappings that would be removed",
+    )
+    import_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        help="Maximum number of user-mappings deletions in flight. Defaults to 10",
+        default=10,
+    )
+    import_parser.add_argument(
+        "--parallel-vclusters",
+        dest="parallel_vclusters",
+        type=int,
+        help="Number of vClusters to import at once. passthrough is always last. Defaults to 1",
+        default=1,
+    )
 
     export_parser = gw_user_mappings_subparsers.add_parser(
         name="export", help="Export user-mappings from config-file"
@@ -102,3 +122,10 @@ def set_gw_user_mappings_actions_parsers(gw_user_mappings_subparsers):
         help="Path to the import config file",
         required=False,
     )
+    export_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        type=int,
+        help="Maximum number of user-mappings API calls in flight. Defaults to 10",
+        default=10,
+    )
@@ -139,6 +139,35 @@ def set_vcluster_mappings_actions(vclusters_subparsers):
         required=True,
         type=str,
     )
+    import_from_vclusters_parser.add_argument(
+        "--concurrency",
+        dest="concurrency",
+        help="Maximum number of mappings API calls in flight. Defaults to 10",
+        required=False,
+        type=int,
+        default=10,
+    )
+    import_from_vclusters_parser.add_argument(
+        "--reconcile",
+        action="store_true",
+        dest="reconcile",
+        help="Only applies the differences between the config file and the vCluster mappings",
+        required=False,
+    )
+    import_from_vclusters_parser.add_argument(
+        "--plan",
+        action="store_true",
+        dest="plan_only",
+        help="Returns the mappings to create/update/delete, without making changes",
+        required=False,
+    )
+    import_from_vclusters_parser.add_argument(
+        "--remove-unset",
+        action="store_true",
+        dest="remove_unset",
+        help="Deletes the mappings not defined in the config file. Implies --reconcile, unless --plan is set",
+        required=False,
+    )
     import_from_vcluster_parser = mappings_subparsers.add_parser(
         name="import-from-vcluster",
         help="Import all topics from a existing vCluster",
@@ -5,21 +5,53 @@ from __future__ import annotations
 
 import json
 import logging
+from importlib import import_module
+from typing import Callable
 
-import yaml
 from cdk_proxy_api_client.client_wrapper import ApiClient
+from cdk_proxy_api_client.errors import GenericUnauthorized
 from cdk_proxy_api_client.proxy_api import ProxyClient
-from yaml import Dumper
 
 from cdk_gw_tools.cli.main_parser import set_parser
-from cdk_gw_tools.cli_actions.auth import auth_actions
-from cdk_gw_tools.cli_actions.interceptors import interceptors_actions
-from cdk_gw_tools.cli_actions.plugins import plugins_actions
-from cdk_gw_tools.cli_actions.user_mappings import user_mappings_actions
-from cdk_gw_tools.cli_actions.vclusters import vclusters_actions
-from cdk_gw_tools.cli_tools.import_from_config import import_client
+from cdk_gw_tools.common.http_session import create_http_session, get_pool_size
 from cdk_gw_tools.common.logging import LOG
 
+# Module and function of each category actions, only imported for the category used, to keep the CLI startup short.
+CATEGORIES_ACTIONS: dict[str, tuple[str, str]] = {
+    "vclusters": ("cdk_gw_tools.cli_actions.vclusters", "vclusters_actions"),
+    "plugins": ("cdk_gw_tools.cli_actions.plugins", "plugins_actions"),
+    "user-mappings": (
+        "cdk_gw_tools.cli_actions.user_mappings",
+        "user_mappings_actions",
+    ),
+    "interceptors": ("cdk_gw_tools.cli_actions.interceptors", "interceptors_actions"),
+    "auth": ("cdk_gw_tools.cli_actions.auth", "auth_actions"),
+}
+
+
+def get_category_actions(category: str) -> Callable:
+    """Imports and returns the actions function of the category"""
+    module_name, function_name = CATEGORIES_ACTIONS[category]
+    return getattr(import_module(module_name), function_name)
+
+
+def is_unauthorized_error(error) -> bool:
+    """
+    Whether the error is a 401 from Gateway, or holds one, as the errors collected from concurrent calls
+    and raised together.
+    """
+    if isinstance(error, GenericUnauthorized):
+        return True
+    if isinstance(error, BaseException):
+        return any(is_unauthorized_error(_arg) for _arg in error.args) or (
+            error.__cause__ is not None and is_unauthorized_error(error.__cause__)
+        )
+    if isinstance(error, dict):
+        return any(is_unauthorized_error(_value) for _value in error.values())
+    if isinstance(error, (list, tuple)):
+        return any(is_unauthorized_error(_item) for _item in error)
+    return False
+
 
 def main():
     _PARSER = set_parser()
@@ -43,6 +75,7 @@ def main():
                 f"Log level value {_args.loglevel} is invalid. Must me one of {valid_levels}"
             )
     _vars = vars(_args)
+    _rate_limiter = None
     if _args.url:
         if not _args.username or not _args.password:
             raise Exception(
@@ -54,24 +87,39 @@ def main():
             url=_vars.pop("url"),
         )
     elif _args.profile_name:
-        _client = import_client(_args.config_file, _args.profile_name)
+        from cdk_gw_tools.cli_tools.import_from_config import (
+            get_profile_client,
+            get_profile_rate_limiter,
+            load_profile_config,
+        )
+
+        _profile_config = load_profile_config(_args.config_file, _args.profile_name)
+        _client = get_profile_client(_args.profile_name, _profile_config)
+        _rate_limiter = get_profile_rate_limiter(_profile_config)
     else:
         raise Exception(
             "You must either set --profile-name (possibly -c) or define --url, --username and --password"
         )
+    _client.session = create_http_session(
+        get_pool_size(_vars),
+        retries=_vars.pop("http_retries", 0),
+        rate_limiter=_rate_limiter,
+    )
     _category = _vars.pop("category")
     _action = _vars.pop("action")
     _proxy = ProxyClient(_client)
 
-    _categories_mappings: dict = {
-        "vclusters": vclusters_actions,
-        "plugins": plugins_actions,
-        "user-mappings": user_mappings_actions,
-        "interceptors": interceptors_actions,
-        "auth": auth_actions,
-    }
-    dest_function = _categories_mappings[_category]
-    response = dest_function(_proxy, _action, **_vars)
+    dest_function = get_category_actions(_category)
+    try:
+        response = dest_function(_proxy, _action, **_vars)
+    except Exception as error:
+        if _args.profile_name and not _args.url and is_unauthorized_error(error):
+            from cdk_gw_tools.cli_tools.credentials_cache import (
+                invalidate_credentials_cache,
+            )
+
+            invalidate_credentials_cache(_args.profile_name)
+        raise
     if not response:
         return
     if isinstance(response, str):
@@ -81,6 +129,9 @@ def main():
         if _args.output_format == "json":
             print(json.dumps(response, indent=2))
         else:
+            import yaml
+            from yaml import Dumper
+
             print(yaml.dump(response, Dumper=Dumper))
     except Exception as error:
         print(error)
@@ -8,12 +8,15 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from cdk_proxy_api_client.proxy_api import ProxyClient
 
+from cdk_proxy_api_client.errors import GenericUnauthorized
 from cdk_proxy_api_client.vclusters import VirtualClusters
 from compose_x_common.compose_x_common import keyisset
 
 
 def auth_actions(proxy_client: ProxyClient, action: str, **kwargs):
     """Manages cli_actions for auth vClusters subparser"""
+    if action == "rotate-secrets":
+        return rotate_vclusters_secrets(proxy_client, **kwargs)
     username = kwargs.get("username") or kwargs["vcluster_name"]
     if action == "create":
         vcluster_client = VirtualClusters(proxy_client)
@@ -34,3 +37,56 @@ client.id=CLI_{}""".format(
             username, req["token"], username
         )
     return req
+
+
+def rotate_vclusters_secrets(proxy_client: ProxyClient, **kwargs) -> dict:
+    """
+    Rotates the secrets expiring soon, creating the new tokens with the CLI GW client.
+    A 401 is raised, rather than reported for each secret, so that the profile cached credentials are invalidated.
+    """
+    from boto3.session import Session
+
+    from cdk_gw_tools.aws.bulk_rotation import (
+        get_secrets_client,
+        list_secrets_by_tags,
+        rotate_secrets,
+    )
+    from cdk_gw_tools.aws.gw_handling import create_batch_token
+    from cdk_gw_tools.common.concurrency import run_concurrently
+
+    concurrency: int = kwargs.get("concurrency") or 1
+    secrets_client = get_secrets_client(
+        Session(profile_name=kwargs.get("aws_profile")), concurrency
+    )
+    secrets_ids: list[str] = list(kwargs.get("secrets_ids") or [])
+    if kwargs.get("secrets_tags"):
+        secrets_ids += list_secrets_by_tags(
+            secrets_client,
+            dict(_tag.split("=", 1) for _tag in kwargs["secrets_tags"]),
+        )
+    if not secrets_ids:
+        raise ValueError("No secret to rotate. Set --secret-id and/or --tag")
+    vcluster_client = VirtualClusters(proxy_client)
+
+    def create_tokens(tokens_requests: list[dict]) -> list[dict]:
+        tokens: list[dict] = run_concurrently(
+            lambda _request: create_batch_token(vcluster_client, _request),
+            tokens_requests,
+            concurrency,
+        )
+        for _token in tokens:
+            _error = _token.pop("_exception", None)
+            if isinstance(_error, GenericUnauthorized):
+                raise _error
+        return tokens
+
+    return rotate_secrets(
+        secrets_client,
+        secrets_ids,
+        create_tokens,
+        kwargs["rotation_window"],
+        kwargs["token_lifetime_in_seconds"],
+        concurrency,
+        keyisset("dry_run", kwargs),
+        kwargs.get("spread") or 0,
+    )
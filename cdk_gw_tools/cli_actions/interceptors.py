@@ -18,6 +18,7 @@ from cdk_proxy_api_client.proxy_api import ProxyClient
 from compose_x_common.compose_x_common import keyisset, set_else_none
 
 from cdk_gw_tools.cli_tools import load_config_file
+from cdk_gw_tools.common.concurrency import DEFAULT_CONCURRENCY, DEFAULT_RETRIES
 
 
 def interceptors_actions(proxy: ProxyClient, action: str, **kwargs):
@@ -74,5 +75,13 @@ def interceptors_actions(proxy: ProxyClient, action: str, **kwargs):
             set_update_interceptors,
         )
 
-        _req = set_update_interceptors(proxy, _loaded_config)
+        return set_update_interceptors(
+            proxy,
+            _loaded_config,
+            keyisset("remove_unset", kwargs),
+            concurrency=kwargs.get("concurrency", DEFAULT_CONCURRENCY),
+            retries=kwargs.get("retries", DEFAULT_RETRIES),
+            plugins_cache_ttl=kwargs.get("plugins_cache_ttl") or 0,
+            refresh_plugins_cache=keyisset("refresh_plugins_cache", kwargs),
+        )
     return None
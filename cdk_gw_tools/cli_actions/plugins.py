@@ -3,20 +3,24 @@
 
 from __future__ import annotations
 
-from cdk_proxy_api_client.plugins import Plugins
 from cdk_proxy_api_client.proxy_api import ProxyClient
 from compose_x_common.compose_x_common import keyisset
 
 from cdk_gw_tools.cli_actions.common import format_return
+from cdk_gw_tools.cli_tools.plugins_catalogue import get_plugins_catalogue
 
 
 @format_return
 def plugins_actions(proxy: ProxyClient, action: str, **kwargs):
-    _plugins = Plugins(proxy)
     if action == "list":
-        req = _plugins.list_all_plugins(
-            extended=keyisset("extended", kwargs), as_list=keyisset("as_list", kwargs)
+        req = get_plugins_catalogue(
+            proxy,
+            extended=keyisset("extended", kwargs),
+            cache_ttl=kwargs.get("plugins_cache_ttl") or 0,
+            force_refresh=keyisset("refresh_plugins_cache", kwargs),
         )
+        if keyisset("as_list", kwargs):
+            return req["plugins"]
     else:
         raise NotImplementedError(f"Action {action} is not implemented yet.")
     return req
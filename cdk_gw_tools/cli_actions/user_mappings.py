@@ -17,6 +17,7 @@ from cdk_gw_tools.cli_tools.user_mappings_tools import (
     import_mappings_from_file,
     validate_identities_are_unique,
 )
+from cdk_gw_tools.common.concurrency import DEFAULT_CONCURRENCY
 
 
 @format_return
@@ -51,13 +52,24 @@ def user_mappings_actions(proxy: ProxyClient, action: str, **kwargs):
             vcluster_name=kwargs.get("vcluster_name", None),
         )
     elif action == "export":
-        req = create_export_config(vclusters, user_mappings)
+        req = create_export_config(
+            vclusters,
+            user_mappings,
+            concurrency=kwargs.get("concurrency", DEFAULT_CONCURRENCY),
+        )
         return asdict(req)
     elif action == "import":
         config = load_config_file(kwargs["import_file"])
-        import_mappings_from_file(
-            user_mappings, config, keyisset("remove_unset", kwargs)
+        removed_usernames = import_mappings_from_file(
+            user_mappings,
+            config,
+            keyisset("remove_unset", kwargs),
+            concurrency=kwargs.get("concurrency", DEFAULT_CONCURRENCY),
+            dry_run=keyisset("dry_run", kwargs),
+            parallel_vclusters=kwargs.get("parallel_vclusters", 1),
         )
+        if keyisset("dry_run", kwargs):
+            return {"status": "dry-run", "to_remove": removed_usernames}
         return {"status": "imported"}
     elif action == "validate":
         config = load_config_file(kwargs["import_file"])
@@ -8,11 +8,7 @@ from __future__ import annotations
 from cdk_proxy_api_client.proxy_api import ProxyClient
 from cdk_proxy_api_client.vclusters import VirtualClusters
 
-from cdk_gw_tools.cli_actions.auth import auth_actions
 from cdk_gw_tools.cli_actions.common import format_return
-from cdk_gw_tools.cli_actions.interceptors import interceptors_actions
-from cdk_gw_tools.cli_actions.user_mappings import user_mappings_actions
-from cdk_gw_tools.cli_actions.vclusters.topic_mappings import vcluster_mappings_actions
 
 
 def concentration_rules_actions(vclusters: VirtualClusters, action: str, **kwargs):
@@ -51,14 +47,22 @@ def vclusters_actions(proxy: ProxyClient, action: str, **kwargs):
     if action == "list":
         req = vclusters.list_vclusters(as_list=True)
     elif action == "mappings":
+        from cdk_gw_tools.cli_actions.vclusters.topic_mappings import (
+            vcluster_mappings_actions,
+        )
+
         req = vcluster_mappings_actions(
             proxy, vclusters, kwargs.pop("sub_action"), **kwargs
         )
     elif action == "concentration-rules":
         req = concentration_rules_actions(vclusters, kwargs.pop("sub_action"), **kwargs)
     elif action == "interceptors":
+        from cdk_gw_tools.cli_actions.interceptors import interceptors_actions
+
         req = interceptors_actions(proxy, kwargs.pop("sub_action"), **kwargs)
     elif action == "user-mappings":
+        from cdk_gw_tools.cli_actions.user_mappings import user_mappings_actions
+
         req = user_mappings_actions(proxy, kwargs.pop("sub_action"), **kwargs)
     else:
         raise NotImplementedError(f"Action {action} not yet implemented.")
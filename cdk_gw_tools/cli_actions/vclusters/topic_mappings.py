@@ -47,7 +47,15 @@ def vcluster_mappings_actions(
         )
     elif action == "import-from-vclusters-config":
         content = load_config_file(path.abspath(kwargs["import_config_file"]))
-        req = import_tenants_mappings(proxy, content, vcluster_name)
+        req = import_tenants_mappings(
+            proxy,
+            content,
+            vcluster_name,
+            concurrency=kwargs.get("concurrency"),
+            reconcile=keyisset("reconcile", kwargs),
+            plan_only=keyisset("plan_only", kwargs),
+            remove_unset=keyisset("remove_unset", kwargs),
+        )
     elif action == "create":
         req = vcluster.create_vcluster_topic_mapping(
             vcluster=vcluster_name,
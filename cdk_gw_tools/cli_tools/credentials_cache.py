@@ -0,0 +1,87 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Credentials of the profiles retrieved from AWS SecretsManager, optionally cached on disk per profile.
+The cache files are only readable by the current user.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import stat
+import time
+from hashlib import sha256
+from os import environ
+from pathlib import Path
+
+from cdk_gw_tools.common.logging import LOG
+
+CREDENTIALS_CACHE_DIR: Path = Path(
+    environ.get("XDG_CACHE_HOME", Path(environ.get("HOME", ".")) / ".cache"),
+    "cdk_gw_tools",
+    "credentials",
+)
+
+
+def get_credentials_cache_path(profile: str) -> Path:
+    """The file name is the hash of the profile name, which can have any character"""
+    return CREDENTIALS_CACHE_DIR / f"{sha256(profile.encode()).hexdigest()}.json"
+
+
+def get_credentials_cache_key(url: str, aws_config: dict) -> str:
+    """Changes when the profile URL or AWSSecretsManager settings change, so that the cache is not used"""
+    return sha256(
+        json.dumps([url, aws_config], sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def read_credentials_cache(profile: str, cache_key: str, cache_ttl: int) -> dict | None:
+    """
+    Returns the cached username and password if the file is younger than cache_ttl seconds, for the same cache_key,
+    and only accessible to the current user.
+    """
+    cache_path = get_credentials_cache_path(profile)
+    try:
+        cache_stat = cache_path.stat()
+        if time.time() - cache_stat.st_mtime > cache_ttl:
+            return None
+        if cache_stat.st_uid != os.getuid() or stat.S_IMODE(cache_stat.st_mode) & 0o077:
+            LOG.warning(f"Ignoring {cache_path}: must only be accessible to the user")
+            return None
+        cached: dict = json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return None
+    if cached.get("key") != cache_key:
+        return None
+    return cached
+
+
+def write_credentials_cache(
+    profile: str, cache_key: str, username: str, password: str
+) -> None:
+    """Stores the credentials with 0600 permissions. Failing to write the cache is not fatal"""
+    cache_path = get_credentials_cache_path(profile)
+    tmp_path = cache_path.with_suffix(".tmp")
+    try:
+        cache_path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if tmp_path.exists():
+            tmp_path.unlink()
+        file_fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(file_fd, "w") as cache_fd:
+            json.dump(
+                {"key": cache_key, "username": username, "password": password},
+                cache_fd,
+            )
+        tmp_path.replace(cache_path)
+    except OSError as error:
+        LOG.warning(f"Unable to write credentials cache {cache_path}: {error}")
+
+
+def invalidate_credentials_cache(profile: str) -> None:
+    try:
+        get_credentials_cache_path(profile).unlink()
+        LOG.info(f"Cached credentials for profile {profile} invalidated")
+    except FileNotFoundError:
+        pass
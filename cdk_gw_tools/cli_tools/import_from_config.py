@@ -14,57 +14,103 @@ try:
 except ImportError:
     from yaml import CLoader as Loader
 
-from json import loads
-
-from boto3.session import Session
 from cdk_proxy_api_client.proxy_api import ApiClient
 from compose_x_common.compose_x_common import keyisset, set_else_none
 from importlib_resources import files as pkg_files
-from jsonschema import validate
 
 from cdk_gw_tools.cli_tools import load_config_file
+from cdk_gw_tools.cli_tools.credentials_cache import (
+    get_credentials_cache_key,
+    read_credentials_cache,
+    write_credentials_cache,
+)
+from cdk_gw_tools.common.rate_limiter import RateLimiter, get_rate_limiter
+from cdk_gw_tools.specs.validators import validate_spec
 
 DEFAULT_SCHEMA_PATH = pkg_files("cdk_gw_tools").joinpath(
     "specs/profiles_config.spec.json"
 )
 
 
+def load_profile_config(config_file: str, profile: str, schema: dict = None) -> dict:
+    """Loads and validates the config file, once, and returns the configuration of the profile"""
+    content = load_config_file(config_file)
+    validate_spec(content, "profiles_config", schema)
+    if profile not in content:
+        raise KeyError(f"Profile {profile} not found in definition")
+    return content[profile]
+
+
+def get_profile_client(profile: str, profile_config: dict) -> ApiClient:
+    """Creates the Proxy client from the profile configuration"""
+    url = set_else_none("Url", profile_config)
+    if not url:
+        raise KeyError(f"Url not defined for profile {profile}")
+    username = set_else_none("Username", profile_config)
+    password = set_else_none("Password", profile_config)
+    aws_secrets_manager = set_else_none("AWSSecretsManager", profile_config)
+    if username and password:
+        return ApiClient(url=url, username=username, password=password)
+    elif aws_secrets_manager:
+        return set_profile_from_aws_secret(profile, url, aws_secrets_manager)
+    else:
+        raise LookupError("Unable to define ApiClient based on configuration")
+
+
+def get_profile_rate_limiter(profile_config: dict) -> RateLimiter | None:
+    """Returns the RateLimiter for the profile RateLimit configuration, if set"""
+    return get_rate_limiter(set_else_none("RateLimit", profile_config))
+
+
 def import_client(
     config_file: str, client: str = None, schema: dict = None
 ) -> ApiClient:
     """
     Function that will validate input from specification, then create Proxy client based on the configuration defined.
-    It returns a mapping with the profile name and the associated client.
-    If client is set, only cares about that one client
+    If client is set, only cares about that one client, else uses the first profile.
     """
-    content = load_config_file(config_file)
-    if not schema:
-        schema = loads(DEFAULT_SCHEMA_PATH.read_text())
-    validate(content, schema)
-    if client and client not in content:
-        raise KeyError(f"Profile {client} not found in definition")
-
-    for profile, profile_config in content.items():
-        if client and profile != client:
-            continue
-        url = set_else_none("Url", profile_config)
-        if not url:
-            raise KeyError(f"Url not defined for profile {profile}")
-        username = set_else_none("Username", profile_config)
-        password = set_else_none("Password", profile_config)
-        aws_secrets_manager = set_else_none("AWSSecretsManager", profile_config)
-        if username and password:
-            return ApiClient(url=url, username=username, password=password)
-        elif aws_secrets_manager:
-            return set_profile_from_aws_secret(profile, url, aws_secrets_manager)
-        else:
-            raise LookupError("Unable to define ApiClient based on configuration")
+    if not client:
+        content = load_config_file(config_file)
+        validate_spec(content, "profiles_config", schema)
+        client = next(iter(content))
+        return get_profile_client(client, content[client])
+    return get_profile_client(client, load_profile_config(config_file, client, schema))
+
+
+def import_profile_rate_limiter(
+    config_file: str, profile: str, schema: dict = None
+) -> RateLimiter | None:
+    """Returns the RateLimiter for the profile RateLimit configuration, if set"""
+    return get_profile_rate_limiter(load_profile_config(config_file, profile, schema))
 
 
 def set_profile_from_aws_secret(profile: str, url: str, aws_config: dict) -> ApiClient:
     """
-    Uses the AWSSecretsManager configuration
+    Uses the AWSSecretsManager configuration.
+    With CacheTtl, the credentials are cached on disk for that many seconds.
     """
+    cache_ttl: int = set_else_none("CacheTtl", aws_config, 0)
+    cache_key: str = get_credentials_cache_key(url, aws_config)
+    if cache_ttl > 0:
+        cached = read_credentials_cache(profile, cache_key, cache_ttl)
+        if cached:
+            return ApiClient(
+                url=url, username=cached["username"], password=cached["password"]
+            )
+    user_defined: dict = get_aws_secret_user(url, aws_config)
+    if cache_ttl > 0:
+        write_credentials_cache(
+            profile, cache_key, user_defined["username"], user_defined["password"]
+        )
+    return ApiClient(
+        url=url, username=user_defined["username"], password=user_defined["password"]
+    )
+
+
+def get_aws_secret_user(url: str, aws_config: dict) -> dict:
+    """Retrieves the secret and returns the user to make API calls with"""
+    from boto3.session import Session
+
     session = (
         Session(profile_name=aws_config["ProfileName"])
         if keyisset("ProfileName", aws_config)
@@ -90,17 +136,13 @@ def set_profile_from_aws_secret(profile: str, url: str, aws_config: dict) -> Api
         if user and user_defined["username"] == user:
             if not keyisset("admin", user_defined):
                 print("The user {} is not admin. Some API calls might fail")
-            return ApiClient(url=url, username=user, password=user_defined["password"])
+            return user_defined
 
         elif not user:
             if keyisset("admin", user_defined):
                 # print(
                 #     "Using {} for profile {}".format(user_defined["username"], profile)
                 # )
-                return ApiClient(
-                    url=url,
-                    username=user_defined["username"],
-                    password=user_defined["password"],
-                )
+                return user_defined
 
     raise LookupError(f"Unable to find an admin user to make API calls to {url}")
@@ -6,235 +6,347 @@
 from __future__ import annotations
 
 import re
-from copy import deepcopy
-from json import loads
 
 from cdk_proxy_api_client.common.logging import LOG
-from cdk_proxy_api_client.errors import ProxyApiException, ProxyGenericException
+from cdk_proxy_api_client.errors import GenericUnauthorized, ProxyGenericException
 from cdk_proxy_api_client.proxy_api import ProxyClient
 from cdk_proxy_api_client.vclusters import VirtualClusters
 from compose_x_common.compose_x_common import keyisset, set_else_none
 from importlib_resources import files as pkg_files
-from jsonschema import validate
+
+from cdk_gw_tools.common.concurrency import DEFAULT_CONCURRENCY, run_concurrently
+from cdk_gw_tools.specs.validators import validate_spec
 
 DEFAULT_SCHEMA_PATH = pkg_files("cdk_gw_tools").joinpath(
     "specs/tenant_mappings-input.json"
 )
+ALIAS_MAPPING_TYPE: str = "alias"
+RECONCILE_OUTCOMES: list[str] = [
+    "created",
+    "updated",
+    "deleted",
+    "conflicted",
+    "failed",
+]
 
 
 def get_tenant_logical_topics(
-    proxy: ProxyClient, tenant_name: str, include_read_only: bool = False
+    proxy: ProxyClient,
+    tenant_name: str,
+    include_read_only: bool = False,
+    tenants_mappings: dict[str, list[dict]] = None,
 ) -> list[dict]:
     """
     Returns the list of topics (logical name) from a given tenant topics mappings. Ignores
     :param ProxyClient proxy:
     :param str tenant_name:
     :param bool include_read_only:
+    :param dict tenants_mappings: Cache of the tenants mappings. Used and updated if set.
     :return: List of topics logical available in the tenant.
     """
-    tenant_mappings = VirtualClusters(proxy)
+    if tenants_mappings is not None and tenant_name in tenants_mappings:
+        tenant_topics: list[dict] = tenants_mappings[tenant_name]
+    else:
+        tenant_topics: list[dict] = VirtualClusters(proxy).list_vcluster_topic_mappings(
+            tenant_name, as_list=True
+        )
+        if tenants_mappings is not None:
+            tenants_mappings[tenant_name] = tenant_topics
 
     topics_list: list[dict] = []
-    for _topic in tenant_mappings.list_vcluster_topic_mappings(
-        tenant_name, as_list=True
-    ):
+    for _topic in tenant_topics:
         if _topic["readOnly"] is True and not include_read_only:
             continue
         topics_list.append(_topic)
     return topics_list
 
 
+class RegexesMatcher:
+    """
+    Matches values against a list of regexes, each compiled once. The regexes are kept separate rather than
+    combined, so that each keeps its own inline flags and groups.
+    """
+
+    def __init__(self, regexes: list[str] | None, ignore_invalid: bool = False):
+        """Raises re.error for an invalid regex, unless ignore_invalid, which keeps them in invalid_regexes"""
+        self.patterns: list[re.Pattern] = []
+        self.invalid_regexes: list[tuple[str, Exception]] = []
+        for _regex in regexes or []:
+            try:
+                self.patterns.append(re.compile(_regex))
+            except (re.error, TypeError) as error:
+                if not ignore_invalid:
+                    raise
+                self.invalid_regexes.append((_regex, error))
+
+    def __bool__(self) -> bool:
+        return bool(self.patterns)
+
+    def match(self, value: str) -> bool:
+        return any(_pattern.match(value) for _pattern in self.patterns)
+
+
+class TenantSelector:
+    """
+    Selects tenants (vClusters) by regexes. The exclude regexes are compiled once and applied once
+    to the tenants list. The tenants matching a given regex are memoised, so that the include_regex items
+    matching the same tenants reuse the results.
+    """
+
+    def __init__(self, tenants: list[str], exclude_regexes: list[str] = None):
+        exclude_matcher = RegexesMatcher(exclude_regexes, ignore_invalid=True)
+        for _regex, _error in exclude_matcher.invalid_regexes:
+            print(_error)
+            print(_regex, "not a valid regex. Ignoring")
+        self.tenants: list[str] = [
+            _tenant
+            for _tenant in tenants
+            if not (exclude_matcher and exclude_matcher.match(_tenant))
+        ]
+        self._selections: dict[str, list[str]] = {}
+
+    def select(self, tenant_regex: str) -> list[str]:
+        """Returns the tenants matching the regex. Raises re.error if the regex is invalid."""
+        if tenant_regex not in self._selections:
+            _pattern = re.compile(tenant_regex)
+            self._selections[tenant_regex] = [
+                _tenant for _tenant in self.tenants if _pattern.match(_tenant)
+            ]
+        return self._selections[tenant_regex]
+
+    def select_any(self, tenant_regexes: list[str]) -> list[str]:
+        """Returns the tenants matching any of the regexes, in one pass. Invalid regexes are ignored."""
+        include_matcher = RegexesMatcher(tenant_regexes, ignore_invalid=True)
+        if not include_matcher:
+            return []
+        return [_tenant for _tenant in self.tenants if include_matcher.match(_tenant)]
+
+
 def import_from_tenants_include_string(
     proxy: ProxyClient,
     include_regex: str,
-    vcluster_name: str,
-    tenants: list[str],
-    processed_tenants: list[str],
+    tenant_selector: TenantSelector,
+    processed_tenants: set[str],
     process_once: bool = False,
-) -> None:
-    """Matches tenant based on simple string regex"""
+    tenants_mappings: dict[str, list[dict]] = None,
+) -> list[dict]:
+    """Matches tenant based on simple string regex, returns the mappings to import from the matched tenants"""
     try:
-        _pattern = re.compile(include_regex)
-    except Exception as error:
+        matched_tenants: list[str] = tenant_selector.select(include_regex)
+    except re.error as error:
         print(error)
         print(include_regex, "Not a valid regex")
-        return
-    tenant_mappings = VirtualClusters(proxy)
-    for _tenant in tenants:
-        if _pattern.match(_tenant):
-            if process_once and _tenant in processed_tenants:
-                print(
-                    f"Tenant {_tenant} was already processed. Skipping",
-                    processed_tenants,
-                )
-                continue
-            else:
-                tenant_topics: list[dict] = get_tenant_logical_topics(proxy, _tenant)
-                for _import_tenant_topic in tenant_topics:
-                    tenant_mappings.create_vcluster_topic_mapping(
-                        vcluster_name,
-                        _import_tenant_topic["logicalTopicName"],
-                        _import_tenant_topic["physicalTopicName"],
-                        read_only=False,
-                    )
-                processed_tenants.append(_tenant)
+        return []
+    mappings_to_import: list[dict] = []
+    for _tenant in matched_tenants:
+        if process_once and _tenant in processed_tenants:
+            print(
+                f"Tenant {_tenant} was already processed. Skipping",
+                processed_tenants,
+            )
+            continue
+        tenant_topics: list[dict] = get_tenant_logical_topics(
+            proxy, _tenant, tenants_mappings=tenants_mappings
+        )
+        for _import_tenant_topic in tenant_topics:
+            mappings_to_import.append(
+                {
+                    "logicalTopicName": _import_tenant_topic["logicalTopicName"],
+                    "physicalTopicName": _import_tenant_topic["physicalTopicName"],
+                    "readOnly": False,
+                }
+            )
+        processed_tenants.add(_tenant)
+    return mappings_to_import
+
+
+def filter_tenant_topics(
+    tenant_topics: list[dict],
+    include_matcher: RegexesMatcher,
+    exclude_matcher: RegexesMatcher | None = None,
+) -> list[dict]:
+    """
+    Returns, in one pass, the topics with a logical name matching include_matcher and not exclude_matcher.
+    Each logical topic name is returned only once.
+    """
+    selected_topics: set[str] = set()
+    filtered_topics: list[dict] = []
+    for _topic in tenant_topics:
+        _logical_name: str = _topic["logicalTopicName"]
+        if _logical_name in selected_topics:
+            continue
+        if exclude_matcher and exclude_matcher.match(_logical_name):
+            LOG.debug(f"Topic: {_logical_name} matched against exclude regexes")
+            continue
+        if include_matcher.match(_logical_name):
+            selected_topics.add(_logical_name)
+            filtered_topics.append(_topic)
+    return filtered_topics
 
 
 def import_from_tenants_include_dict(
     proxy: ProxyClient,
     mapping_import_config: dict,
-    tenant_name: str,
-    tenants: list[str],
-    processed_tenants: list[str],
+    tenant_selector: TenantSelector,
+    processed_tenants: set[str],
     process_once: bool = False,
-) -> None:
-    """Import topic mappings tenants from complex definition"""
+    tenants_mappings: dict[str, list[dict]] = None,
+) -> list[dict]:
+    """Import topic mappings tenants from complex definition, returns the mappings to import"""
     try:
-        _pattern = re.compile(mapping_import_config["tenant_regex"])
-    except Exception as error:
+        matched_tenants: list[str] = tenant_selector.select(
+            mapping_import_config["tenant_regex"]
+        )
+    except re.error as error:
         print(error)
         print(mapping_import_config["tenant_regex"], "Not a valid regex")
-        return
+        return []
     topics_exclude_pattern_regexes: list = set_else_none(
         "logical_topics_exclude_regexes", mapping_import_config
     )
     topics_include_pattern_regexes: list = set_else_none(
         "logical_topics_include_regexes", mapping_import_config, ["^(.*)$"]
     )
-    topics_exclude_patterns: list[re.Pattern] = []
-    topics_include_patterns: list[re.Pattern] = []
-    if topics_exclude_pattern_regexes:
-        for _exclude_pattern in topics_exclude_pattern_regexes:
-            try:
-                topics_exclude_patterns.append(re.compile(_exclude_pattern))
-            except Exception as error:
-                LOG.exception(error)
-                LOG.error(
-                    "logical_topics_exclude_regexes",
-                    _exclude_pattern,
-                    "Not a valid regex. Skipping",
-                )
-                return
-
-    if topics_include_pattern_regexes:
-        for _include_pattern in topics_include_pattern_regexes:
-            try:
-                topics_include_patterns.append(re.compile(_include_pattern))
-            except Exception as error:
-                LOG.exception(error)
-                LOG.error(
-                    "logical_topics_include_regexes",
-                    _include_pattern,
-                    "Not a valid regex. Skipping",
-                )
-                return
+    try:
+        topics_exclude_matcher = RegexesMatcher(topics_exclude_pattern_regexes)
+        topics_include_matcher = RegexesMatcher(topics_include_pattern_regexes)
+    except re.error as error:
+        LOG.exception(error)
+        LOG.error(
+            f"{mapping_import_config['tenant_regex']} - logical_topics_include_regexes "
+            "or logical_topics_exclude_regexes are not valid regexes. Skipping"
+        )
+        return []
 
-    tenant_mappings = VirtualClusters(proxy)
-    for _tenant in tenants:
-        if _pattern.match(_tenant):
-            if process_once and _tenant in processed_tenants:
-                LOG.debug(
-                    "Tenant {} was already processed. Skipping {}".format(
-                        _tenant, processed_tenants
-                    ),
-                )
-                continue
-            else:
-                processed_tenants.append(_tenant)
-        else:
-            LOG.debug(f"Skipping tenant {_tenant}")
+    grant_write_access = keyisset("grant_write_access", mapping_import_config)
+    mappings_to_import: list[dict] = []
+    for _tenant in matched_tenants:
+        if process_once and _tenant in processed_tenants:
+            LOG.debug(
+                "Tenant {} was already processed. Skipping {}".format(
+                    _tenant, processed_tenants
+                ),
+            )
             continue
-        tenant_topics: list[dict] = get_tenant_logical_topics(proxy, _tenant)
-        topics_to_import: list[dict] = deepcopy(tenant_topics)
-        for _import_tenant_topic in tenant_topics:
-            for _exclude_pattern in topics_exclude_patterns:
-                if (
-                    _exclude_pattern.match(_import_tenant_topic["logicalTopicName"])
-                    and _import_tenant_topic["logicalTopicName"] in topics_to_import
-                ):
-                    topics_to_import.remove(_import_tenant_topic)
-                    LOG.debug(
-                        "Topic: {} matched against exclude regex: {}".format(
-                            _import_tenant_topic["logicalTopicName"],
-                            _exclude_pattern.pattern,
-                        ),
-                    )
-        LOG.debug(
-            "Topics post exclude", [_t["logicalTopicName"] for _t in topics_to_import]
+        processed_tenants.add(_tenant)
+        tenant_topics: list[dict] = get_tenant_logical_topics(
+            proxy, _tenant, tenants_mappings=tenants_mappings
+        )
+        final_topics_import: list[dict] = filter_tenant_topics(
+            tenant_topics, topics_include_matcher, topics_exclude_matcher
         )
-        final_topics_import: list[dict] = []
-        for _import_tenant_topic in topics_to_import:
-            for _include_pattern in topics_include_patterns:
-                if (
-                    _include_pattern.match(_import_tenant_topic["logicalTopicName"])
-                    and _import_tenant_topic not in final_topics_import
-                ):
-                    final_topics_import.append(_import_tenant_topic)
-                    break
         LOG.debug(f"Tenant:{_tenant} - Final topic list:{final_topics_import}")
-        grant_write_access = keyisset("grant_write_access", mapping_import_config)
         for topic_mapping in final_topics_import:
-            try:
-                tenant_mappings.create_vcluster_topic_mapping(
-                    tenant_name,
-                    topic_mapping["logicalTopicName"],
-                    topic_mapping["physicalTopicName"],
-                    read_only=not grant_write_access,
-                )
-                if grant_write_access:
-                    LOG.warn(
-                        "{}:{} - Granting write access.".format(
-                            _tenant, topic_mapping["physicalTopicName"]
-                        )
-                    )
-            except ProxyApiException:
-                print(
-                    "Failed to create mapping from {}: {} does not seem to exist.".format(
+            if grant_write_access:
+                LOG.warn(
+                    "{}:{} - Granting write access.".format(
                         _tenant, topic_mapping["physicalTopicName"]
                     )
                 )
+            mappings_to_import.append(
+                {
+                    "logicalTopicName": topic_mapping["logicalTopicName"],
+                    "physicalTopicName": topic_mapping["physicalTopicName"],
+                    "readOnly": not grant_write_access,
+                }
+            )
+    return mappings_to_import
 
 
-def import_from_other_tenants(
-    proxy: ProxyClient, import_config: dict, tenant_name: str
-) -> None:
-    """Allows to import existing topics from other tenants in read-only"""
-    tenants: list[str] = VirtualClusters(proxy).list_vclusters(as_list=True)[
-        "vclusters"
-    ]
+def select_included_tenants(
+    tenant_selector: TenantSelector, include_list: list[str | dict]
+) -> list[str]:
+    """Returns the tenants matching any of the include_regex items"""
+    return tenant_selector.select_any(
+        [
+            (
+                _include_item
+                if isinstance(_include_item, str)
+                else _include_item.get("tenant_regex")
+            )
+            for _include_item in include_list
+        ]
+    )
+
+
+def prefetch_tenants_mappings(
+    proxy: ProxyClient,
+    tenant_selector: TenantSelector,
+    include_list: list[str | dict],
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, list[dict]]:
+    """Lists, in parallel, the topic mappings of all the tenants matching any of the include_regex"""
+    matched_tenants: list[str] = select_included_tenants(tenant_selector, include_list)
+    tenant_mappings = VirtualClusters(proxy)
+    return dict(
+        zip(
+            matched_tenants,
+            run_concurrently(
+                lambda _tenant: tenant_mappings.list_vcluster_topic_mappings(
+                    _tenant, as_list=True
+                ),
+                matched_tenants,
+                concurrency,
+            ),
+        )
+    )
+
+
+def resolve_other_tenants_mappings(
+    proxy: ProxyClient, import_config: dict, concurrency: int = DEFAULT_CONCURRENCY
+) -> list[dict]:
+    """
+    Returns the topic mappings to import from other tenants, as defined in import_from_tenant.
+    The tenants mappings are listed once, and shared by all the include_regex.
+    """
     exclude_list = set_else_none("exclude_regex", import_config, [])
     include_list = set_else_none("include_regex", import_config, [])
-    processed_tenants: list[str] = []
     process_once: bool = keyisset("process_tenant_only_once", import_config)
     if not include_list:
         raise ValueError("There must be at least one item in include_regex")
-    for _regex in exclude_list:
-        try:
-            _pattern = re.compile(_regex)
-            for _tenant in tenants:
-                if _pattern.match(_tenant):
-                    tenants.remove(_tenant)
-        except Exception as error:
-            print(error)
-            print(_regex, "not a valid regex. Ignoring")
+    tenant_selector = TenantSelector(
+        VirtualClusters(proxy).list_vclusters(as_list=True)["vclusters"],
+        exclude_list,
+    )
+    tenants_mappings: dict[str, list[dict]] = prefetch_tenants_mappings(
+        proxy, tenant_selector, include_list, concurrency
+    )
+    return import_from_tenants_include_list(
+        proxy, include_list, tenant_selector, process_once, tenants_mappings
+    )
+
+
+def import_from_tenants_include_list(
+    proxy: ProxyClient | None,
+    include_list: list[str | dict],
+    tenant_selector: TenantSelector,
+    process_once: bool = False,
+    tenants_mappings: dict[str, list[dict]] = None,
+) -> list[dict]:
+    """
+    Returns the mappings to import for each include_regex item, in order.
+    If tenants_mappings holds the mappings of all the matched tenants, no API call is made.
+    """
+    processed_tenants: set[str] = set()
+    mappings_to_import: list[dict] = []
     for _include_item in include_list:
         if isinstance(_include_item, str):
-            import_from_tenants_include_string(
+            mappings_to_import += import_from_tenants_include_string(
                 proxy,
                 _include_item,
-                tenant_name,
-                tenants,
+                tenant_selector,
                 processed_tenants,
                 process_once,
+                tenants_mappings,
             )
         elif isinstance(_include_item, dict):
-            import_from_tenants_include_dict(
+            mappings_to_import += import_from_tenants_include_dict(
                 proxy,
                 _include_item,
-                tenant_name,
-                tenants,
+                tenant_selector,
                 processed_tenants,
                 process_once,
+                tenants_mappings,
             )
         else:
             raise TypeError(
@@ -244,6 +356,114 @@ def import_from_other_tenants(
                 "expected one of",
                 (str, dict),
             )
+    return mappings_to_import
+
+
+def import_from_other_tenants(
+    proxy: ProxyClient,
+    import_config: dict,
+    tenant_name: str,
+    ignore_conflicts: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, list[str]]:
+    """Allows to import existing topics from other tenants in read-only"""
+    return propagate_tenant_mappings(
+        VirtualClusters(proxy),
+        resolve_other_tenants_mappings(proxy, import_config, concurrency),
+        tenant_name,
+        ignore_conflicts,
+        concurrency,
+    )
+
+
+def create_tenant_mapping(
+    tenant_mappings: VirtualClusters,
+    mapping: dict,
+    vcluster_name: str,
+    ignore_conflicts: bool = False,
+) -> str:
+    """
+    Creates a single topic mapping and returns the outcome: created, conflicted or failed.
+    409 are ignored if ignore_conflicts is set, other errors are logged and the mapping is skipped.
+    See get_mapping_error_outcome.
+    """
+    try:
+        tenant_mappings.create_vcluster_topic_mapping(
+            vcluster=vcluster_name,
+            logical_topic_name=mapping["logicalTopicName"],
+            physical_topic_name=mapping["physicalTopicName"],
+            read_only=keyisset("readOnly", mapping),
+        )
+        LOG.debug(
+            "Successfully created mapping {} -> {}".format(
+                mapping["logicalTopicName"], mapping["physicalTopicName"]
+            )
+        )
+        return "created"
+    except Exception as error:
+        return get_mapping_error_outcome(error, ignore_conflicts)
+
+
+def get_mapping_error_outcome(error: Exception, ignore_conflicts: bool = False) -> str:
+    """
+    Returns the outcome for a mapping which failed to be created: conflicted for a 409 if ignore_conflicts is set,
+    failed otherwise, i.e. for a 400, a 5xx or a timeout, so that the other mappings are still imported.
+    Authentication errors are raised, as they fail all the calls.
+    """
+    if isinstance(error, GenericUnauthorized):
+        raise error
+    if isinstance(error, ProxyGenericException):
+        if error.code == 409 and ignore_conflicts:
+            print(error)
+            return "conflicted"
+        elif error.code == 400:
+            LOG.error(error.details["message"])
+            return "failed"
+        LOG.error(f"Unexpected {error.code} error - {error.details}")
+        return "failed"
+    LOG.error(f"Unexpected error - {error}")
+    return "failed"
+
+
+def get_mapping_delete_error_outcome(
+    error: Exception, mapping: dict, vcluster_name: str
+) -> str:
+    """
+    Returns failed for a mapping which failed to be deleted, for update or delete, and left as is.
+    Authentication errors are raised, as they fail all the calls.
+    """
+    if isinstance(error, GenericUnauthorized):
+        raise error
+    LOG.error(
+        f"{vcluster_name} - {mapping['logicalTopicName']} - Failed to delete the mapping - {error}"
+    )
+    return "failed"
+
+
+def get_mapping_update_outcome(outcome: str, mapping: dict, vcluster_name: str) -> str:
+    """
+    Returns the outcome of an update, once the mapping was deleted, from the outcome of creating it again:
+    updated if created, else failed, the mapping being deleted.
+    """
+    if outcome == "created":
+        return "updated"
+    LOG.error(
+        f"{vcluster_name} - {mapping['logicalTopicName']} - The mapping was deleted to be updated, "
+        f"but could not be created again ({outcome}). The mapping is now missing."
+    )
+    return "failed"
+
+
+def summarize_mappings_outcomes(
+    mappings: list[dict], outcomes: list[str], outcomes_names: list[str]
+) -> dict[str, list[str]]:
+    """Returns the logical topic names, sorted, for each outcome"""
+    summary: dict[str, list[str]] = {_outcome: [] for _outcome in outcomes_names}
+    for mapping, outcome in zip(mappings, outcomes):
+        summary[outcome].append(mapping["logicalTopicName"])
+    for _topics in summary.values():
+        _topics.sort()
+    return summary
 
 
 def propagate_tenant_mappings(
@@ -251,51 +471,194 @@ def propagate_tenant_mappings(
     mappings: list[dict],
     vcluster_name: str,
     ignore_conflicts: bool = False,
-) -> None:
-    for mapping in mappings:
-        try:
-            tenant_mappings.create_vcluster_topic_mapping(
-                vcluster=vcluster_name,
-                logical_topic_name=mapping["logicalTopicName"],
-                physical_topic_name=mapping["physicalTopicName"],
-                read_only=keyisset("readOnly", mapping),
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, list[str]]:
+    """
+    Creates the mappings for the vCluster, with up to `concurrency` API calls in flight.
+    Returns the logical topic names, sorted, for each outcome (created, conflicted, failed).
+    """
+    outcomes: list[str] = run_concurrently(
+        lambda _mapping: create_tenant_mapping(
+            tenant_mappings, _mapping, vcluster_name, ignore_conflicts
+        ),
+        mappings,
+        concurrency,
+    )
+    return summarize_mappings_outcomes(
+        mappings, outcomes, ["created", "conflicted", "failed"]
+    )
+
+
+def is_managed_mapping(mapping: dict) -> bool:
+    """
+    Whether the mapping can be managed from the config file: only alias mappings can.
+    Concentrated topics are not, as identified by the concentrated and type properties of the mapping.
+    """
+    return (
+        not keyisset("concentrated", mapping)
+        and (mapping.get("type") or ALIAS_MAPPING_TYPE).lower() == ALIAS_MAPPING_TYPE
+    )
+
+
+def plan_tenant_mappings(
+    existing_mappings: list[dict],
+    desired_mappings: list[dict],
+    vcluster_name: str,
+    remove_unset: bool = False,
+) -> dict[str, list[dict]]:
+    """
+    Compares the mappings of the vCluster with the desired ones, indexed by logicalTopicName,
+    and returns the mappings to create, update and delete, sorted by logicalTopicName.
+    If the same logical topic is defined more than once, the first definition is used.
+    Mappings are only deleted if remove_unset is set.
+    """
+    existing_index: dict[str, dict] = {
+        _mapping["logicalTopicName"]: _mapping for _mapping in existing_mappings
+    }
+    desired_index: dict[str, dict] = {}
+    for _mapping in desired_mappings:
+        desired_index.setdefault(_mapping["logicalTopicName"], _mapping)
+
+    plan: dict[str, list[dict]] = {"create": [], "update": [], "delete": []}
+    for _logical_name, _desired in desired_index.items():
+        _existing = existing_index.get(_logical_name)
+        if _existing is None:
+            plan["create"].append(_desired)
+        elif not is_managed_mapping(_existing):
+            LOG.warning(
+                f"{vcluster_name} - {_logical_name} is not an alias mapping. Skipping"
             )
-            LOG.debug(
-                "Successfully created mapping {} -> {}".format(
-                    mapping["logicalTopicName"], mapping["physicalTopicName"]
+        elif _existing["physicalTopicName"] != _desired[
+            "physicalTopicName"
+        ] or keyisset("readOnly", _existing) != keyisset("readOnly", _desired):
+            plan["update"].append(_desired)
+    if remove_unset:
+        for _logical_name, _existing in existing_index.items():
+            if _logical_name not in desired_index and is_managed_mapping(_existing):
+                plan["delete"].append(_existing)
+    for _mappings in plan.values():
+        _mappings.sort(key=lambda _mapping: _mapping["logicalTopicName"])
+    return plan
+
+
+def apply_tenant_mappings_plan(
+    tenant_mappings: VirtualClusters,
+    plan: dict[str, list[dict]],
+    vcluster_name: str,
+    ignore_conflicts: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> dict[str, list[str]]:
+    """
+    Applies the changes from plan_tenant_mappings. Updates are done by deleting then creating the mapping again.
+    Returns the logical topic names, sorted, for each outcome.
+    """
+
+    def apply_change(change: tuple[str, dict]) -> str:
+        _action, _mapping = change
+        if _action in ["update", "delete"]:
+            try:
+                tenant_mappings.delete_vcluster_topic_mapping(
+                    vcluster_name, _mapping["logicalTopicName"]
                 )
-            )
-        except ProxyGenericException as error:
-            if error.code == 409 and ignore_conflicts:
-                print(error)
-                pass
-            elif error.code == 400:
-                LOG.error(error.details["message"])
-                pass
-            else:
-                print("Unexpected 4xx error", error.details["message"])
-                raise error
-        except Exception as error:
-            print("Unexpected error", error)
-            raise error
+            except Exception as error:
+                return get_mapping_delete_error_outcome(error, _mapping, vcluster_name)
+            if _action == "delete":
+                return "deleted"
+            try:
+                _outcome = create_tenant_mapping(
+                    tenant_mappings, _mapping, vcluster_name, ignore_conflicts
+                )
+            except Exception as error:
+                _outcome = str(error)
+            return get_mapping_update_outcome(_outcome, _mapping, vcluster_name)
+        return create_tenant_mapping(
+            tenant_mappings, _mapping, vcluster_name, ignore_conflicts
+        )
+
+    changes: list[tuple[str, dict]] = [
+        (_action, _mapping)
+        for _action, _mappings in plan.items()
+        for _mapping in _mappings
+    ]
+    outcomes: list[str] = run_concurrently(apply_change, changes, concurrency)
+    return summarize_mappings_outcomes(
+        [_mapping for _, _mapping in changes], outcomes, RECONCILE_OUTCOMES
+    )
+
+
+def log_mappings_summary(tenant_name: str, summary: dict[str, list[str]]) -> None:
+    """Logs the count of mappings for each outcome, and the full summary in debug"""
+    LOG.info(
+        "{} - mappings {}".format(
+            tenant_name,
+            ", ".join(
+                f"{_outcome}: {len(_topics)}" for _outcome, _topics in summary.items()
+            ),
+        )
+    )
+    if summary.get("failed"):
+        LOG.error(f"{tenant_name} - mappings failed: {', '.join(summary['failed'])}")
+    LOG.debug(f"{tenant_name} - mappings import summary: {summary}")
 
 
 def import_tenants_mappings(
-    client: ProxyClient, config_content: dict, tenant_name: str, schema: dict = None
-) -> list[dict]:
-    """Will create mappings from the config content, and return the final mappings for the tenant"""
-    if not schema:
-        schema = loads(DEFAULT_SCHEMA_PATH.read_text())
-    validate(config_content, schema)
+    client: ProxyClient,
+    config_content: dict,
+    tenant_name: str,
+    schema: dict = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    reconcile: bool = False,
+    plan_only: bool = False,
+    remove_unset: bool = False,
+) -> list[dict] | dict[str, list[dict]]:
+    """
+    Will create mappings from the config content, and return the final mappings for the tenant.
+    With reconcile, only the differences between the tenant mappings and the config are applied.
+    With plan_only, the differences are returned and nothing is changed.
+    remove_unset deletes the mappings not in the config, and implies reconcile.
+    """
+    validate_spec(config_content, "tenant_mappings", schema)
     tenant_name = set_else_none("tenant_name", config_content, tenant_name)
     ignore_conflicts = keyisset("ignore_duplicates_conflict", config_content)
     mappings = config_content["mappings"]
     tenant_mappings = VirtualClusters(client)
-    propagate_tenant_mappings(tenant_mappings, mappings, tenant_name, ignore_conflicts)
     import_from_other_tenants_config = set_else_none(
         "import_from_tenant", config_content
     )
-    if import_from_other_tenants_config:
-        import_from_other_tenants(client, import_from_other_tenants_config, tenant_name)
+    if reconcile or plan_only or remove_unset:
+        desired_mappings: list[dict] = list(mappings)
+        if import_from_other_tenants_config:
+            desired_mappings += resolve_other_tenants_mappings(
+                client, import_from_other_tenants_config, concurrency
+            )
+        existing_mappings: list[dict] = tenant_mappings.list_vcluster_topic_mappings(
+            tenant_name, True
+        )
+        plan = plan_tenant_mappings(
+            existing_mappings, desired_mappings, tenant_name, remove_unset
+        )
+        if plan_only:
+            return plan
+        if not any(plan.values()):
+            LOG.info(f"{tenant_name} - mappings are up to date")
+            return existing_mappings
+        summary = apply_tenant_mappings_plan(
+            tenant_mappings, plan, tenant_name, ignore_conflicts, concurrency
+        )
+    else:
+        summary = propagate_tenant_mappings(
+            tenant_mappings, mappings, tenant_name, ignore_conflicts, concurrency
+        )
+        if import_from_other_tenants_config:
+            import_summary = import_from_other_tenants(
+                client,
+                import_from_other_tenants_config,
+                tenant_name,
+                ignore_conflicts,
+                concurrency,
+            )
+            for _outcome, _topics in import_summary.items():
+                summary[_outcome] = sorted(summary[_outcome] + _topics)
+    log_mappings_summary(tenant_name, summary)
 
     return tenant_mappings.list_vcluster_topic_mappings(tenant_name, True)
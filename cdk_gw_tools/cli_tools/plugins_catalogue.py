@@ -0,0 +1,92 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Plugins catalogue, optionally cached on disk per Gateway URL and admin API version.
+The admin API does not expose the Gateway build version, so a Gateway upgrade (i.e. with new plugins) does not
+invalidate the cache: the cache TTL and force_refresh (--refresh-plugins-cache) are the only invalidation.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from hashlib import sha256
+from os import environ
+from pathlib import Path
+
+from cdk_proxy_api_client.plugins import Plugins
+from cdk_proxy_api_client.proxy_api import ProxyClient
+
+from cdk_gw_tools.common.logging import LOG
+
+PLUGINS_CACHE_DIR: Path = Path(
+    environ.get("XDG_CACHE_HOME", Path(environ.get("HOME", ".")) / ".cache"),
+    "cdk_gw_tools",
+    "plugins",
+)
+
+
+def get_plugins_cache_path(proxy: ProxyClient, extended: bool = False) -> Path:
+    """
+    Cache file for the Gateway URL, admin API version (proxy.version, i.e. v1, not the Gateway version)
+    and whether the catalogue is extended
+    """
+    cache_key: str = f"{proxy.client.url}|{proxy.version}|{extended}"
+    return PLUGINS_CACHE_DIR / f"{sha256(cache_key.encode()).hexdigest()}.json"
+
+
+def read_plugins_cache(cache_path: Path, cache_ttl: int) -> dict | None:
+    """Returns the cached catalogue if the file exists and is younger than cache_ttl seconds"""
+    try:
+        if time.time() - cache_path.stat().st_mtime > cache_ttl:
+            return None
+        return json.loads(cache_path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def write_plugins_cache(cache_path: Path, catalogue: dict) -> None:
+    """Stores the catalogue. Failing to write the cache is not fatal"""
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(catalogue))
+        tmp_path.replace(cache_path)
+    except OSError as error:
+        LOG.warning(f"Unable to write plugins cache {cache_path}: {error}")
+
+
+def get_plugins_catalogue(
+    proxy: ProxyClient,
+    extended: bool = False,
+    cache_ttl: int = 0,
+    force_refresh: bool = False,
+) -> dict:
+    """
+    Returns the plugins catalogue from Gateway. With a cache_ttl (seconds), the catalogue is read from
+    and saved to the on-disk cache. force_refresh skips reading the cache but still updates it.
+    """
+    cache_path: Path | None = (
+        get_plugins_cache_path(proxy, extended) if cache_ttl > 0 else None
+    )
+    if cache_path and not force_refresh:
+        catalogue = read_plugins_cache(cache_path, cache_ttl)
+        if catalogue is not None:
+            LOG.debug(f"Plugins catalogue read from cache {cache_path}")
+            return catalogue
+    catalogue: dict = Plugins(proxy).list_all_plugins(extended=extended).json()
+    if cache_path:
+        write_plugins_cache(cache_path, catalogue)
+    return catalogue
+
+
+def get_plugins_classes(
+    proxy: ProxyClient, cache_ttl: int = 0, force_refresh: bool = False
+) -> set[str]:
+    """Returns the set of plugin classes available on Gateway"""
+    return set(
+        get_plugins_catalogue(proxy, cache_ttl=cache_ttl, force_refresh=force_refresh)[
+            "plugins"
+        ]
+    )
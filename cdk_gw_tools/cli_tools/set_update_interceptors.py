@@ -1,98 +1,387 @@
 #   SPDX-License-Identifier: Apache-2.0
 #   Copyright 2023 John Mille <john@ews-network.net>
 
-"""Wrapper to configure mappings for a given tenant"""
+"""Compares the interceptors config file with the interceptors on Gateway, and applies the differences"""
 
 from __future__ import annotations
 
 import json
 from dataclasses import asdict
+from typing import Optional, Tuple
 
+from cdk_proxy_api_client.errors import GenericNotFound
 from cdk_proxy_api_client.interceptors import Interceptors
-from cdk_proxy_api_client.plugins import Plugins
 from cdk_proxy_api_client.proxy_api import ProxyClient
 from dacite import from_dict
 
+from cdk_gw_tools.cli_tools.plugins_catalogue import get_plugins_classes
+from cdk_gw_tools.common.concurrency import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    call_with_retries,
+    run_concurrently,
+)
+from cdk_gw_tools.common.logging import LOG
 from cdk_gw_tools.specs.interceptors_config import *
 
+# (interceptor_name, is_global, vcluster_name, group_name, username)
+InterceptorKey = Tuple[str, bool, Optional[str], Optional[str], Optional[str]]
 
-def set_update_for_interceptor_context(
-    interceptors_client: Interceptors,
+INTERCEPTOR_COMPARED_FIELDS: tuple[str, ...] = ("pluginClass", "priority", "config")
+
+
+def get_interceptor_context_definitions(
     plugin_class: str,
     interceptor_context: InterceptorContext,
     interceptor_name: str,
     vcluster_name: str = None,
-):
-    """Sets the interceptor for a given Interceptor Context"""
+) -> dict[InterceptorKey, dict]:
+    """Returns the interceptor definitions for a given Interceptor Context"""
+    definitions: dict[InterceptorKey, dict] = {}
     if interceptor_context.definition:
         plugin_config: dict = asdict(interceptor_context.definition)
         plugin_config["pluginClass"] = plugin_class
-        interceptors_client.update_interceptor(
-            interceptor_name=interceptor_name,
-            interceptor_config=plugin_config,
-            vcluster_name=vcluster_name,
+        definitions[(interceptor_name, False, vcluster_name, None, None)] = (
+            plugin_config
         )
     if interceptor_context.groups:
         for group_name, group_config in interceptor_context.groups.items():
             plugin_config: dict = asdict(group_config)
             plugin_config["pluginClass"] = plugin_class
-            interceptors_client.update_interceptor(
-                interceptor_name,
-                interceptor_config=plugin_config,
-                group_name=group_name,
-                vcluster_name=vcluster_name,
+            definitions[(interceptor_name, False, vcluster_name, group_name, None)] = (
+                plugin_config
             )
     if interceptor_context.usernames:
         for user_name, user_config in interceptor_context.usernames.items():
             plugin_config: dict = asdict(user_config)
             plugin_config["pluginClass"] = plugin_class
-            interceptors_client.update_interceptor(
-                interceptor_name,
-                interceptor_config=plugin_config,
-                username=user_name,
-                vcluster_name=vcluster_name,
+            definitions[(interceptor_name, False, vcluster_name, None, user_name)] = (
+                plugin_config
             )
+    return definitions
 
 
-def set_update_interceptors(proxy: ProxyClient, interceptors: dict):
-    plugins_client = Plugins(proxy)
-    interceptors_client = Interceptors(proxy)
-    plugins_list = plugins_client.list_all_plugins(as_list=True)
-    gw_interceptors_config: GwInterceptorsConfig = from_dict(
-        data_class=GwInterceptorsConfig, data=interceptors
-    )
+def get_desired_interceptors(
+    gw_interceptors_config: GwInterceptorsConfig,
+) -> dict[InterceptorKey, dict]:
+    """Flattens the interceptors config file into the definition for each (interceptor, scope, target)"""
+    definitions: dict[InterceptorKey, dict] = {}
     for (
         interceptor_name,
         interceptor_config,
     ) in gw_interceptors_config.interceptors.items():
         plugin_class = interceptor_config.pluginClass
-        if plugin_class not in plugins_list:
-            raise ValueError(
-                "Interceptor %s does not exist. Available ones"
-                % (interceptor_config.pluginClass,),
-                plugins_list,
-            )
         if interceptor_config.gateway:
             plugin_config: dict = asdict(interceptor_config.gateway)
             plugin_config["pluginClass"] = plugin_class
-            interceptors_client.update_interceptor(
-                interceptor_name=interceptor_name,
-                interceptor_config=plugin_config,
-                is_global=True,
-            )
+            definitions[(interceptor_name, True, None, None, None)] = plugin_config
         if interceptor_config.passthrough:
-            set_update_for_interceptor_context(
-                interceptors_client,
-                plugin_class,
-                interceptor_config.passthrough,
-                interceptor_name,
+            definitions.update(
+                get_interceptor_context_definitions(
+                    plugin_class,
+                    interceptor_config.passthrough,
+                    interceptor_name,
+                )
             )
         if interceptor_config.vclusters:
             for vcluster_name, vcluster_context in interceptor_config.vclusters.items():
-                set_update_for_interceptor_context(
-                    interceptors_client,
-                    plugin_class,
-                    vcluster_context,
+                definitions.update(
+                    get_interceptor_context_definitions(
+                        plugin_class,
+                        vcluster_context,
+                        interceptor_name,
+                        vcluster_name=vcluster_name,
+                    )
+                )
+    return definitions
+
+
+# vCluster of the interceptors set without vCluster, on the passthrough endpoints
+PASSTHROUGH_VCLUSTER: str = "passthrough"
+ALL_INTERCEPTORS_KEYS: tuple[str, ...] = ("global", "vClusters")
+VCLUSTER_INTERCEPTORS_KEYS: tuple[str, ...] = ("interceptors", "groups", "usernames")
+
+
+def get_interceptors_list(
+    interceptors: list, scope_name: str
+) -> list[dict[str, str | int | dict]]:
+    """Validates the list of interceptors of a scope. Each interceptor must have a name and a pluginClass"""
+    if not isinstance(interceptors, list):
+        raise ValueError(f"{scope_name} - interceptors not a list: {interceptors}")
+    for _interceptor in interceptors:
+        if not (
+            isinstance(_interceptor, dict)
+            and "name" in _interceptor
+            and "pluginClass" in _interceptor
+        ):
+            raise ValueError(
+                f"{scope_name} - interceptor definition not recognised: {_interceptor}"
+            )
+    return interceptors
+
+
+def get_targets_interceptors(
+    targets_interceptors: dict, scope_name: str
+) -> dict[str, list[dict]]:
+    """Validates the interceptors of the groups or usernames of a vCluster, i.e. {"group-name": [interceptors]}"""
+    if not isinstance(targets_interceptors, dict):
+        raise ValueError(f"{scope_name} - not a mapping: {targets_interceptors}")
+    return {
+        _target: get_interceptors_list(_interceptors, f"{scope_name}/{_target}")
+        for _target, _interceptors in targets_interceptors.items()
+    }
+
+
+def get_current_interceptors(all_interceptors: dict) -> dict[InterceptorKey, dict]:
+    """
+    Normalises the Interceptors.get_all_gw_interceptors response (/admin/interceptors/v1/all) into
+    the definition for each (interceptor, scope, target). The response is expected to be
+
+        {
+          "global": [interceptor],
+          "vClusters": {
+            "<vCluster name, or passthrough>": {
+              "interceptors": [interceptor],
+              "groups": {"<group name>": [interceptor]},
+              "usernames": {"<username>": [interceptor]}
+            }
+          }
+        }
+
+    with each interceptor defined as {"name", "pluginClass", "priority", "config"}.
+    The scope of each interceptor is only set from the keys it is listed under.
+    Raises ValueError if any part of the response differs, as interceptors could then be missed or deleted.
+    The per-scope endpoints (Interceptors.get_all_interceptor) are not used, as they only list the scopes
+    already known, which misses the interceptors of the scopes not in the config file.
+    """
+    if not isinstance(all_interceptors, dict):
+        raise ValueError(f"Interceptors not recognised: {all_interceptors}")
+    unknown_keys = set(all_interceptors).difference(ALL_INTERCEPTORS_KEYS)
+    if unknown_keys:
+        raise ValueError(f"Interceptors keys not recognised: {sorted(unknown_keys)}")
+    current: dict[InterceptorKey, dict] = {}
+    for _interceptor in get_interceptors_list(
+        all_interceptors.get("global", []), "global"
+    ):
+        current[(_interceptor["name"], True, None, None, None)] = _interceptor
+    vclusters_interceptors = all_interceptors.get("vClusters", {})
+    if not isinstance(vclusters_interceptors, dict):
+        raise ValueError(f"vClusters not a mapping: {vclusters_interceptors}")
+    for _vcluster_name, _vcluster_interceptors in vclusters_interceptors.items():
+        if not isinstance(_vcluster_interceptors, dict) or set(
+            _vcluster_interceptors
+        ).difference(VCLUSTER_INTERCEPTORS_KEYS):
+            raise ValueError(
+                f"{_vcluster_name} - interceptors not recognised: {_vcluster_interceptors}"
+            )
+        vcluster_name = (
+            None if _vcluster_name == PASSTHROUGH_VCLUSTER else _vcluster_name
+        )
+        for _interceptor in get_interceptors_list(
+            _vcluster_interceptors.get("interceptors", []), _vcluster_name
+        ):
+            current[(_interceptor["name"], False, vcluster_name, None, None)] = (
+                _interceptor
+            )
+        for _group_name, _interceptors in get_targets_interceptors(
+            _vcluster_interceptors.get("groups", {}), f"{_vcluster_name}/groups"
+        ).items():
+            for _interceptor in _interceptors:
+                current[
+                    (_interceptor["name"], False, vcluster_name, _group_name, None)
+                ] = _interceptor
+        for _username, _interceptors in get_targets_interceptors(
+            _vcluster_interceptors.get("usernames", {}), f"{_vcluster_name}/usernames"
+        ).items():
+            for _interceptor in _interceptors:
+                current[
+                    (_interceptor["name"], False, vcluster_name, None, _username)
+                ] = _interceptor
+    return current
+
+
+def plan_interceptors(
+    desired: dict[InterceptorKey, dict],
+    current: dict[InterceptorKey, dict],
+    remove_unset: bool = False,
+) -> tuple[dict[InterceptorKey, dict], list[InterceptorKey]]:
+    """
+    Returns the interceptors to create or update, for which the pluginClass, priority or config differ,
+    and, if remove_unset is set, the interceptors not declared anymore, to delete.
+    """
+    to_update: dict[InterceptorKey, dict] = {
+        _key: _definition
+        for _key, _definition in desired.items()
+        if _key not in current
+        or any(
+            current[_key].get(_field) != _definition.get(_field)
+            for _field in INTERCEPTOR_COMPARED_FIELDS
+        )
+    }
+    to_delete: list[InterceptorKey] = (
+        [_key for _key in current if _key not in desired] if remove_unset else []
+    )
+    return to_update, to_delete
+
+
+def format_interceptor_key(interceptor_key: InterceptorKey) -> str:
+    """Human friendly representation of the interceptor scope and target"""
+    interceptor_name, is_global, vcluster_name, group_name, username = interceptor_key
+    if is_global:
+        return f"{interceptor_name}@global"
+    target: str = f"vcluster:{vcluster_name}" if vcluster_name else "passthrough"
+    if group_name:
+        target = f"{target}/group:{group_name}"
+    elif username:
+        target = f"{target}/username:{username}"
+    return f"{interceptor_name}@{target}"
+
+
+def apply_interceptor_change(
+    interceptors_client: Interceptors,
+    interceptor_key: InterceptorKey,
+    plugin_config: dict | None,
+    retries: int = DEFAULT_RETRIES,
+) -> Exception | None:
+    """
+    Updates (PUT) the interceptor with plugin_config, or deletes it if plugin_config is None.
+    Retries with backoff on throttling/server errors. Returns the error if it ultimately failed.
+    A delete which gets a 404, i.e. the interceptor was deleted by a previous attempt which timed out, succeeds.
+    """
+    interceptor_name, is_global, vcluster_name, group_name, username = interceptor_key
+    try:
+        if plugin_config is None:
+            try:
+                call_with_retries(
+                    interceptors_client.delete_interceptor,
                     interceptor_name,
+                    is_global=is_global,
                     vcluster_name=vcluster_name,
+                    group_name=group_name,
+                    username=username,
+                    retries=retries,
+                )
+            except GenericNotFound:
+                LOG.debug(
+                    f"{format_interceptor_key(interceptor_key)} - already deleted"
                 )
+        else:
+            call_with_retries(
+                interceptors_client.update_interceptor,
+                interceptor_name,
+                interceptor_config=plugin_config,
+                is_global=is_global,
+                vcluster_name=vcluster_name,
+                group_name=group_name,
+                username=username,
+                retries=retries,
+            )
+        return None
+    except Exception as error:
+        LOG.error(f"{format_interceptor_key(interceptor_key)} - {error}")
+        return error
+
+
+def get_validated_desired_interceptors(
+    interceptors: dict, plugins_classes: set[str]
+) -> dict[InterceptorKey, dict]:
+    """Loads the interceptors config, checks that all the plugin classes exist, and flattens it"""
+    gw_interceptors_config: GwInterceptorsConfig = from_dict(
+        data_class=GwInterceptorsConfig, data=interceptors
+    )
+    for interceptor_config in gw_interceptors_config.interceptors.values():
+        if interceptor_config.pluginClass not in plugins_classes:
+            raise ValueError(
+                "Interceptor %s does not exist. Available ones"
+                % (interceptor_config.pluginClass,),
+                sorted(plugins_classes),
+            )
+    return get_desired_interceptors(gw_interceptors_config)
+
+
+def get_interceptors_changes(
+    desired: dict[InterceptorKey, dict],
+    all_interceptors: dict,
+    remove_unset: bool = False,
+) -> tuple[list[tuple[InterceptorKey, dict | None]], int]:
+    """
+    Returns the interceptors changes, (key, definition) to update or (key, None) to delete,
+    and the number of interceptors unchanged.
+    If the current interceptors cannot be read, all the desired interceptors are updated, and none deleted.
+    """
+    try:
+        current = get_current_interceptors(all_interceptors)
+    except ValueError as error:
+        LOG.error(
+            f"Unable to read the current interceptors - {error}. "
+            "All the interceptors are updated, and none is deleted."
+        )
+        current, remove_unset = {}, False
+    to_update, to_delete = plan_interceptors(desired, current, remove_unset)
+    changes: list[tuple[InterceptorKey, dict | None]] = list(to_update.items()) + [
+        (_interceptor_key, None) for _interceptor_key in to_delete
+    ]
+    return changes, len(desired) - len(to_update)
+
+
+def build_interceptors_report(
+    changes: list[tuple[InterceptorKey, dict | None]],
+    errors: list[Exception | None],
+    unchanged: int,
+) -> dict[str, list[str] | int]:
+    """Returns, and logs, the interceptors updated, deleted, unchanged and those that failed"""
+    report: dict[str, list[str] | int] = {
+        "updated": [],
+        "deleted": [],
+        "failed": [],
+        "unchanged": unchanged,
+    }
+    for (_interceptor_key, _plugin_config), _error in zip(changes, errors):
+        if _error:
+            report["failed"].append(
+                f"{format_interceptor_key(_interceptor_key)}: {_error}"
+            )
+        elif _plugin_config is None:
+            report["deleted"].append(format_interceptor_key(_interceptor_key))
+        else:
+            report["updated"].append(format_interceptor_key(_interceptor_key))
+    LOG.info(
+        f"Interceptors updated: {len(report['updated'])}, deleted: {len(report['deleted'])}, "
+        f"failed: {len(report['failed'])}, unchanged: {report['unchanged']}"
+    )
+    return report
+
+
+def set_update_interceptors(
+    proxy: ProxyClient,
+    interceptors: dict,
+    remove_unset: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    retries: int = DEFAULT_RETRIES,
+    plugins_cache_ttl: int = 0,
+    refresh_plugins_cache: bool = False,
+) -> dict[str, list[str] | int]:
+    """
+    Compares the interceptors defined in the config with the ones on Gateway, and only creates/updates
+    the ones that changed. If remove_unset is set, deletes the interceptors not defined in the config.
+    All the changes are made with up to `concurrency` API calls in flight.
+    Returns the report of the interceptors updated, deleted, unchanged and those that failed.
+    """
+    interceptors_client = Interceptors(proxy)
+    desired = get_validated_desired_interceptors(
+        interceptors,
+        get_plugins_classes(proxy, plugins_cache_ttl, refresh_plugins_cache),
+    )
+    changes, unchanged = get_interceptors_changes(
+        desired,
+        interceptors_client.get_all_gw_interceptors().json(),
+        remove_unset,
+    )
+    errors: list[Exception | None] = run_concurrently(
+        lambda _change: apply_interceptor_change(
+            interceptors_client, _change[0], _change[1], retries
+        ),
+        changes,
+        concurrency,
+    )
+    return build_interceptors_report(changes, errors, unchanged)
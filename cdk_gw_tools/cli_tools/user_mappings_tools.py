@@ -12,109 +12,221 @@ if TYPE_CHECKING:
     from cdk_proxy_api_client.user_mappings import UserMappings
     from cdk_proxy_api_client.vclusters import VirtualClusters
 
+from cdk_proxy_api_client.errors import GenericNotFound
 from dacite import from_dict
 
-from cdk_gw_tools.specs.user_mappings import DetailedIdentity, UserMappingsConfig
+from cdk_gw_tools.common.concurrency import DEFAULT_CONCURRENCY, run_concurrently
+from cdk_gw_tools.common.logging import LOG
+from cdk_gw_tools.specs.user_mappings import DetailedIdentity
+from cdk_gw_tools.specs.user_mappings import UserMappings as UserMappingsDefinition
+from cdk_gw_tools.specs.user_mappings import UserMappingsConfig
 
 
 def create_export_config(
-    vclusters: VirtualClusters, user_mappings: UserMappings
+    vclusters: VirtualClusters,
+    user_mappings: UserMappings,
+    concurrency: int = DEFAULT_CONCURRENCY,
 ) -> UserMappingsConfig:
-    """Lists all vClusters and returns the user mappings."""
-    user_mappings_config: dict = {}
-    mappings_config: dict = {"userMappings": user_mappings_config}
+    """
+    Lists all vClusters and returns the user mappings.
+    The usernames of all vClusters are listed first, then all the identities are retrieved,
+    with up to `concurrency` API calls in flight.
+    """
     _vclusters_list = vclusters.list_vclusters(as_list=True)
-    for _vcluster_name in _vclusters_list["vclusters"]:
-        _vcluster_mappings: list[dict] = []
-        _vcluster_usernames: list[str] = user_mappings.list_mappings(
+    vclusters_names: list[str | None] = _vclusters_list["vclusters"] + [None]
+    vclusters_usernames: list[list[str]] = run_concurrently(
+        lambda _vcluster_name: user_mappings.list_mappings(
             vcluster_name=_vcluster_name
-        ).json()
-        for _username in _vcluster_usernames:
-            _identity = user_mappings.get_user_mapping(
-                username=_username, vcluster_name=_vcluster_name
-            ).json()
-            _vcluster_mappings.append(_identity)
-        user_mappings_config[_vcluster_name] = {"identities": _vcluster_mappings}
-    passthrough_users = user_mappings.list_mappings().json()
-    passthrough_identities: list[dict] = []
-    for _username in passthrough_users:
-        passthrough_identities.append(
-            user_mappings.get_user_mapping(username=_username).json()
-        )
-    user_mappings_config["passthrough"] = {"identities": passthrough_identities}
+        ).json(),
+        vclusters_names,
+        concurrency,
+    )
+    identities_to_get: list[tuple[str | None, str]] = [
+        (_vcluster_name, _username)
+        for _vcluster_name, _usernames in zip(vclusters_names, vclusters_usernames)
+        for _username in _usernames
+    ]
+    identities: list[dict] = run_concurrently(
+        lambda _identity: user_mappings.get_user_mapping(
+            username=_identity[1], vcluster_name=_identity[0]
+        ).json(),
+        identities_to_get,
+        concurrency,
+    )
+    return build_export_config(vclusters_names, identities_to_get, identities)
+
+
+def build_export_config(
+    vclusters_names: list[str | None],
+    identities_to_get: list[tuple[str | None, str]],
+    identities: list[dict],
+) -> UserMappingsConfig:
+    """Groups the identities retrieved by vCluster (None for passthrough) into the user-mappings config"""
+    user_mappings_config: dict = {
+        _vcluster_name if _vcluster_name else "passthrough": {"identities": []}
+        for _vcluster_name in vclusters_names
+    }
+    for (_vcluster_name, _), _identity in zip(identities_to_get, identities):
+        user_mappings_config[_vcluster_name if _vcluster_name else "passthrough"][
+            "identities"
+        ].append(_identity)
+    mappings_config: dict = {"userMappings": user_mappings_config}
     return from_dict(UserMappingsConfig, mappings_config)
 
 
+def get_identity_key(identity: DetailedIdentity | str) -> tuple[str, str]:
+    """Returns the (username, principal) of the identity. The principal defaults to the username."""
+    if isinstance(identity, str):
+        return identity, identity
+    return identity.username, identity.principal or identity.username
+
+
 def validate_identities_are_unique(config: dict) -> UserMappingsConfig:
+    """
+    Validates that each (username, principal) identity is only defined once.
+    Reports all the duplicates, with the vClusters they are defined in.
+    """
     mappings_config = from_dict(UserMappingsConfig, config)
-    identities_recorded: list = []
-    for definition in mappings_config.userMappings.values():
+    identities_vclusters: dict[tuple[str, str], list[str]] = {}
+    duplicates: set[tuple[str, str]] = set()
+    for vcluster_name, definition in mappings_config.userMappings.items():
         for identity in definition.identities:
-            if identity in identities_recorded:
-                raise ValueError(f"Identity {identity} is defined multiple times.")
-            identities_recorded.append(identity)
+            identity_key = get_identity_key(identity)
+            if identity_key in identities_vclusters:
+                duplicates.add(identity_key)
+                identities_vclusters[identity_key].append(vcluster_name)
+            else:
+                identities_vclusters[identity_key] = [vcluster_name]
+    if duplicates:
+        raise ValueError(
+            "Identities are defined multiple times: {}".format(
+                "; ".join(
+                    f"username={_username}, principal={_principal} in "
+                    f"{', '.join(identities_vclusters[(_username, _principal)])}"
+                    for _username, _principal in sorted(duplicates)
+                )
+            )
+        )
     return mappings_config
 
 
+def index_existing_identities(
+    existing_mappings: list[dict],
+) -> tuple[dict[str, str], dict[str, str]]:
+    """Indexes the existing user-mappings into username -> principal and principal -> username"""
+    principals_by_username: dict[str, str] = {}
+    usernames_by_principal: dict[str, str] = {}
+    for _mapping in existing_mappings:
+        _username = _mapping.get("username")
+        _principal = _mapping.get("principal")
+        principals_by_username[_username] = _principal
+        usernames_by_principal.setdefault(_principal, _username)
+    return principals_by_username, usernames_by_principal
+
+
+def plan_identity_calls(
+    principals_by_username: dict[str, str],
+    usernames_by_principal: dict[str, str],
+    identity: DetailedIdentity | str,
+) -> list[tuple[str, dict]]:
+    """
+    Returns the user-mappings calls, (method name, arguments but the vCluster), to make in order to set the identity.
+    Checks if the username already does exist. If it does, simply update (PUT) to update the mapping definition,
+    which also updates the principal if it changed, as this is an editable field.
+    If the username doesn't exist, but the principal does, we delete the mapping altogether, and create it again,
+    with the new username.
+    If however none of these conditions are true, this is a new user-mapping and we create it.
+    Identities set as a string are the username and principal, updated if it exists, created otherwise.
+    """
+    if isinstance(identity, str):
+        warnings.warn(
+            "For retro-compatibility, `strings` in the list of identities "
+            "is maintained. It will be removed in a future version."
+        )
+        if principals_by_username.get(identity, None) == identity:
+            return [("update_mapping", {"username": identity, "principal": identity})]
+        return [("create_mapping", {"username": identity, "principal": identity})]
+    if not isinstance(identity, DetailedIdentity):
+        raise TypeError(
+            f"Identity {identity} is not a string or a dict.", type(identity)
+        )
+    identity_args: dict = {
+        "username": identity.username,
+        "principal": identity.principal,
+        "groups": identity.groups,
+    }
+    if identity.username in principals_by_username:
+        return [("update_mapping", identity_args)]
+    calls: list[tuple[str, dict]] = []
+    _existing_username = usernames_by_principal.get(identity.principal)
+    if _existing_username is not None:
+        calls.append(("delete_mapping", {"username": _existing_username}))
+    calls.append(("create_mapping", identity_args))
+    return calls
+
+
+def group_identities_calls(
+    principals_by_username: dict[str, str],
+    usernames_by_principal: dict[str, str],
+    identities: list[DetailedIdentity | str],
+) -> list[list[tuple[str, dict]]]:
+    """
+    Returns the calls from plan_identity_calls for all the identities, grouped so that all the calls for the same
+    username are in the same group, in the identities order. The groups can be run concurrently, as long as the calls
+    of each group are made in order, i.e. a rename deletes the existing username before another identity sets it.
+    """
+    identities_calls: list[list[tuple[str, dict]]] = [
+        plan_identity_calls(principals_by_username, usernames_by_principal, _identity)
+        for _identity in identities
+    ]
+    parents: list[int] = list(range(len(identities_calls)))
+
+    def find_group(index: int) -> int:
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
+
+    usernames_identity: dict[str, int] = {}
+    for _index, _calls in enumerate(identities_calls):
+        for _, _args in _calls:
+            _other_index = usernames_identity.setdefault(_args["username"], _index)
+            parents[find_group(_index)] = find_group(_other_index)
+    groups: dict[int, list[tuple[str, dict]]] = {}
+    for _index, _calls in enumerate(identities_calls):
+        groups.setdefault(find_group(_index), []).extend(_calls)
+    return list(groups.values())
+
+
+def set_identity(
+    user_mappings: UserMappings,
+    principals_by_username: dict[str, str],
+    usernames_by_principal: dict[str, str],
+    identity: DetailedIdentity | str,
+    vcluster_name: str = None,
+) -> None:
+    """Makes the calls from plan_identity_calls to set the identity"""
+    for _method, _args in plan_identity_calls(
+        principals_by_username, usernames_by_principal, identity
+    ):
+        getattr(user_mappings, _method)(vcluster_name=vcluster_name, **_args)
+
+
 def handle_detailed_identity_input(
     user_mappings: UserMappings,
-    existing_identities: list[tuple[str, str]],
+    principals_by_username: dict[str, str],
+    usernames_by_principal: dict[str, str],
     identity: DetailedIdentity,
     vcluster_name: str = None,
 ):
-    """
-    Checks if the username,principal combo already does exist. If it does,
-    simply update (PUT) to update the mapping definition.
-    If the combo doesn't exist, we evaluate against the existing pairs.
-    Otherwise, we evaluate against each existing username,principal pair.
-    If the username matches, but the principal doesn't, we update the principal, as this is an editable field
-    If the username doesn't match, but the principal does, we delete the mapping altogether, and create it again, with
-    the new username.
-    If however none of these conditions are true, this is a new user-mapping and we create it.
-    """
-    to_create: tuple[str, str] = (
-        identity.username,
-        identity.principal,
+    """Creates, updates or renames the identity. See plan_identity_calls"""
+    set_identity(
+        user_mappings,
+        principals_by_username,
+        usernames_by_principal,
+        identity,
+        vcluster_name=vcluster_name,
     )
-    if to_create in existing_identities:
-        user_mappings.update_mapping(
-            username=identity.username,
-            principal=identity.principal,
-            groups=identity.groups,
-            vcluster_name=vcluster_name,
-        )
-        return
-    for _existing_username, _existing_principal in existing_identities:
-        if (
-            identity.username == _existing_username
-            and identity.principal != _existing_principal
-        ):
-            user_mappings.update_mapping(
-                username=identity.username,
-                principal=identity.principal,
-                groups=identity.groups,
-                vcluster_name=vcluster_name,
-            )
-            break
-        elif (
-            identity.username != _existing_username
-            and identity.principal == _existing_principal
-        ):
-            user_mappings.delete_mapping(_existing_username, vcluster_name)
-            user_mappings.create_mapping(
-                username=identity.username,
-                principal=identity.principal,
-                groups=identity.groups,
-                vcluster_name=vcluster_name,
-            )
-            break
-    else:
-        user_mappings.create_mapping(
-            username=identity.username,
-            principal=identity.principal,
-            groups=identity.groups,
-            vcluster_name=vcluster_name,
-        )
 
 
 def check_create_username_identity(
@@ -128,80 +240,198 @@ def check_create_username_identity(
     Now (3.x+) that the user-mapping details has more than just the username, and previously the `username` was the
     `principal`, we check against the existence of both, just in case.
     """
-    existing_identities: list[tuple[str, str]] = [
-        (_mapping.get("username"), _mapping.get("principal"))
-        for _mapping in existing_mappings
-    ]
+    principals_by_username, usernames_by_principal = index_existing_identities(
+        existing_mappings
+    )
     for identity in identities_to_create:
-        if isinstance(identity, str):
-            warnings.warn(
-                "For retro-compatibility, `strings` in the list of identities "
-                "is maintained. It will be removed in a future version."
-            )
-            to_create = (
-                identity,
-                identity,
-            )
-            if to_create in existing_identities:
-                user_mappings.update_mapping(
-                    username=identity, principal=identity, vcluster_name=vcluster_name
-                )
-            else:
-                user_mappings.create_mapping(
-                    username=identity, principal=identity, vcluster_name=vcluster_name
-                )
-        elif isinstance(identity, DetailedIdentity):
-            handle_detailed_identity_input(
-                user_mappings,
-                existing_identities,
-                identity,
-                vcluster_name=vcluster_name,
-            )
-        else:
-            raise TypeError(
-                f"Identity {identity} is not a string or a dict.", type(identity)
-            )
+        set_identity(
+            user_mappings,
+            principals_by_username,
+            usernames_by_principal,
+            identity,
+            vcluster_name=vcluster_name,
+        )
+
+
+def get_usernames_to_delete(
+    existing_usernames: list[str],
+    usernames_to_create: list[str],
+    vcluster_name: str | None = None,
+    dry_run: bool = False,
+) -> list[str]:
+    """Returns the existing usernames, sorted, not defined in the config file. Logs them with dry_run."""
+    usernames_to_delete: list[str] = sorted(
+        set(existing_usernames).difference(usernames_to_create)
+    )
+    if dry_run:
+        for username in usernames_to_delete:
+            LOG.info(f"{vcluster_name or 'passthrough'} - would delete {username}")
+    return usernames_to_delete
 
 
 def cleanup_undefined_identities(
     user_mappings: UserMappings,
     usernames_to_create: list[str],
     vcluster_name: str | None = None,
-):
+    existing_mappings: list[dict] = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> list[str]:
     """
     If a username is in existing identities but not in the list coming from the config file, delete
     the mapping.
     This helps with ensuring we use the config file as the target.
+    If existing_mappings is set, uses it instead of listing the user-mappings again.
+    Returns the usernames deleted (or to delete, with dry_run).
     """
-    existing_usernames: list[str] = user_mappings.list_mappings(vcluster_name).json()
-    for username in existing_usernames:
-        if username not in usernames_to_create:
+    if existing_mappings is None:
+        existing_usernames: list[str] = user_mappings.list_mappings(
+            vcluster_name
+        ).json()
+    else:
+        existing_usernames: list[str] = [
+            _mapping["username"] for _mapping in existing_mappings
+        ]
+    usernames_to_delete: list[str] = get_usernames_to_delete(
+        existing_usernames, usernames_to_create, vcluster_name, dry_run
+    )
+    if dry_run:
+        return usernames_to_delete
+
+    def delete_mapping(username: str) -> None:
+        try:
             user_mappings.delete_mapping(username=username, vcluster_name=vcluster_name)
+        except GenericNotFound:
+            LOG.debug(f"{vcluster_name or 'passthrough'} - {username} already deleted")
 
+    run_concurrently(delete_mapping, usernames_to_delete, concurrency)
+    return usernames_to_delete
 
-def import_mappings_from_file(
-    user_mappings: UserMappings, config: dict, remove_unset: bool = False
-) -> None:
-    """From the config file, will iterate over each vcluster to create/update/delete user-mappings."""
-    mappings_config = validate_identities_are_unique(config)
 
-    for _vcluster_name, definition in mappings_config.userMappings.items():
-        vcluster_name: str | None = (
-            None if _vcluster_name == "passthrough" else _vcluster_name
-        )
-        _existing_mappings = user_mappings.list_mappings_detailed(vcluster_name)
-        usernames_to_create: list[str] = [
-            _id.username
-            for _id in definition.identities
-            if isinstance(_id, DetailedIdentity)
-        ] + [_id for _id in definition.identities if isinstance(_id, str)]
+def get_definition_usernames(definition: UserMappingsDefinition) -> list[str]:
+    """Returns the usernames of the identities defined for a vCluster"""
+    return [
+        _id.username
+        for _id in definition.identities
+        if isinstance(_id, DetailedIdentity)
+    ] + [_id for _id in definition.identities if isinstance(_id, str)]
+
+
+def import_vcluster_mappings(
+    user_mappings: UserMappings,
+    vcluster_name: str | None,
+    definition: UserMappingsDefinition,
+    remove_unset: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+) -> list[str]:
+    """
+    Creates/updates/deletes the user-mappings of a single vCluster (None for passthrough).
+    Returns the usernames removed, if remove_unset is set.
+    """
+    _existing_mappings = user_mappings.list_mappings_detailed(vcluster_name)
+    usernames_to_create: list[str] = get_definition_usernames(definition)
+    if not dry_run:
         check_create_username_identity(
             user_mappings,
             definition.identities,
             _existing_mappings,
             vcluster_name=vcluster_name,
         )
-        if remove_unset:
-            cleanup_undefined_identities(
-                user_mappings, usernames_to_create, vcluster_name
+    if remove_unset:
+        return cleanup_undefined_identities(
+            user_mappings,
+            usernames_to_create,
+            vcluster_name,
+            existing_mappings=_existing_mappings,
+            concurrency=concurrency,
+            dry_run=dry_run,
+        )
+    return []
+
+
+def get_vclusters_definitions(
+    mappings_config: UserMappingsConfig,
+) -> list[tuple[str, UserMappingsDefinition]]:
+    """Returns the (vCluster name, definition) of all the vClusters but passthrough"""
+    return [
+        (_vcluster_name, _definition)
+        for _vcluster_name, _definition in mappings_config.userMappings.items()
+        if _vcluster_name != "passthrough"
+    ]
+
+
+def import_mappings_from_file(
+    user_mappings: UserMappings,
+    config: dict,
+    remove_unset: bool = False,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    dry_run: bool = False,
+    parallel_vclusters: int = 1,
+) -> dict[str, list[str]]:
+    """
+    From the config file, will iterate over each vcluster to create/update/delete user-mappings.
+    Up to `parallel_vclusters` vClusters are processed at once. The passthrough mappings are always processed last.
+    Errors are collected for each vCluster, and raised once all the vClusters have been processed.
+    Returns the usernames removed for each vCluster, if remove_unset is set.
+    With dry_run, no change is made, and the usernames that would be removed are returned.
+    """
+    mappings_config = validate_identities_are_unique(config)
+
+    def import_vcluster(
+        vcluster_definition: tuple[str, UserMappingsDefinition]
+    ) -> tuple[list[str] | None, Exception | None]:
+        _vcluster_name, _definition = vcluster_definition
+        try:
+            return (
+                import_vcluster_mappings(
+                    user_mappings,
+                    None if _vcluster_name == "passthrough" else _vcluster_name,
+                    _definition,
+                    remove_unset,
+                    concurrency,
+                    dry_run,
+                ),
+                None,
             )
+        except Exception as error:
+            LOG.exception(error)
+            LOG.error(f"{_vcluster_name} - failed to import user-mappings")
+            return None, error
+
+    vclusters_definitions: list[tuple[str, UserMappingsDefinition]] = (
+        get_vclusters_definitions(mappings_config)
+    )
+    results = run_concurrently(
+        import_vcluster, vclusters_definitions, parallel_vclusters
+    )
+    if "passthrough" in mappings_config.userMappings:
+        vclusters_definitions.append(
+            ("passthrough", mappings_config.userMappings["passthrough"])
+        )
+        results.append(import_vcluster(vclusters_definitions[-1]))
+    return collect_import_results(vclusters_definitions, results, remove_unset)
+
+
+def collect_import_results(
+    vclusters_definitions: list[tuple[str, UserMappingsDefinition]],
+    results: list[tuple[list[str] | None, Exception | None]],
+    remove_unset: bool = False,
+) -> dict[str, list[str]]:
+    """
+    Returns the usernames removed for each vCluster, if remove_unset is set.
+    Raises RuntimeError with the errors of all the vClusters which failed.
+    """
+    removed_usernames: dict[str, list[str]] = {}
+    errors: dict[str, Exception] = {}
+    for (_vcluster_name, _), (_removed, _error) in zip(vclusters_definitions, results):
+        if _error:
+            errors[_vcluster_name] = _error
+        elif remove_unset:
+            removed_usernames[_vcluster_name] = _removed
+    if errors:
+        raise RuntimeError(
+            "Failed to import user-mappings for {}".format(", ".join(errors.keys())),
+            errors,
+        )
+    return removed_usernames
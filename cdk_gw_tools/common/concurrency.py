@@ -0,0 +1,90 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Helpers to run independent Gateway API calls in a bounded pool of workers"""
+
+from __future__ import annotations
+
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable
+
+DEFAULT_CONCURRENCY: int = 10
+DEFAULT_RETRIES: int = 3
+DEFAULT_BACKOFF: float = 0.5
+RETRYABLE_STATUS_CODES: tuple[int, ...] = (429, 500, 502, 503, 504)
+
+
+def is_retryable_error(error: Exception) -> bool:
+    """Whether the API call that raised error can be retried: throttling, server errors, connection errors"""
+    # Imported here, only once a call failed, to keep them out of the import time of the modules using the pool
+    from cdk_proxy_api_client.errors import ProxyGenericException
+    from requests import exceptions as req_exceptions
+
+    if isinstance(error, ProxyGenericException):
+        return error.code in RETRYABLE_STATUS_CODES
+    return isinstance(error, (req_exceptions.ConnectionError, req_exceptions.Timeout))
+
+
+def call_with_retries(
+    function: Callable,
+    *args,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    **kwargs,
+) -> Any:
+    """
+    Calls function, retrying up to `retries` times on retryable errors, waiting
+    backoff * 2^attempt seconds (with jitter) between attempts.
+    """
+    attempt: int = 0
+    while True:
+        try:
+            return function(*args, **kwargs)
+        except Exception as error:
+            if attempt >= retries or not is_retryable_error(error):
+                raise
+            time.sleep(backoff * (2**attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+async def call_with_retries_async(
+    function: Callable,
+    *args,
+    retries: int = DEFAULT_RETRIES,
+    backoff: float = DEFAULT_BACKOFF,
+    **kwargs,
+) -> Any:
+    """Same as call_with_retries, for coroutine functions"""
+    import asyncio
+
+    attempt: int = 0
+    while True:
+        try:
+            return await function(*args, **kwargs)
+        except Exception as error:
+            if attempt >= retries or not is_retryable_error(error):
+                raise
+            await asyncio.sleep(backoff * (2**attempt) * random.uniform(0.5, 1.5))
+            attempt += 1
+
+
+def run_concurrently(
+    function: Callable[[Any], Any],
+    items: Iterable,
+    concurrency: int = DEFAULT_CONCURRENCY,
+) -> list:
+    """
+    Calls function for each item, with at most `concurrency` calls in flight.
+    Results are returned in the same order as the items. If a call raises, the exception is raised
+    once the in-flight calls are done.
+    With a concurrency of 1 (or less), calls are made sequentially in the current thread.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if concurrency is None or concurrency <= 1 or len(items) == 1:
+        return [function(_item) for _item in items]
+    with ThreadPoolExecutor(max_workers=min(concurrency, len(items))) as executor:
+        return list(executor.map(function, items))
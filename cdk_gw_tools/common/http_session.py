@@ -0,0 +1,115 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Shared HTTP session, with connections pooling and keep-alive, for all the Gateway API calls"""
+
+from __future__ import annotations
+
+from requests import Session
+from requests import exceptions as req_exceptions
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+from cdk_gw_tools.common.concurrency import (
+    DEFAULT_BACKOFF,
+    DEFAULT_CONCURRENCY,
+    RETRYABLE_STATUS_CODES,
+)
+from cdk_gw_tools.common.rate_limiter import RateLimiter
+
+
+class RateLimitedAdapter(HTTPAdapter):
+    """
+    HTTPAdapter which sends every request through the RateLimiter.
+    The retries are made here rather than by urllib3, so that each attempt goes through the RateLimiter too,
+    and throttled attempts reduce the concurrency.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, max_retries: Retry = None, **kwargs):
+        self.rate_limiter = rate_limiter
+        self.retries: Retry = max_retries or Retry(0, read=False)
+        super().__init__(max_retries=0, **kwargs)
+
+    def send_rate_limited(self, request, **kwargs):
+        self.rate_limiter.acquire()
+        status_code: int | None = None
+        try:
+            response = super().send(request, **kwargs)
+            status_code = response.status_code
+            return response
+        finally:
+            self.rate_limiter.release(status_code)
+
+    def send(self, request, **kwargs):
+        retries: Retry = self.retries
+        while True:
+            try:
+                response = self.send_rate_limited(request, **kwargs)
+            except (req_exceptions.ConnectionError, req_exceptions.Timeout) as error:
+                if (
+                    retries.allowed_methods
+                    and request.method.upper() not in retries.allowed_methods
+                ):
+                    raise
+                try:
+                    retries = retries.increment(
+                        request.method, request.url, error=error
+                    )
+                except MaxRetryError:
+                    raise error
+                retries.sleep()
+                continue
+            if not retries.is_retry(
+                request.method,
+                response.status_code,
+                "Retry-After" in response.headers,
+            ):
+                return response
+            try:
+                retries = retries.increment(
+                    request.method, request.url, response=response.raw
+                )
+            except MaxRetryError:
+                return response
+            retries.sleep(response.raw)
+            response.close()
+
+
+def create_http_session(
+    pool_size: int = DEFAULT_CONCURRENCY,
+    retries: int = 0,
+    backoff: float = DEFAULT_BACKOFF,
+    rate_limiter: RateLimiter = None,
+) -> Session:
+    """
+    Creates a requests Session which keeps up to pool_size connections alive per host, so that
+    concurrent API calls re-use the connections (and TLS sessions) instead of opening new ones.
+    With retries, idempotent calls are retried with backoff on throttling/server errors.
+    With a rate_limiter, all the requests made with the session, retries included, are rate limited.
+    """
+    session = Session()
+    adapter_kwargs: dict = dict(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=Retry(
+            total=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRYABLE_STATUS_CODES,
+            raise_on_status=False,
+        ),
+    )
+    adapter = (
+        RateLimitedAdapter(rate_limiter, **adapter_kwargs)
+        if rate_limiter
+        else HTTPAdapter(**adapter_kwargs)
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_pool_size(args: dict) -> int:
+    """Sizes the connections pool for the maximum number of API calls in flight for the CLI arguments"""
+    concurrency: int = args.get("concurrency") or DEFAULT_CONCURRENCY
+    return max(concurrency * (args.get("parallel_vclusters") or 1), DEFAULT_CONCURRENCY)
@@ -0,0 +1,180 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Client-side rate limiting of the Gateway API calls: a token bucket caps the requests rate,
+and the number of calls in flight is adapted with AIMD (additive increase, multiplicative decrease)
+when Gateway returns throttling/server errors.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+
+from compose_x_common.compose_x_common import set_else_none
+
+from cdk_gw_tools.common.concurrency import RETRYABLE_STATUS_CODES
+from cdk_gw_tools.common.logging import LOG
+
+DEFAULT_DECREASE_FACTOR: float = 0.5
+DEFAULT_ADDITIVE_INCREASE: float = 1.0
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average, with bursts of up to `burst` requests"""
+
+    def __init__(self, rate: float, burst: int = None):
+        self.rate = rate
+        self.burst = burst if burst else max(int(rate), 1)
+        self._tokens: float = float(self.burst)
+        self._updated: float = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Takes a token and returns how long, in seconds, to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+def wake_up_waiter(waiter) -> None:
+    """Resolves the future of an acquire_async, unless it was cancelled"""
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class AimdConcurrencyLimit:
+    """
+    Limits the number of calls in flight. The limit grows by additive_increase for every `limit` successful
+    calls, and is multiplied by decrease_factor when a call is throttled, between min and max concurrency.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        additive_increase: float = DEFAULT_ADDITIVE_INCREASE,
+        decrease_factor: float = DEFAULT_DECREASE_FACTOR,
+    ):
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.additive_increase = additive_increase
+        self.decrease_factor = decrease_factor
+        self.limit: float = float(max_concurrency)
+        self.in_flight: int = 0
+        self._condition = threading.Condition()
+        # (event loop, future) of the acquire_async calls waiting for a slot, resolved by release
+        self._async_waiters: list = []
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """Waits for a slot without blocking the event loop. The waiters are woken up by release, not polled"""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(
+                    self.min_concurrency, self.limit * self.decrease_factor
+                )
+                LOG.debug(f"API calls throttled. Concurrency limit now {self.limit}")
+            else:
+                self.limit = min(
+                    self.max_concurrency,
+                    self.limit + self.additive_increase / self.limit,
+                )
+            self._condition.notify_all()
+            async_waiters, self._async_waiters = self._async_waiters, []
+        for _loop, _waiter in async_waiters:
+            if not _loop.is_closed():
+                _loop.call_soon_threadsafe(wake_up_waiter, _waiter)
+
+
+class RateLimiter:
+    """Token bucket and/or AIMD concurrency limit, applied to every API call"""
+
+    def __init__(
+        self,
+        bucket: TokenBucket | None = None,
+        concurrency_limit: AimdConcurrencyLimit | None = None,
+    ):
+        self.bucket = bucket
+        self.concurrency_limit = concurrency_limit
+
+    def acquire(self) -> None:
+        if self.concurrency_limit:
+            self.concurrency_limit.acquire()
+        if self.bucket:
+            time.sleep(self.bucket.reserve())
+
+    async def acquire_async(self) -> None:
+        """
+        Same as acquire, without blocking the event loop: waits for a slot to be released,
+        then sleeps for the time until the next token, (1 - tokens) / rate.
+        """
+        import asyncio
+
+        if self.concurrency_limit:
+            await self.concurrency_limit.acquire_async()
+        if self.bucket:
+            await asyncio.sleep(self.bucket.reserve())
+
+    def release(self, status_code: int = None) -> None:
+        """Releases the call slot. No status code (connection error) or a throttling/server error is a throttle"""
+        if self.concurrency_limit:
+            self.concurrency_limit.release(
+                status_code is None or status_code in RETRYABLE_STATUS_CODES
+            )
+
+
+def get_rate_limiter(rate_limit_config: dict | None) -> RateLimiter | None:
+    """Creates the RateLimiter from the profile RateLimit configuration"""
+    if not rate_limit_config:
+        return None
+    requests_per_second = set_else_none("RequestsPerSecond", rate_limit_config)
+    max_concurrency = set_else_none("MaxConcurrency", rate_limit_config)
+    return RateLimiter(
+        (
+            TokenBucket(requests_per_second, set_else_none("Burst", rate_limit_config))
+            if requests_per_second
+            else None
+        ),
+        (
+            AimdConcurrencyLimit(
+                max_concurrency,
+                set_else_none("MinConcurrency", rate_limit_config, 1),
+                set_else_none(
+                    "AdditiveIncrease", rate_limit_config, DEFAULT_ADDITIVE_INCREASE
+                ),
+                set_else_none(
+                    "DecreaseFactor", rate_limit_config, DEFAULT_DECREASE_FACTOR
+                ),
+            )
+            if max_concurrency
+            else None
+        ),
+    )
@@ -0,0 +1,93 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""
+Registry of the JSON schema validators of the specs files, built once per process.
+If fastjsonschema is installed, the schemas are also compiled to python functions, used to validate the input;
+jsonschema then only runs on invalid input, to raise the same ValidationError as jsonschema.validate.
+"""
+
+from __future__ import annotations
+
+from json import loads
+from typing import TYPE_CHECKING, Callable
+
+if TYPE_CHECKING:
+    from jsonschema.protocols import Validator
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
+
+from importlib_resources import files as pkg_files
+
+SPECS_FILES: dict[str, str] = {
+    "tenant_mappings": "tenant_mappings-input.json",
+    "profiles_config": "profiles_config.spec.json",
+    "user_mappings": "user-mappings.spec.json",
+    "interceptors_config": "interceptors-config.spec.json",
+}
+
+_SCHEMAS: dict[str, dict] = {}
+_VALIDATORS: dict[str, Validator] = {}
+_COMPILED_VALIDATORS: dict[str, Callable[[dict], dict] | None] = {}
+
+
+def get_schema(spec_name: str) -> dict:
+    if spec_name not in _SCHEMAS:
+        _SCHEMAS[spec_name] = loads(
+            pkg_files("cdk_gw_tools")
+            .joinpath(f"specs/{SPECS_FILES[spec_name]}")
+            .read_text()
+        )
+    return _SCHEMAS[spec_name]
+
+
+def get_validator(spec_name: str) -> Validator:
+    """Returns the jsonschema validator for the spec, checking the schema against its meta-schema only once"""
+    if spec_name not in _VALIDATORS:
+        from jsonschema.validators import validator_for
+
+        schema = get_schema(spec_name)
+        validator_class = validator_for(schema)
+        validator_class.check_schema(schema)
+        _VALIDATORS[spec_name] = validator_class(schema)
+    return _VALIDATORS[spec_name]
+
+
+def get_compiled_validator(spec_name: str) -> Callable[[dict], dict] | None:
+    """Returns the fastjsonschema compiled validation function for the spec, None if not available"""
+    if spec_name not in _COMPILED_VALIDATORS:
+        _COMPILED_VALIDATORS[spec_name] = None
+        if fastjsonschema:
+            try:
+                _COMPILED_VALIDATORS[spec_name] = fastjsonschema.compile(
+                    get_schema(spec_name), use_default=False
+                )
+            except fastjsonschema.JsonSchemaDefinitionException:
+                pass
+    return _COMPILED_VALIDATORS[spec_name]
+
+
+def validate_spec(instance, spec_name: str, schema: dict = None) -> None:
+    """
+    Same as jsonschema.validate with the spec schema, using the validators built for the process.
+    If schema is set, validates against it instead.
+    """
+    if schema:
+        from jsonschema import validate
+
+        return validate(instance, schema)
+    compiled = get_compiled_validator(spec_name)
+    if compiled:
+        try:
+            compiled(instance)
+            return
+        except fastjsonschema.JsonSchemaException:
+            pass
+    from jsonschema.exceptions import best_match
+
+    error = best_match(get_validator(spec_name).iter_errors(instance))
+    if error is not None:
+        raise error
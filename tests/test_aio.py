@@ -0,0 +1,63 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the asyncio client settings and the order of the concurrent user-mappings calls"""
+
+from __future__ import annotations
+
+import asyncio
+import ssl
+
+from requests.utils import DEFAULT_CA_BUNDLE_PATH
+
+from cdk_gw_tools.aio.bulk import import_vcluster_mappings_async
+from cdk_gw_tools.aio.client import get_ssl_context
+from cdk_gw_tools.specs.user_mappings import DetailedIdentity, UserMappings
+
+
+class SlowDeleteUserMappings:
+    """Async user mappings client recording the calls, the deletes being slower than the other calls"""
+
+    def __init__(self, existing_mappings: list[dict]):
+        self.existing_mappings = existing_mappings
+        self.calls: list[tuple[str, str]] = []
+
+    async def list_mappings_detailed(self, vcluster_name: str = None) -> list[dict]:
+        return self.existing_mappings
+
+    async def delete_mapping(self, username: str, vcluster_name: str = None) -> None:
+        await asyncio.sleep(0.01)
+        self.calls.append(("delete_mapping", username))
+
+    async def create_mapping(self, username: str, **kwargs) -> None:
+        self.calls.append(("create_mapping", username))
+
+    async def update_mapping(self, username: str, **kwargs) -> None:
+        self.calls.append(("update_mapping", username))
+
+
+def test_rename_deletes_before_create():
+    user_mappings = SlowDeleteUserMappings([{"username": "bob", "principal": "bob-id"}])
+    definition = UserMappings(
+        identities=[
+            DetailedIdentity(username="robert", principal="bob-id"),
+            DetailedIdentity(username="alice", principal="alice-id"),
+        ]
+    )
+    asyncio.run(import_vcluster_mappings_async(user_mappings, "vc-a", definition))
+    assert user_mappings.calls == [
+        ("create_mapping", "alice"),
+        ("delete_mapping", "bob"),
+        ("create_mapping", "robert"),
+    ]
+
+
+def test_ssl_context_matches_requests_verify(monkeypatch):
+    assert get_ssl_context(False) is False
+    monkeypatch.delenv("REQUESTS_CA_BUNDLE", raising=False)
+    monkeypatch.delenv("CURL_CA_BUNDLE", raising=False)
+    context = get_ssl_context(True)
+    assert isinstance(context, ssl.SSLContext)
+    assert context.verify_mode == ssl.CERT_REQUIRED and context.check_hostname
+    monkeypatch.setenv("REQUESTS_CA_BUNDLE", DEFAULT_CA_BUNDLE_PATH)
+    assert get_ssl_context(True).cert_store_stats()["x509_ca"] > 0
@@ -0,0 +1,116 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the bulk rotation of the vClusters secrets"""
+
+from __future__ import annotations
+
+import json
+import time
+
+import jwt
+
+from cdk_gw_tools.aws import bulk_rotation
+from cdk_gw_tools.aws.bulk_rotation import get_spread_before_deadline, rotate_secrets
+
+
+def get_token(username: str, expiry: float) -> str:
+    return jwt.encode(
+        {"vcluster": "vc-a", "username": username, "exp": int(expiry)},
+        "test-signing-key-of-32-bytes-min",
+        algorithm="HS256",
+    )
+
+
+class FakeSecretsClient:
+    """Secrets Manager client with the secrets values in memory"""
+
+    def __init__(self, secrets: dict[str, dict], failing_puts: set[str] = None):
+        self.secrets = secrets
+        self.failing_puts = failing_puts or set()
+
+    def get_secret_value(self, SecretId: str, VersionStage: str) -> dict:
+        return {"SecretString": json.dumps(self.secrets[SecretId])}
+
+    def put_secret_value(
+        self, SecretId: str, ClientRequestToken: str, SecretString: str
+    ) -> None:
+        if SecretId in self.failing_puts:
+            raise ConnectionError("put failed")
+        self.secrets[SecretId] = json.loads(SecretString)
+
+
+def get_expiring_secrets(count: int) -> dict[str, dict]:
+    expiry = time.time() + 60
+    return {
+        f"secret-{_index}": {
+            "SASL_USERNAME": f"user-{_index}",
+            "SASL_PASSWORD": get_token(f"user-{_index}", expiry + _index),
+        }
+        for _index in range(count)
+    }
+
+
+def create_tokens(requests: list[dict]) -> list[dict]:
+    return [
+        dict(_request, token=f"new-{_request['username']}") for _request in requests
+    ]
+
+
+def test_failed_batch_does_not_stop_the_rotation():
+    secrets_client = FakeSecretsClient(get_expiring_secrets(6), {"secret-5"})
+    calls: list[int] = []
+
+    def failing_create_tokens(requests: list[dict]) -> list[dict]:
+        calls.append(len(requests))
+        if len(calls) == 1:
+            raise ConnectionError("Gateway unavailable")
+        return create_tokens(requests)
+
+    report = rotate_secrets(
+        secrets_client,
+        list(secrets_client.secrets),
+        failing_create_tokens,
+        concurrency=2,
+        spread=0.01,
+    )
+    assert calls == [2, 2, 2]
+    assert sorted(report["rotated"]) == ["secret-2", "secret-3", "secret-4"]
+    assert report["failed"] == {
+        "secret-0": "Gateway unavailable",
+        "secret-1": "Gateway unavailable",
+        "secret-5": "put failed",
+    }
+    assert secrets_client.secrets["secret-2"]["SASL_PASSWORD"] == "new-user-2"
+    assert secrets_client.secrets["secret-0"]["SASL_PASSWORD"] != "new-user-0"
+
+
+def test_missing_tokens_are_reported():
+    secrets_client = FakeSecretsClient(get_expiring_secrets(2))
+    report = rotate_secrets(
+        secrets_client, list(secrets_client.secrets), lambda _requests: []
+    )
+    assert report["rotated"] == []
+    assert set(report["failed"]) == {"secret-0", "secret-1"}
+
+
+def test_spread_capped_to_deadline(monkeypatch):
+    sleeps: list[float] = []
+    monkeypatch.setattr(bulk_rotation.time, "sleep", sleeps.append)
+    secrets_client = FakeSecretsClient(get_expiring_secrets(4))
+    report = rotate_secrets(
+        secrets_client,
+        list(secrets_client.secrets),
+        create_tokens,
+        concurrency=1,
+        spread=3600,
+        deadline=time.monotonic() + 4,
+    )
+    assert len(report["rotated"]) == 4
+    assert max(sleeps) <= 4
+
+
+def test_get_spread_before_deadline():
+    assert get_spread_before_deadline(10, time.monotonic() + 60) == 10
+    assert 0 < get_spread_before_deadline(120, time.monotonic() + 30) <= 30
+    assert get_spread_before_deadline(120, time.monotonic() - 5) == 0
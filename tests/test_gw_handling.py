@@ -0,0 +1,65 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the batch creation of the vClusters tokens"""
+
+from __future__ import annotations
+
+from cdk_proxy_api_client.errors import GenericUnauthorized
+
+from cdk_gw_tools.aws import gw_handling
+from cdk_gw_tools.aws.gw_handling import create_batch_token, create_tokens_batch
+
+
+class FakeVirtualClusters:
+    """VirtualClusters client returning a token made of the vCluster, username and lifetime"""
+
+    def __init__(self, unauthorized: bool = False):
+        self.unauthorized = unauthorized
+
+    def create_vcluster_user_token(
+        self, vcluster: str, username: str, lifetime_in_seconds: int, token_only: bool
+    ) -> str:
+        if self.unauthorized:
+            raise GenericUnauthorized(401, ["expired credentials"])
+        return f"{vcluster}/{username}/{lifetime_in_seconds}"
+
+
+def test_create_batch_token():
+    assert create_batch_token(
+        FakeVirtualClusters(), {"vcluster": "vc-a", "expiry": 60}
+    ) == {"vcluster": "vc-a", "username": "vc-a", "token": "vc-a/vc-a/60"}
+
+
+def test_invalid_entries_return_an_error():
+    for _request in [None, "vc-a", ["vc-a"], {"vcluster": "vc-a"}, {"expiry": 60}]:
+        result = create_batch_token(FakeVirtualClusters(), _request)
+        assert "token" not in result
+        assert result["error"]
+        assert isinstance(result["_exception"], (TypeError, KeyError))
+
+
+def test_create_tokens_batch_retries_unauthorized(monkeypatch):
+    clients = [FakeVirtualClusters(unauthorized=True), FakeVirtualClusters()]
+    invalidated: list[bool] = []
+    monkeypatch.setattr(
+        gw_handling,
+        "get_cdk_gw_admin_creds",
+        lambda _session: {"username": "admin", "password": "secret"},
+    )
+    monkeypatch.setattr(
+        gw_handling, "get_vclusters_client", lambda *_args: clients.pop(0)
+    )
+    monkeypatch.setattr(
+        gw_handling,
+        "invalidate_cdk_gw_admin_creds",
+        lambda: invalidated.append(True),
+    )
+    results = create_tokens_batch(
+        None,
+        [{"vcluster": "vc-a", "username": "app", "expiry": 60}, "not-a-dict"],
+        concurrency=2,
+    )
+    assert invalidated == [True]
+    assert results[0] == {"vcluster": "vc-a", "username": "app", "token": "vc-a/app/60"}
+    assert results[1]["error"] and "_exception" not in results[1]
@@ -0,0 +1,288 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the selection of the tenants and of their logical topics to import"""
+
+from __future__ import annotations
+
+import re
+import time
+
+import pytest
+from cdk_proxy_api_client.errors import (
+    GenericConflict,
+    GenericUnauthorized,
+    ProxyGenericException,
+)
+from requests.exceptions import ReadTimeout
+
+from benchmarks.topics_filter_benchmark import (
+    EXCLUDE_REGEXES,
+    INCLUDE_REGEXES,
+    current_filter,
+    get_tenant_topics,
+    legacy_filter,
+)
+from cdk_gw_tools.cli_tools import import_tenants_mappings as import_module
+from cdk_gw_tools.cli_tools.import_tenants_mappings import (
+    RegexesMatcher,
+    TenantSelector,
+    filter_tenant_topics,
+    import_from_tenants_include_dict,
+    import_tenants_mappings,
+    propagate_tenant_mappings,
+)
+
+FILTER_50K_BUDGET_S: float = 5.0
+
+
+def get_topic(logical_name: str, read_only: bool = False) -> dict:
+    return {
+        "logicalTopicName": logical_name,
+        "physicalTopicName": f"physical-{logical_name}",
+        "readOnly": read_only,
+        "concentrated": False,
+    }
+
+
+def get_logical_names(topics: list[dict]) -> list[str]:
+    return [_topic["logicalTopicName"] for _topic in topics]
+
+
+def test_exclude_takes_precedence_over_include():
+    topics = [get_topic("orders-1"), get_topic("orders-1-dlq"), get_topic("other")]
+    filtered = filter_tenant_topics(
+        topics, RegexesMatcher(["^orders-.*$"]), RegexesMatcher([".*-dlq$"])
+    )
+    assert get_logical_names(filtered) == ["orders-1"]
+
+
+def test_include_is_required():
+    topics = [get_topic("orders-1"), get_topic("other")]
+    assert get_logical_names(
+        filter_tenant_topics(topics, RegexesMatcher(["^orders-.*$"]))
+    ) == ["orders-1"]
+    assert filter_tenant_topics(topics, RegexesMatcher([])) == []
+
+
+def test_topics_returned_once():
+    topics = [get_topic("orders-1"), get_topic("orders-1"), get_topic("orders-2")]
+    filtered = filter_tenant_topics(
+        topics, RegexesMatcher(["^orders-.*$", "^orders-1$"])
+    )
+    assert get_logical_names(filtered) == ["orders-1", "orders-2"]
+
+
+def test_inline_flags_regexes():
+    """Each regex keeps its own inline flags, which can't be combined in one alternation"""
+    topics = [
+        get_topic("orders-1"),
+        get_topic("payments-1"),
+        get_topic("PAYMENTS-2"),
+        get_topic("payments-3-internal"),
+    ]
+    filtered = filter_tenant_topics(
+        topics,
+        RegexesMatcher(["^orders-.*$", "(?i)^PAYMENTS-.*$"]),
+        RegexesMatcher(["(?i).*-INTERNAL$"]),
+    )
+    assert get_logical_names(filtered) == ["orders-1", "payments-1", "PAYMENTS-2"]
+
+
+def test_invalid_regex():
+    with pytest.raises(re.error):
+        RegexesMatcher(["^orders-[$"])
+    matcher = RegexesMatcher(["^orders-[$", "^orders-.*$"], ignore_invalid=True)
+    assert [_regex for _regex, _ in matcher.invalid_regexes] == ["^orders-[$"]
+    assert matcher.match("orders-1")
+
+
+def test_tenant_selector():
+    selector = TenantSelector(
+        ["app-a", "APP-B", "app-c-test", "other"],
+        exclude_regexes=["(?i).*-TEST$", "[invalid"],
+    )
+    assert selector.tenants == ["app-a", "APP-B", "other"]
+    assert selector.select("^app-.*$") == ["app-a"]
+    assert selector.select_any(["(?i)^app-.*$", "^other$", "[invalid"]) == [
+        "app-a",
+        "APP-B",
+        "other",
+    ]
+    with pytest.raises(re.error):
+        selector.select("[invalid")
+
+
+def test_include_dict_with_inline_flags_and_exclude():
+    """
+    Regression: the include and exclude regexes of a rule were combined into one alternation, which fails to compile
+    with inline-flag regexes, and the whole rule was skipped.
+    """
+    tenants_mappings = {
+        "tenant-a": [
+            get_topic("orders-1"),
+            get_topic("PAYMENTS-1"),
+            get_topic("payments-2-dlq"),
+            get_topic("orders-2", read_only=True),
+            get_topic("inventory-1"),
+        ],
+        "tenant-b": [get_topic("orders-3")],
+    }
+    processed_tenants: set[str] = set()
+    mappings = import_from_tenants_include_dict(
+        None,
+        {
+            "tenant_regex": "^tenant-a$",
+            "logical_topics_include_regexes": ["^orders-.*$", "(?i)^payments-.*$"],
+            "logical_topics_exclude_regexes": ["(?i).*-DLQ$"],
+        },
+        TenantSelector(list(tenants_mappings)),
+        processed_tenants,
+        tenants_mappings=tenants_mappings,
+    )
+    assert mappings == [
+        {
+            "logicalTopicName": "orders-1",
+            "physicalTopicName": "physical-orders-1",
+            "readOnly": True,
+        },
+        {
+            "logicalTopicName": "PAYMENTS-1",
+            "physicalTopicName": "physical-PAYMENTS-1",
+            "readOnly": True,
+        },
+    ]
+    assert processed_tenants == {"tenant-a"}
+
+
+def test_include_dict_with_invalid_regex():
+    tenants_mappings = {"tenant-a": [get_topic("orders-1")]}
+    assert (
+        import_from_tenants_include_dict(
+            None,
+            {
+                "tenant_regex": "^tenant-a$",
+                "logical_topics_exclude_regexes": ["[invalid"],
+            },
+            TenantSelector(list(tenants_mappings)),
+            set(),
+            tenants_mappings=tenants_mappings,
+        )
+        == []
+    )
+
+
+def test_filter_applies_excludes_unlike_legacy():
+    """
+    Regression: the previous filter checked the logical name against the topics dicts before removing them,
+    so the exclude regexes never removed any topic.
+    """
+    tenant_topics = get_tenant_topics(3000)
+    exclude_matcher = RegexesMatcher(EXCLUDE_REGEXES)
+    legacy_names = get_logical_names(legacy_filter(tenant_topics))
+    assert any(exclude_matcher.match(_name) for _name in legacy_names)
+    assert get_logical_names(current_filter(tenant_topics)) == [
+        _name for _name in legacy_names if not exclude_matcher.match(_name)
+    ]
+
+
+def test_filter_50k_topics():
+    tenant_topics = get_tenant_topics(50000)
+    start = time.perf_counter()
+    filtered = current_filter(tenant_topics)
+    elapsed = time.perf_counter() - start
+    include_matcher = RegexesMatcher(INCLUDE_REGEXES)
+    exclude_matcher = RegexesMatcher(EXCLUDE_REGEXES)
+    assert get_logical_names(filtered) == [
+        _name
+        for _name in get_logical_names(tenant_topics)
+        if include_matcher.match(_name) and not exclude_matcher.match(_name)
+    ]
+    assert elapsed < FILTER_50K_BUDGET_S
+
+
+class FailingVirtualClusters:
+    """VirtualClusters client raising the error set for a logical topic when creating its mapping"""
+
+    def __init__(self, errors: dict[str, Exception]):
+        self.errors = errors
+
+    def create_vcluster_topic_mapping(self, logical_topic_name: str, **kwargs) -> None:
+        if logical_topic_name in self.errors:
+            raise self.errors[logical_topic_name]
+
+
+def test_mapping_errors_do_not_stop_the_import():
+    """5xx, timeouts and 409 not ignored are recorded as failed, and the other mappings still created"""
+    client = FailingVirtualClusters(
+        {
+            "server-error": ProxyGenericException("error", 500, {"message": "error"}),
+            "timeout": ReadTimeout("timed out"),
+            "bad-request": ProxyGenericException("bad", 400, {"message": "bad"}),
+            "conflict": GenericConflict(409, ["conflict"]),
+        }
+    )
+    mappings = [
+        get_topic(_name)
+        for _name in ["server-error", "timeout", "bad-request", "conflict", "ok"]
+    ]
+    assert propagate_tenant_mappings(client, mappings, "tenant-a") == {
+        "created": ["ok"],
+        "conflicted": [],
+        "failed": ["bad-request", "conflict", "server-error", "timeout"],
+    }
+    assert propagate_tenant_mappings(
+        client, mappings, "tenant-a", ignore_conflicts=True
+    ) == {
+        "created": ["ok"],
+        "conflicted": ["conflict"],
+        "failed": ["bad-request", "server-error", "timeout"],
+    }
+
+
+def test_mapping_unauthorized_is_raised():
+    client = FailingVirtualClusters({"ok": GenericUnauthorized(401, ["expired"])})
+    with pytest.raises(GenericUnauthorized):
+        propagate_tenant_mappings(client, [get_topic("ok")], "tenant-a")
+
+
+class InMemoryVirtualClusters:
+    """VirtualClusters client with the mappings of the vClusters in memory"""
+
+    mappings: dict[str, dict[str, dict]] = {}
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    def list_vcluster_topic_mappings(self, vcluster: str, as_list: bool = False):
+        return list(self.mappings.get(vcluster, {}).values())
+
+    def create_vcluster_topic_mapping(
+        self, vcluster: str, logical_topic_name: str, **kwargs
+    ) -> None:
+        self.mappings.setdefault(vcluster, {})[logical_topic_name] = get_topic(
+            logical_topic_name
+        )
+
+    def delete_vcluster_topic_mapping(self, vcluster: str, logical_topic_name: str):
+        del self.mappings[vcluster][logical_topic_name]
+
+
+def test_remove_unset_implies_reconcile(monkeypatch):
+    """--remove-unset without --reconcile was ignored, leaving the mappings not in the config"""
+    monkeypatch.setattr(import_module, "VirtualClusters", InMemoryVirtualClusters)
+    InMemoryVirtualClusters.mappings = {
+        "tenant-a": {"orders-1": get_topic("orders-1"), "old": get_topic("old")}
+    }
+    config = {
+        "tenant_name": "tenant-a",
+        "mappings": [
+            {"logicalTopicName": "orders-1", "physicalTopicName": "physical-orders-1"}
+        ],
+    }
+    plan = import_tenants_mappings(None, config, "tenant-a", plan_only=True)
+    assert not plan["delete"]
+    mappings = import_tenants_mappings(None, config, "tenant-a")
+    assert get_logical_names(mappings) == ["orders-1", "old"]
+    mappings = import_tenants_mappings(None, config, "tenant-a", remove_unset=True)
+    assert get_logical_names(mappings) == ["orders-1"]
@@ -0,0 +1,74 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the on-disk cache of the plugins catalogue"""
+
+from __future__ import annotations
+
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from cdk_gw_tools.cli_tools import plugins_catalogue
+from cdk_gw_tools.cli_tools.plugins_catalogue import (
+    get_plugins_cache_path,
+    get_plugins_classes,
+)
+
+
+class FakePlugins:
+    """Plugins client returning the catalogue of the proxy, counting the calls"""
+
+    calls: int = 0
+
+    def __init__(self, proxy):
+        self.proxy = proxy
+
+    def list_all_plugins(self, extended: bool = False):
+        FakePlugins.calls += 1
+        return SimpleNamespace(json=lambda: {"plugins": list(self.proxy.plugins)})
+
+
+@pytest.fixture
+def proxy(tmp_path, monkeypatch):
+    monkeypatch.setattr(plugins_catalogue, "PLUGINS_CACHE_DIR", tmp_path)
+    monkeypatch.setattr(plugins_catalogue, "Plugins", FakePlugins)
+    FakePlugins.calls = 0
+    return SimpleNamespace(
+        client=SimpleNamespace(url="http://gateway:8888"),
+        version="v1",
+        plugins=["io.PluginA"],
+    )
+
+
+def test_no_cache_by_default(proxy, tmp_path):
+    assert get_plugins_classes(proxy) == {"io.PluginA"}
+    assert get_plugins_classes(proxy) == {"io.PluginA"}
+    assert FakePlugins.calls == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_cache_only_invalidated_by_ttl_or_refresh(proxy):
+    assert get_plugins_classes(proxy, cache_ttl=60) == {"io.PluginA"}
+    proxy.plugins = ["io.PluginA", "io.PluginB"]
+    assert get_plugins_classes(proxy, cache_ttl=60) == {"io.PluginA"}
+    assert FakePlugins.calls == 1
+    assert get_plugins_classes(proxy, cache_ttl=60, force_refresh=True) == {
+        "io.PluginA",
+        "io.PluginB",
+    }
+    cache_path = get_plugins_cache_path(proxy)
+    expired = time.time() - 120
+    os.utime(cache_path, (expired, expired))
+    proxy.plugins = ["io.PluginC"]
+    assert get_plugins_classes(proxy, cache_ttl=60) == {"io.PluginC"}
+    assert FakePlugins.calls == 3
+
+
+def test_cache_path_per_url_and_extended(proxy):
+    cache_path = get_plugins_cache_path(proxy)
+    assert get_plugins_cache_path(proxy, extended=True) != cache_path
+    proxy.client.url = "http://other-gateway:8888"
+    assert get_plugins_cache_path(proxy) != cache_path
@@ -0,0 +1,97 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the client-side rate limiting of the API calls"""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from cdk_gw_tools.common.rate_limiter import (
+    AimdConcurrencyLimit,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+def test_token_bucket_returns_the_deficit():
+    bucket = TokenBucket(10, 2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_aimd_limit():
+    limit = AimdConcurrencyLimit(4, min_concurrency=1)
+    for _ in range(4):
+        limit.acquire()
+    limit.release(throttled=True)
+    assert limit.limit == 2
+    assert limit.in_flight == 3
+    for _ in range(3):
+        limit.release()
+    assert 2 < limit.limit < 4
+
+
+def test_acquire_async_limits_in_flight():
+    limit = AimdConcurrencyLimit(2)
+    in_flight: list[int] = []
+
+    async def call() -> None:
+        await limit.acquire_async()
+        in_flight.append(limit.in_flight)
+        await asyncio.sleep(0.01)
+        limit.release()
+
+    async def main() -> None:
+        await asyncio.gather(*[call() for _ in range(8)])
+
+    asyncio.run(main())
+    assert len(in_flight) == 8
+    assert max(in_flight) == 2
+    assert limit.in_flight == 0
+
+
+def test_acquire_async_woken_by_release_without_polling(monkeypatch):
+    """The waiters sleep for the bucket deficit only, and wait for a slot without polling"""
+    rate_limiter = RateLimiter(TokenBucket(1000, 10), AimdConcurrencyLimit(1))
+    rate_limiter.concurrency_limit.acquire()
+    sleeps: list[float] = []
+    sleep = asyncio.sleep
+
+    async def recording_sleep(delay: float, *args):
+        sleeps.append(delay)
+        await sleep(0)
+
+    async def main() -> None:
+        monkeypatch.setattr(asyncio, "sleep", recording_sleep)
+        waiter = asyncio.ensure_future(rate_limiter.acquire_async())
+        for _ in range(10):
+            await sleep(0)
+        assert not waiter.done()
+        threading.Thread(target=rate_limiter.release, args=(200,)).start()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+    assert sleeps == [0.0]
+    assert rate_limiter.concurrency_limit.in_flight == 1
+
+
+def test_cancelled_waiter_does_not_take_a_slot():
+    limit = AimdConcurrencyLimit(1)
+    limit.acquire()
+
+    async def main() -> None:
+        waiter = asyncio.ensure_future(limit.acquire_async())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0)
+        limit.release()
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    assert limit.in_flight == 0
@@ -0,0 +1,79 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the rewrite of the username and token in the secret values"""
+
+from __future__ import annotations
+
+from benchmarks.secret_value_benchmark import (
+    NEW_TOKEN,
+    NEW_USERNAME,
+    OLD_TOKEN,
+    OLD_USERNAME,
+    get_secret_value,
+    legacy_rewrite,
+    rewrite,
+)
+from cdk_gw_tools.aws.gw_handling import (
+    replace_string_in_dict_values,
+    replace_strings_in_values,
+)
+
+
+def test_nested_values_are_replaced():
+    value = {
+        "username": "old",
+        "jaas": 'username="old" password="old-token";',
+        "clients": [{"username": "old"}, "old", 3],
+        "port": 9092,
+    }
+    assert replace_strings_in_values(value, {"old": "new"}) == {
+        "username": "new",
+        "jaas": 'username="new" password="new-token";',
+        "clients": [{"username": "new"}, "new", 3],
+        "port": 9092,
+    }
+    assert value["clients"][0]["username"] == "old"
+
+
+def test_unchanged_values_are_not_copied():
+    value = {"unchanged": {"key": "value"}, "changed": {"key": "old"}}
+    updated = replace_strings_in_values(value, {"old": "new"})
+    assert updated["unchanged"] is value["unchanged"]
+    assert updated["changed"] is not value["changed"]
+    assert replace_strings_in_values(value, {"missing": "new"}) is value
+
+
+def test_longer_sources_first_and_new_values_not_replaced_again():
+    replacements = {"user": "user-token", "user-token": "secret"}
+    assert replace_strings_in_values("user user-token", replacements) == (
+        "user-token secret"
+    )
+
+
+def test_replace_string_in_dict_values():
+    value = {"username": "old", "nested": {"username": "old"}}
+    copied = replace_string_in_dict_values(value, "old", "new", copy=True)
+    assert copied == {"username": "new", "nested": {"username": "new"}}
+    assert value == {"username": "old", "nested": {"username": "old"}}
+    unchanged = {"username": "other"}
+    copied = replace_string_in_dict_values(unchanged, "old", "new", copy=True)
+    assert copied == unchanged and copied is not unchanged
+    replace_string_in_dict_values(value, "old", "new")
+    assert value == {"username": "new", "nested": {"username": "new"}}
+
+
+def test_rewrite_same_as_legacy_and_nested_values():
+    """The previous rewrite only replaced top-level string values"""
+    secret = get_secret_value(40)
+    legacy = legacy_rewrite(secret)
+    current = rewrite(secret)
+    assert {_key: _value for _key, _value in current.items() if _key != "clients"} == {
+        _key: _value for _key, _value in legacy.items() if _key != "clients"
+    }
+    assert current["SASL_USERNAME"] == NEW_USERNAME
+    assert current["SASL_PASSWORD"] == NEW_TOKEN
+    jaas = current["clients"][0]["sasl.jaas.config"]
+    assert NEW_USERNAME in jaas and NEW_TOKEN in jaas
+    assert OLD_USERNAME not in jaas and OLD_TOKEN not in jaas
+    assert secret["SASL_USERNAME"] == OLD_USERNAME
@@ -0,0 +1,194 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the comparison of the interceptors config file with the interceptors on Gateway"""
+
+from __future__ import annotations
+
+import asyncio
+from os import path
+
+import pytest
+import yaml
+from cdk_proxy_api_client.errors import GenericNotFound
+
+from cdk_gw_tools.aio.bulk import apply_interceptor_change_async
+from cdk_gw_tools.cli_tools.set_update_interceptors import (
+    apply_interceptor_change,
+    get_current_interceptors,
+    get_interceptors_changes,
+    get_validated_desired_interceptors,
+)
+
+PLUGIN_CLASS: str = "io.conduktor.gateway.interceptor.safeguard.CreateTopicPolicyPlugin"
+EXAMPLE_PATH: str = path.join(path.dirname(__file__), "interceptors-input-example.yaml")
+
+
+def get_interceptor(name: str, priority: int = 1, config: dict = None) -> dict:
+    return {
+        "name": name,
+        "pluginClass": PLUGIN_CLASS,
+        "priority": priority,
+        "config": config or {},
+    }
+
+
+def test_global_scope():
+    current = get_current_interceptors({"global": [get_interceptor("policy")]})
+    assert current == {("policy", True, None, None, None): get_interceptor("policy")}
+
+
+def test_vcluster_scopes():
+    current = get_current_interceptors(
+        {
+            "vClusters": {
+                "vc-a": {
+                    "interceptors": [get_interceptor("policy")],
+                    "groups": {"admins": [get_interceptor("policy", 2)]},
+                    "usernames": {"bob": [get_interceptor("policy", 3)]},
+                }
+            }
+        }
+    )
+    assert current == {
+        ("policy", False, "vc-a", None, None): get_interceptor("policy"),
+        ("policy", False, "vc-a", "admins", None): get_interceptor("policy", 2),
+        ("policy", False, "vc-a", None, "bob"): get_interceptor("policy", 3),
+    }
+
+
+def test_passthrough_scopes():
+    current = get_current_interceptors(
+        {
+            "global": [],
+            "vClusters": {
+                "passthrough": {
+                    "interceptors": [get_interceptor("policy")],
+                    "groups": {"admins": [get_interceptor("policy")]},
+                    "usernames": {"bob": [get_interceptor("policy")]},
+                }
+            },
+        }
+    )
+    assert set(current) == {
+        ("policy", False, None, None, None),
+        ("policy", False, None, "admins", None),
+        ("policy", False, None, None, "bob"),
+    }
+
+
+def test_scope_only_set_from_the_response_keys():
+    """Scope fields in the interceptor definition are not used to set its scope"""
+    interceptor = dict(get_interceptor("policy"), vCluster="vc-b", username="alice")
+    current = get_current_interceptors(
+        {"vClusters": {"vc-a": {"groups": {"admins": [interceptor]}}}}
+    )
+    assert list(current) == [("policy", False, "vc-a", "admins", None)]
+
+
+@pytest.mark.parametrize(
+    "all_interceptors",
+    [
+        [get_interceptor("policy")],
+        {"interceptors": [get_interceptor("policy")]},
+        {"global": {"policy": get_interceptor("policy")}},
+        {"global": [{"pluginClass": PLUGIN_CLASS}]},
+        {"vClusters": [get_interceptor("policy")]},
+        {"vClusters": {"vc-a": [get_interceptor("policy")]}},
+        {"vClusters": {"vc-a": {"users": {"bob": [get_interceptor("policy")]}}}},
+        {"vClusters": {"vc-a": {"groups": [get_interceptor("policy")]}}},
+    ],
+)
+def test_unrecognised_responses(all_interceptors):
+    with pytest.raises(ValueError):
+        get_current_interceptors(all_interceptors)
+
+
+def test_unrecognised_response_deletes_nothing():
+    desired = {("policy", True, None, None, None): get_interceptor("policy")}
+    changes, unchanged = get_interceptors_changes(
+        desired, {"unknown": [get_interceptor("other")]}, remove_unset=True
+    )
+    assert changes == list(desired.items())
+    assert unchanged == 0
+
+
+def test_changes_from_config_file():
+    with open(EXAMPLE_PATH) as example_fd:
+        interceptors: dict = yaml.safe_load(example_fd)
+    desired = get_validated_desired_interceptors(
+        interceptors,
+        {_config["pluginClass"] for _config in interceptors["interceptors"].values()},
+    )
+    global_definition = desired[("defaultCreatePolicy", True, None, None, None)]
+    john_definition = desired[("defaultCreatePolicy", False, None, None, "john")]
+    all_interceptors = {
+        "global": [dict(global_definition, name="defaultCreatePolicy")],
+        "vClusters": {
+            "passthrough": {
+                "usernames": {
+                    "john": [
+                        dict(john_definition, name="defaultCreatePolicy", priority=1)
+                    ]
+                }
+            },
+            "old-vcluster": {"interceptors": [get_interceptor("removed")]},
+        },
+    }
+    changes, unchanged = get_interceptors_changes(
+        desired, all_interceptors, remove_unset=True
+    )
+    changed_keys = [_key for _key, _ in changes]
+    assert ("defaultCreatePolicy", True, None, None, None) not in changed_keys
+    assert ("defaultCreatePolicy", False, None, None, "john") in changed_keys
+    assert (("removed", False, "old-vcluster", None, None), None) in changes
+    assert unchanged == 1
+    assert len(changes) == len(desired)
+
+
+class NotFoundInterceptors:
+    """Interceptors client for which all the interceptors are already deleted"""
+
+    def delete_interceptor(self, interceptor_name: str, **kwargs):
+        raise GenericNotFound(404, [f"{interceptor_name} not found"])
+
+    update_interceptor = delete_interceptor
+
+
+class AsyncNotFoundInterceptors(NotFoundInterceptors):
+    async def delete_interceptor(self, interceptor_name: str, **kwargs):
+        super().delete_interceptor(interceptor_name)
+
+    update_interceptor = delete_interceptor
+
+
+def test_delete_not_found_succeeds():
+    """A retried delete gets a 404 if the previous attempt deleted the interceptor"""
+    interceptor_key = ("policy", False, "vc-a", None, None)
+    client = NotFoundInterceptors()
+    assert apply_interceptor_change(client, interceptor_key, None, retries=0) is None
+    assert isinstance(
+        apply_interceptor_change(
+            client, interceptor_key, get_interceptor("policy"), retries=0
+        ),
+        GenericNotFound,
+    )
+
+
+def test_async_delete_not_found_succeeds():
+    interceptor_key = ("policy", False, "vc-a", None, None)
+    client = AsyncNotFoundInterceptors()
+    assert (
+        asyncio.run(
+            apply_interceptor_change_async(client, interceptor_key, None, retries=0)
+        )
+        is None
+    )
+    assert isinstance(
+        asyncio.run(
+            apply_interceptor_change_async(
+                client, interceptor_key, get_interceptor("policy"), retries=0
+            )
+        ),
+        GenericNotFound,
+    )
@@ -0,0 +1,51 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Checks the CLI startup: import time budget and heavy modules not imported for --help"""
+
+from __future__ import annotations
+
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.import_benchmark import benchmark_import
+
+IMPORT_BUDGET_MS: float = float(os.environ.get("CDK_CLI_IMPORT_BUDGET_MS", 400))
+IMPORT_RUNS: int = 3
+HEAVY_MODULES: list[str] = ["boto3", "jsonschema", "yaml"]
+
+HELP_SCRIPT: str = """
+import json, sys
+sys.argv = ["cdk-cli", "--help"]
+from cdk_gw_tools.cli import main
+try:
+    main()
+except SystemExit:
+    pass
+print(json.dumps(sorted(sys.modules)), file=sys.stderr)
+"""
+
+
+def test_cli_import_time_within_budget():
+    result = benchmark_import("cdk_gw_tools.cli", runs=IMPORT_RUNS)
+    slowest = sorted(result["packages_ms"].items(), key=lambda _p: -_p[1])[:5]
+    assert result["total_ms"] <= IMPORT_BUDGET_MS, (
+        f"cdk_gw_tools.cli imported in {result['total_ms']:.1f}ms, above {IMPORT_BUDGET_MS}ms. "
+        f"Slowest packages: {slowest}"
+    )
+
+
+def test_cli_help_does_not_import_heavy_modules():
+    process = subprocess.run(
+        [sys.executable, "-c", HELP_SCRIPT],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules: list[str] = json.loads(process.stderr.splitlines()[-1])
+    top_level: set[str] = {_module.split(".")[0] for _module in modules}
+    assert "usage:" in process.stdout
+    for _module in HEAVY_MODULES:
+        assert _module not in top_level, f"{_module} imported by cdk-cli --help"
@@ -0,0 +1,212 @@
+#   SPDX-License-Identifier: Apache-2.0
+#   Copyright 2023 John Mille <john@ews-network.net>
+
+"""Tests the reconciliation of the vClusters identities with their existing user-mappings"""
+
+from __future__ import annotations
+
+import time
+
+import pytest
+
+from benchmarks.user_mappings_benchmark import get_identities
+from cdk_gw_tools.cli_tools.user_mappings_tools import (
+    check_create_username_identity,
+    cleanup_undefined_identities,
+    collect_import_results,
+    group_identities_calls,
+    index_existing_identities,
+    plan_identity_calls,
+    validate_identities_are_unique,
+)
+from cdk_gw_tools.specs.user_mappings import DetailedIdentity
+
+RECONCILE_10K_BUDGET_S: float = 2.0
+EXISTING_MAPPINGS: list[dict] = [
+    {"username": "alice", "principal": "alice-id"},
+    {"username": "bob", "principal": "bob-id"},
+]
+
+
+class RecordingUserMappings:
+    """User mappings client recording the calls, without making them"""
+
+    def __init__(self):
+        self.calls: list[tuple[str, dict]] = []
+
+    def create_mapping(self, **kwargs) -> None:
+        self.calls.append(("create_mapping", kwargs))
+
+    def update_mapping(self, **kwargs) -> None:
+        self.calls.append(("update_mapping", kwargs))
+
+    def delete_mapping(self, **kwargs) -> None:
+        self.calls.append(("delete_mapping", kwargs))
+
+
+def plan(identity: DetailedIdentity | str) -> list[tuple[str, dict]]:
+    return plan_identity_calls(*index_existing_identities(EXISTING_MAPPINGS), identity)
+
+
+def test_existing_username_is_updated():
+    identity = DetailedIdentity(username="alice", principal="new-id", groups=["app"])
+    assert plan(identity) == [
+        (
+            "update_mapping",
+            {"username": "alice", "principal": "new-id", "groups": ["app"]},
+        )
+    ]
+
+
+def test_renamed_principal_is_deleted_before_created():
+    identity = DetailedIdentity(username="robert", principal="bob-id")
+    assert plan(identity) == [
+        ("delete_mapping", {"username": "bob"}),
+        (
+            "create_mapping",
+            {"username": "robert", "principal": "bob-id", "groups": None},
+        ),
+    ]
+
+
+def test_new_identity_is_created():
+    identity = DetailedIdentity(username="carol", principal="carol-id")
+    assert plan(identity) == [
+        (
+            "create_mapping",
+            {"username": "carol", "principal": "carol-id", "groups": None},
+        )
+    ]
+
+
+def test_string_identities():
+    existing_mappings = [{"username": "dave", "principal": "dave"}]
+    with pytest.warns(UserWarning):
+        assert plan_identity_calls(
+            *index_existing_identities(existing_mappings), "dave"
+        ) == [("update_mapping", {"username": "dave", "principal": "dave"})]
+    with pytest.warns(UserWarning):
+        assert plan("dave") == [
+            ("create_mapping", {"username": "dave", "principal": "dave"})
+        ]
+
+
+def test_invalid_identity():
+    with pytest.raises(TypeError):
+        plan({"username": "alice"})
+
+
+def test_check_create_username_identity_sets_vcluster():
+    user_mappings = RecordingUserMappings()
+    check_create_username_identity(
+        user_mappings,
+        [DetailedIdentity(username="robert", principal="bob-id")],
+        EXISTING_MAPPINGS,
+        vcluster_name="vc-a",
+    )
+    assert user_mappings.calls == [
+        ("delete_mapping", {"vcluster_name": "vc-a", "username": "bob"}),
+        (
+            "create_mapping",
+            {
+                "vcluster_name": "vc-a",
+                "username": "robert",
+                "principal": "bob-id",
+                "groups": None,
+            },
+        ),
+    ]
+
+
+def test_reconcile_10k_identities():
+    existing_mappings, identities = get_identities(10000)
+    user_mappings = RecordingUserMappings()
+    start = time.perf_counter()
+    check_create_username_identity(user_mappings, identities, existing_mappings)
+    elapsed = time.perf_counter() - start
+    methods = [_method for _method, _ in user_mappings.calls]
+    assert methods.count("update_mapping") == 5000
+    assert methods.count("delete_mapping") == 2500
+    assert methods.count("create_mapping") == 5000
+    assert elapsed < RECONCILE_10K_BUDGET_S
+
+
+def test_cleanup_undefined_identities_dry_run():
+    user_mappings = RecordingUserMappings()
+    assert cleanup_undefined_identities(
+        user_mappings,
+        ["alice"],
+        existing_mappings=EXISTING_MAPPINGS,
+        dry_run=True,
+    ) == ["bob"]
+    assert user_mappings.calls == []
+
+
+def test_duplicate_identities_are_reported():
+    config = {
+        "userMappings": {
+            "vc-a": {"identities": [{"username": "alice", "principal": "a"}]},
+            "vc-b": {"identities": [{"username": "alice", "principal": "a"}]},
+        }
+    }
+    with pytest.raises(ValueError, match="vc-a, vc-b"):
+        validate_identities_are_unique(config)
+
+
+def test_collect_import_results_raises_all_errors():
+    error = ValueError("failed")
+    with pytest.raises(RuntimeError) as raised:
+        collect_import_results(
+            [("vc-a", None), ("vc-b", None)],
+            [(["bob"], None), (None, error)],
+            remove_unset=True,
+        )
+    assert raised.value.args[1] == {"vc-b": error}
+    assert collect_import_results([("vc-a", None)], [(["bob"], None)], True) == {
+        "vc-a": ["bob"]
+    }
+
+
+def test_calls_for_the_same_username_are_grouped():
+    existing_mappings = EXISTING_MAPPINGS + [{"username": "carol", "principal": "c"}]
+    identities = [
+        DetailedIdentity(username="robert", principal="bob-id"),
+        DetailedIdentity(username="dave", principal="dave-id"),
+        DetailedIdentity(username="bob", principal="new-bob-id"),
+        DetailedIdentity(username="carol", principal="c"),
+        DetailedIdentity(username="roberto", principal="robert-id"),
+    ]
+    groups = group_identities_calls(
+        *index_existing_identities(existing_mappings), identities
+    )
+    assert [
+        [(_method, _args["username"]) for _method, _args in _group] for _group in groups
+    ] == [
+        [
+            ("delete_mapping", "bob"),
+            ("create_mapping", "robert"),
+            ("update_mapping", "bob"),
+        ],
+        [("create_mapping", "dave")],
+        [("update_mapping", "carol")],
+        [("create_mapping", "roberto")],
+    ]
+
+
+def test_groups_merged_in_identities_order():
+    existing_mappings = [
+        {"username": "alice", "principal": "a"},
+        {"username": "bob", "principal": "b"},
+    ]
+    identities = [
+        DetailedIdentity(username="alice", principal="a2"),
+        DetailedIdentity(username="bob", principal="b2"),
+        DetailedIdentity(username="carol", principal="a"),
+        DetailedIdentity(username="dave", principal="b"),
+    ]
+    groups = group_identities_calls(
+        *index_existing_identities(existing_mappings), identities
+    )
+    assert len(groups) == 2
+    assert [_args["username"] for _, _args in groups[0]] == ["alice", "alice", "carol"]
+    assert [_args["username"] for _, _args in groups[1]] == ["bob", "bob", "dave"]